@@ -1,23 +1,15 @@
 # 添加个性化推荐测试数据
 from app import create_app, db
-from app.models.user import User, HealthRecord
+from app.models.user import HealthRecord
+from app.bootstrap import seed_test_user
 from datetime import datetime, timedelta
 import random
 
 def add_test_data():
     app = create_app()
     with app.app_context():
-        # 检查测试用户是否存在
-        test_user = User.query.filter_by(username='test_user').first()
-        if not test_user:
-            # 创建测试用户
-            test_user = User(
-                username='test_user',
-                email='test@example.com',
-                password='test123'
-            )
-            db.session.add(test_user)
-            db.session.commit()
+        # 获取或创建测试用户
+        test_user = seed_test_user()
         
         # 删除旧的健康记录
         HealthRecord.query.filter_by(user_id=test_user.id).delete()
@@ -7,6 +7,10 @@ from flask_mail import Mail
 from dotenv import load_dotenv
 import os
 from app.config import Config
+from app.database import normalize_database_uri, engine_options, init_engine
+
+# 迁移脚本目录，不依赖当前工作目录
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
 
 # 初始化扩展
 db = SQLAlchemy()
@@ -17,14 +21,19 @@ cors = CORS()
 def create_app(test_config=None):
     app = Flask(__name__)
     
-    if test_config is None:
-        app.config.from_mapping(
-            SECRET_KEY='dev',
-            SQLALCHEMY_DATABASE_URI='sqlite:///health.db',
-            SQLALCHEMY_TRACK_MODIFICATIONS=False
-        )
-    else:
+    app.config.from_mapping(
+        SECRET_KEY=Config.SECRET_KEY,
+        JWT_SECRET_KEY=Config.JWT_SECRET_KEY,
+        SQLALCHEMY_DATABASE_URI=Config.SQLALCHEMY_DATABASE_URI,
+        SQLALCHEMY_TRACK_MODIFICATIONS=Config.SQLALCHEMY_TRACK_MODIFICATIONS
+    )
+    if test_config is not None:
         app.config.update(test_config)
+    
+    # 连接池参数根据数据库类型生成，可在配置中整体覆盖
+    database_uri = normalize_database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(database_uri))
 
     # 确保实例文件夹存在
     try:
@@ -34,50 +43,44 @@ def create_app(test_config=None):
 
     # 初始化扩展
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     cors.init_app(app)
+    with app.app_context():
+        init_engine(app, db)
     
     # 注册蓝图
-    from app.api import auth_api, health_record_api, recommendation_api, data_collection_api, federated_learning_api
+    from app.api import auth_api, health_record_api, recommendation_api, data_collection_api, federated_learning_api, algorithm_analysis_api
     app.register_blueprint(auth_api.bp)
     app.register_blueprint(health_record_api.bp)
     app.register_blueprint(recommendation_api.bp)
     app.register_blueprint(data_collection_api.bp)
     app.register_blueprint(federated_learning_api.bp)
+    app.register_blueprint(algorithm_analysis_api.bp)
 
-    # 在应用上下文中创建所有数据库表
-    with app.app_context():
-        try:
-            # 导入所有模型以确保它们被注册
-            from app.models import User, HealthRecord
-            
-            # 删除现有的数据库文件（如果存在）
-            db_path = os.path.join(os.path.dirname(app.instance_path), 'health.db')
-            if os.path.exists(db_path):
-                os.remove(db_path)
-            
-            # 创建所有表
-            db.create_all()
-            print("成功创建数据库表")
-            
-            # 检查测试用户是否已存在
-            test_user = User.query.filter_by(email='test@test.com').first()
-            if not test_user:
-                # 添加测试用户
-                test_user = User(
-                    username='test_user',
-                    email='test@test.com'
-                )
-                test_user.set_password('test123')
-                db.session.add(test_user)
-                db.session.commit()
-                print("成功创建测试用户")
-            else:
-                print("测试用户已存在")
-            
-        except Exception as e:
-            print(f"初始化数据库时出错: {str(e)}")
-            db.session.rollback()
-            raise e
+    # 导入所有模型以确保它们被注册
+    from app import models
+    
+    # 数据库迁移到最新版本（已是最新时不执行DDL）；测试数据通过 flask seed 命令按需创建
+    from app.bootstrap import bootstrap_database, seed_command
+    app.cli.add_command(seed_command)
+    # 全体用户健康建议批处理：flask refresh-recommendations
+    from app.services.recommendation_batch import refresh_recommendations_command
+    app.cli.add_command(refresh_recommendations_command)
+    # 离线拟合多变量异常值模型：flask fit-outlier-model
+    from app.services.outlier_model import fit_outlier_model_command
+    app.cli.add_command(fit_outlier_model_command)
+    if app.config.get('AUTO_MIGRATE', Config.AUTO_MIGRATE):
+        bootstrap_database(app)
+
+    return app
+
+def prewarm():
+    """预热全部服务：导入重量级依赖、加载模型和词典
 
-    return app 
\ No newline at end of file
+    默认情况下这些资源在第一次请求时才加载；设置PREWARM_SERVICES=1后，
+    gunicorn会在每个worker启动后调用本函数（见gunicorn.conf.py）。
+    """
+    # 确保声明服务的蓝图模块已导入，其中的服务才会被登记
+    from app.api import algorithm_analysis_api, data_collection_api, federated_learning_api, recommendation_api
+    from app.utils.lazy import prewarm_services
+    prewarm_services() 
\ No newline at end of file
@@ -1,13 +1,20 @@
-from flask import Blueprint, request, jsonify
-from app.services.algorithm_analysis import AlgorithmAnalysisService
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from app.services.training_jobs import training_scheduler
+from app import db
+from app.models.training_job import TrainingJob
 from app.utils.auth import token_required
+from app.utils.lazy import LazyService
+from app.config import Config
+import itertools
+import json
 
 bp = Blueprint('algorithm_analysis', __name__)
-algorithm_service = AlgorithmAnalysisService()
+# 请求线程中同步训练只用单线程，避免与其他请求和后台训练任务争抢CPU
+algorithm_service = LazyService('app.services.algorithm_analysis:AlgorithmAnalysisService', n_jobs=1)
 
 @bp.route('/api/algorithm/train/diabetes', methods=['POST'])
 @token_required
-def train_diabetes_model():
+def train_diabetes_model(current_user):
     """训练糖尿病预测模型"""
     try:
         data = request.get_json()
@@ -24,7 +31,7 @@ def train_diabetes_model():
 
 @bp.route('/api/algorithm/train/hypertension', methods=['POST'])
 @token_required
-def train_hypertension_model():
+def train_hypertension_model(current_user):
     """训练高血压预测模型"""
     try:
         data = request.get_json()
@@ -39,9 +46,73 @@ def train_hypertension_model():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/algorithm/jobs', methods=['POST'])
+@token_required
+def submit_training_job(current_user):
+    """提交后台训练任务"""
+    from app.services.algorithm_analysis import MODEL_NAMES
+    
+    try:
+        data = request.get_json()
+        if not data or 'health_records' not in data:
+            return jsonify({'error': '缺少健康记录数据'}), 400
+        if data.get('model_type') not in MODEL_NAMES:
+            return jsonify({'error': f'model_type必须是: {", ".join(MODEL_NAMES)}'}), 400
+            
+        job = training_scheduler.submit(
+            current_app._get_current_object(),
+            current_user.id,
+            data['model_type'],
+            data['health_records']
+        )
+        return jsonify(job.to_dict()), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _get_user_job(current_user, job_id):
+    """获取当前用户的训练任务，不存在或无权访问时返回错误响应"""
+    job = TrainingJob.query.get(job_id)
+    if job is None or job.user_id != current_user.id:
+        return None, (jsonify({'error': '任务不存在'}), 404)
+    # 执行任务的进程已退出时任务不会再有结果，标记为失败
+    return training_scheduler.reap_if_stale(job), None
+
+@bp.route('/api/algorithm/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_training_job(current_user, job_id):
+    """查询训练任务状态"""
+    job, error = _get_user_job(current_user, job_id)
+    if error:
+        return error
+    return jsonify(job.to_dict()), 200
+
+@bp.route('/api/algorithm/jobs/<job_id>/result', methods=['GET'])
+@token_required
+def get_training_job_result(current_user, job_id):
+    """获取训练任务结果"""
+    job, error = _get_user_job(current_user, job_id)
+    if error:
+        return error
+    if not job.finished:
+        return jsonify({'error': '任务尚未完成', 'status': job.status}), 409
+    if job.status != TrainingJob.SUCCEEDED:
+        return jsonify({'error': job.error or '任务已取消', 'status': job.status}), 400
+    return jsonify({'message': '模型训练成功', 'status': job.status, **job.get_result()}), 200
+
+@bp.route('/api/algorithm/jobs/<job_id>/cancel', methods=['POST'])
+@token_required
+def cancel_training_job(current_user, job_id):
+    """取消训练任务"""
+    job, error = _get_user_job(current_user, job_id)
+    if error:
+        return error
+    if not training_scheduler.cancel(job.id):
+        return jsonify({'error': '任务已结束，无法取消', 'status': job.status}), 409
+    return jsonify({'message': '任务已取消', 'status': TrainingJob.CANCELLED}), 200
+
 @bp.route('/api/algorithm/predict/risk', methods=['POST'])
 @token_required
-def predict_disease_risk():
+def predict_disease_risk(current_user):
     """预测疾病风险"""
     try:
         data = request.get_json()
@@ -56,9 +127,46 @@ def predict_disease_risk():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/algorithm/predict/risk/batch', methods=['POST'])
+@token_required
+def predict_disease_risk_batch(current_user):
+    """批量预测疾病风险，按块计算并以NDJSON逐条返回结果，每次只持有一块的预测结果"""
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('health_records'), list):
+            return jsonify({'error': '缺少健康记录数据'}), 400
+            
+        health_records = data['health_records']
+        if len(health_records) > Config.PREDICT_MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'单次最多预测{Config.PREDICT_MAX_BATCH_SIZE}条记录'
+            }), 400
+            
+        chunks = algorithm_service.iter_disease_risk_batch(health_records, Config.PREDICT_CHUNK_SIZE)
+        if chunks is None:
+            return jsonify({'error': '模型未训练'}), 400
+        # 第一块在开始响应前计算，数据有误时仍可返回400
+        first = next(chunks, [])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+            
+    def generate():
+        index = 0
+        try:
+            for chunk in itertools.chain([first], chunks):
+                for prediction in chunk:
+                    yield json.dumps({'index': index, **prediction}) + '\n'
+                    index += 1
+        except Exception as e:
+            # 响应已经开始，以最后一行报告错误
+            current_app.logger.error(f"批量预测疾病风险失败: {str(e)}")
+            yield json.dumps({'error': str(e)}) + '\n'
+            
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @bp.route('/api/algorithm/assess/health', methods=['POST'])
 @token_required
-def assess_health_status():
+def assess_health_status(current_user):
     """评估健康状态"""
     try:
         data = request.get_json()
@@ -69,6 +177,21 @@ def assess_health_status():
         if 'error' in result:
             return jsonify(result), 400
             
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/algorithm/assess/health', methods=['GET'])
+@token_required
+def assess_user_health_status(current_user):
+    """根据当前用户已保存的全部健康记录评估健康状态"""
+    try:
+        result = algorithm_service.assess_user_health_status(current_user.id)
+        # 提交首次读取时重建的统计量
+        db.session.commit()
+        if 'error' in result:
+            return jsonify(result), 404
+            
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
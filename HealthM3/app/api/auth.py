@@ -1,34 +1,13 @@
 # 用户认证API
-from functools import wraps
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 import jwt
 from app.models.user import User
 from app import db
+from app.utils.auth import token_required
 
 bp = Blueprint('auth', __name__)
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-            
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-            
-        try:
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
-        except:
-            return jsonify({'message': 'Token is invalid!'}), 401
-            
-        return f(current_user, *args, **kwargs)
-        
-    return decorated
-
 @bp.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -56,7 +56,7 @@ def login():
 @bp.route('/api/auth/profile', methods=['GET'])
 @token_required
 def get_profile(current_user):
-    user = User.query.get(current_user)
+    user = User.query.get(current_user.id)
     if not user:
         return jsonify({'error': '用户不存在'}), 404
         
@@ -1,12 +1,13 @@
 # 数据收集API
 from flask import Blueprint, request, jsonify
-from app.services.data_collection import DataCollectionService
 from app.api.auth import token_required
-import pandas as pd
+from app import db
+from app.utils.lazy import LazyService
+from app.config import Config
 import json
 
 bp = Blueprint('data_collection', __name__)
-data_service = DataCollectionService()
+data_service = LazyService('app.services.data_collection:DataCollectionService')
 
 @bp.route('/api/data/hospital', methods=['POST'])
 @token_required
@@ -17,10 +18,14 @@ def fetch_hospital_data(current_user):
         api_url = data.get('api_url')
         params = data.get('params', {})
         
-        if not api_url:
+        # 也可以一次传入多个接口: sources=[{"api_url": ..., "params": {...}}, ...]
+        sources = [(source.get('api_url'), source.get('params', {})) for source in data.get('sources', [])]
+        if api_url:
+            sources.insert(0, (api_url, params))
+        if not sources or not all(url for url, _ in sources):
             return jsonify({'error': '缺少API地址'}), 400
             
-        df = data_service.fetch_hospital_data(api_url, params)
+        df = data_service.fetch_hospital_sources(sources)
         if df.empty:
             return jsonify({'error': '获取数据失败'}), 400
             
@@ -64,16 +69,23 @@ def fetch_wearable_data(current_user):
 @token_required
 def preprocess_data(current_user):
     """数据预处理"""
+    import pandas as pd
+    from app.services.data_collection import OUTLIER_METHODS
+    
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': '缺少数据'}), 400
             
+        outlier_method = request.args.get('outlier_method')
+        if outlier_method and outlier_method not in OUTLIER_METHODS:
+            return jsonify({'error': f'outlier_method必须是{"、".join(OUTLIER_METHODS)}之一'}), 400
+            
         # 将JSON数据转换为DataFrame
         df = pd.DataFrame(data)
         
         # 数据预处理
-        df = data_service.preprocess_data(df)
+        df = data_service.preprocess_data(df, outlier_method=outlier_method)
         
         return jsonify({
             'message': '数据预处理成功',
@@ -100,4 +112,41 @@ def analyze_sentiment(current_user):
             'result': result
         })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/data/sentiment/batch', methods=['POST'])
+@token_required
+def analyze_sentiment_batch(current_user):
+    """批量情感分析"""
+    try:
+        data = request.get_json() or {}
+        texts = data.get('texts')
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': '缺少文本列表'}), 400
+        if len(texts) > Config.SENTIMENT_MAX_BATCH_SIZE:
+            return jsonify({'error': f'单次最多分析{Config.SENTIMENT_MAX_BATCH_SIZE}条文本'}), 400
+            
+        results = data_service.analyze_sentiment_batch(texts)
+        
+        return jsonify({
+            'message': '情感分析成功',
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/data/mental-health', methods=['GET'])
+@token_required
+def assess_mental_health(current_user):
+    """根据当前用户已保存的情绪评分评估心理健康"""
+    try:
+        result = data_service.assess_user_mental_health(current_user.id)
+        # 提交首次读取时重建的统计量
+        db.session.commit()
+        if not result:
+            return jsonify({'error': '没有情绪评分记录'}), 404
+            
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,43 +1,86 @@
 # 联邦学习API
-from flask import Blueprint, request, jsonify
-from app.services.federated_learning import FederatedLearning
+from flask import Blueprint, Response, request, jsonify
 from app.models.user import HealthRecord
 from app import db
 from app.api.auth import token_required
+from app.utils.lazy import LazyService
 
 bp = Blueprint('federated_learning', __name__)
-fl_service = FederatedLearning()
+TRAINING_FIELDS = ('heart_rate', 'systolic_bp', 'diastolic_bp', 'blood_sugar', 'weight', 'sleep_hours', 'mood_score')
+fl_service = LazyService('app.services.federated_learning:FederatedLearning')
 
 @bp.route('/api/fl/train', methods=['POST'])
 @token_required
 def train_local_model(current_user):
-    """训练本地模型"""
-    health_records = HealthRecord.query.filter_by(user_id=current_user.id).all()
-    records_data = [record.to_dict() for record in health_records]
+    """训练本地模型
+
+    默认以JSON返回参数；format=binary时返回二进制编码，可选参数：
+    dtype=float32/float16，delta=1只传输与当前全局模型的差，top_k=k只保留k个最大的差值。
+    """
+    from app.services.federated_codec import MIMETYPE, encode_update
+    binary = request.args.get('format') == 'binary'
+    dtype = request.args.get('dtype', 'float32')
+    delta = request.args.get('delta', '0').lower() in ('1', 'true', 'yes')
+    top_k = request.args.get('top_k', type=int)
+    
+    # 差分的基准是训练前的全局模型
+    base = fl_service.global_parameters() if binary and (delta or top_k) else None
+    
+    # 只读取特征所需的列，不构建ORM对象
+    records_data = HealthRecord.query_for_user(current_user.id) \
+        .with_entities(*[getattr(HealthRecord, field) for field in TRAINING_FIELDS]) \
+        .all()
     
     local_model_params = fl_service.train_local_model(records_data)
     if local_model_params is None:
         return jsonify({'error': '没有足够的训练数据'}), 400
-        
-    return jsonify(local_model_params)
+    
+    if not binary:
+        return jsonify(local_model_params)
+    try:
+        body = encode_update(local_model_params, dtype=dtype, base=base, top_k=top_k)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = Response(body, mimetype=MIMETYPE)
+    if local_model_params['model_version'] is not None:
+        response.headers['X-Model-Version'] = local_model_params['model_version']
+    return response
 
 @bp.route('/api/fl/update', methods=['POST'])
 @token_required
 def update_global_model(current_user):
-    """更新全局模型参数"""
-    data = request.get_json()
+    """提交本地模型参数，计入当前聚合轮次；本轮达到提交条件时更新全局模型"""
+    from app.services.federated_codec import MIMETYPE
+    from app.services.federated_rounds import DuplicateUpdateError
+    
+    # 二进制编码的更新直接在请求体上解码，不经过JSON
+    if request.mimetype == MIMETYPE:
+        try:
+            data = fl_service.decode_update(request.get_data())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        data = request.get_json()
     
-    if not all(key in data for key in ['model_weights', 'intercept', 'scaler_mean', 'scaler_scale']):
+    if not data or not all(key in data for key in ['model_weights', 'intercept', 'scaler_mean']) \
+            or not ('scaler_scale' in data or 'scaler_var' in data):
         return jsonify({'error': '缺少必要的模型参数'}), 400
         
-    fl_service.update_global_model(
-        data['model_weights'],
-        data['intercept'],
-        data['scaler_mean'],
-        data['scaler_scale']
-    )
-    
-    return jsonify({'message': '全局模型更新成功'})
+    try:
+        result = fl_service.submit_update(current_user.id, data)
+    except DuplicateUpdateError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    message = '全局模型更新成功' if result['committed'] else f"已计入第{result['round_id']}轮聚合"
+    return jsonify(dict(result, message=message))
+
+@bp.route('/api/fl/round', methods=['GET'])
+@token_required
+def get_round_status(current_user):
+    """查询聚合轮次状态"""
+    return jsonify(fl_service.round_status())
 
 @bp.route('/api/fl/predict', methods=['POST'])
 @token_required
@@ -1,13 +1,13 @@
 # 健康数据API
 from flask import Blueprint, request, jsonify
 from app.models.user import User, HealthRecord
-from app.services.health_recommendation import HealthRecommendationService
 from app import db
 from datetime import datetime
 from app.api.auth_api import token_required
+from app.utils.lazy import LazyService
 
 bp = Blueprint('health', __name__)
-recommender = HealthRecommendationService()
+recommender = LazyService('app.services.health_recommendation:HealthRecommendationService')
 
 @bp.route('/records', methods=['POST'])
 @token_required
@@ -35,7 +35,7 @@ def add_health_record(current_user):
 @bp.route('/records', methods=['GET'])
 @token_required
 def get_health_records(current_user):
-    records = HealthRecord.query.filter_by(user_id=current_user.id).all()
+    records = HealthRecord.query_for_user(current_user.id).all()
     return jsonify([record.to_dict() for record in records]), 200
 
 @bp.route('/records/<int:record_id>', methods=['GET'])
@@ -86,7 +86,7 @@ def get_health_recommendation(current_user, user_id):
         
     try:
         # 获取用户最近的健康记录
-        health_record = HealthRecord.query.filter_by(user_id=user_id).order_by(HealthRecord.recorded_at.desc()).first()
+        health_record = HealthRecord.latest_for_user(user_id)
         
         if not health_record:
             return jsonify({'error': '未找到健康记录'}), 404
@@ -1,11 +1,119 @@
 # 健康记录API
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from app.models.user import HealthRecord
 from app import db
 from app.api.auth_api import token_required
+from app.config import Config
+from app.services import health_statistics, health_aggregates
+from app.services.record_events import notify_records_changed
+from datetime import datetime, timezone
+import base64
+import json
+import csv
+import io
 
 bp = Blueprint('health_record', __name__, url_prefix='/api/health')
 
+REQUIRED_FIELDS = ['heart_rate', 'blood_pressure', 'blood_sugar',
+                   'weight', 'sleep_hours', 'mood_score']
+INTEGER_FIELDS = ['heart_rate', 'mood_score']
+FLOAT_FIELDS = ['blood_sugar', 'weight', 'sleep_hours']
+
+
+def _parse_datetime(value):
+    """解析ISO格式时间参数；带时区的时间转换为UTC的naive时间，与recorded_at的存储方式一致"""
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _encode_cursor(record):
+    """将(recorded_at, id)编码为不透明游标"""
+    payload = json.dumps([record.recorded_at.isoformat(), record.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """解码游标为(recorded_at, id)"""
+    recorded_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return _parse_datetime(recorded_at), int(record_id)
+
+
+def _parse_fields(value):
+    """解析字段投影参数，返回字段列表；非法字段抛出ValueError"""
+    if not value:
+        return list(HealthRecord.FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    invalid = [field for field in fields if field not in HealthRecord.FIELDS]
+    if invalid:
+        raise ValueError(f'未知字段: {", ".join(invalid)}')
+    return fields
+
+
+def _row_to_dict(row, fields):
+    """将投影查询的结果行转换为字典"""
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        item[field] = value.isoformat() if isinstance(value, datetime) else value
+    return item
+
+def _validate_batch(records):
+    """向量化校验一批健康记录
+    
+    Returns:
+        (df, errors)：df为规范化后的数据，errors为{下标: [错误信息]}
+    """
+    import numpy as np
+    import pandas as pd
+    from app.services.feature_extraction import parse_blood_pressure
+    
+    is_dict = np.array([isinstance(record, dict) for record in records], dtype=bool)
+    df = pd.DataFrame.from_records([record if isinstance(record, dict) else {} for record in records],
+                                   index=range(len(records)))
+    checks = [(~is_dict, '记录必须是对象')]
+    
+    for field in REQUIRED_FIELDS:
+        if field not in df.columns:
+            df[field] = None
+        missing = df[field].isna().to_numpy() & is_dict
+        checks.append((missing, f'缺少必需字段: {field}'))
+    
+    for field in INTEGER_FIELDS + FLOAT_FIELDS:
+        present = df[field].notna().to_numpy()
+        values = pd.to_numeric(df[field], errors='coerce')
+        checks.append((present & values.isna().to_numpy(), f'字段类型错误: {field}'))
+        if field in INTEGER_FIELDS:
+            checks.append(((values.notna() & (values % 1 != 0)).to_numpy(), f'字段必须为整数: {field}'))
+        df[field] = values
+    
+    systolic, diastolic = parse_blood_pressure(df['blood_pressure'])
+    bp_invalid = df['blood_pressure'].notna().to_numpy() & (np.isnan(systolic) | np.isnan(diastolic))
+    checks.append((bp_invalid, '血压格式错误，应为"收缩压/舒张压"'))
+    df['systolic_bp'] = np.round(systolic)
+    df['diastolic_bp'] = np.round(diastolic)
+    
+    if 'recorded_at' in df.columns:
+        recorded_at = pd.to_datetime(df['recorded_at'], errors='coerce', format='ISO8601', utc=True)
+        checks.append((df['recorded_at'].notna().to_numpy() & recorded_at.isna().to_numpy(), '时间格式错误: recorded_at'))
+    else:
+        recorded_at = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns, UTC]')
+    # 统一存为UTC的naive时间，缺省为当前时间
+    df['recorded_at'] = recorded_at.dt.tz_convert(None).fillna(pd.Timestamp(datetime.utcnow()))
+    
+    # 只对出错的行收集错误信息
+    failed = np.zeros(len(records), dtype=bool)
+    for mask, _ in checks:
+        failed |= mask
+    errors = {}
+    for index in np.flatnonzero(failed).tolist():
+        errors[index] = [message for mask, message in checks if mask[index]]
+    return df, errors
+
+
 @bp.route('/records', methods=['POST'])
 @token_required
 def add_health_record(current_user):
@@ -37,13 +145,198 @@ def add_health_record(current_user):
         db.session.rollback()
         return jsonify({'error': f'添加健康记录失败: {str(e)}'}), 500
 
+@bp.route('/records/bulk', methods=['POST'])
+@token_required
+def add_health_records_bulk(current_user):
+    """批量添加健康记录，单个事务批量插入，逐条返回校验错误"""
+    data = request.get_json()
+    if not data or not isinstance(data.get('records'), list):
+        return jsonify({'error': '缺少记录列表'}), 400
+    
+    records = data['records']
+    if len(records) > Config.RECORDS_BULK_MAX_SIZE:
+        return jsonify({'error': f'单次最多写入{Config.RECORDS_BULK_MAX_SIZE}条记录'}), 400
+    
+    df, errors = _validate_batch(records)
+    valid = df.drop(index=list(errors))
+    
+    rows = [
+        {
+            'user_id': current_user.id,
+            'heart_rate': int(heart_rate),
+            'blood_pressure': str(blood_pressure),
+            'systolic_bp': int(systolic_bp),
+            'diastolic_bp': int(diastolic_bp),
+            'blood_sugar': float(blood_sugar),
+            'weight': float(weight),
+            'sleep_hours': float(sleep_hours),
+            'mood_score': int(mood_score),
+            'recorded_at': recorded_at.to_pydatetime()
+        }
+        for heart_rate, blood_pressure, systolic_bp, diastolic_bp, blood_sugar, weight, sleep_hours, mood_score, recorded_at in zip(
+            valid['heart_rate'], valid['blood_pressure'], valid['systolic_bp'], valid['diastolic_bp'],
+            valid['blood_sugar'], valid['weight'], valid['sleep_hours'], valid['mood_score'], valid['recorded_at']
+        )
+    ]
+    
+    try:
+        if rows:
+            db.session.execute(HealthRecord.__table__.insert(), rows)
+            # Core批量插入不触发ORM事件，需要手动更新累计统计量并通知缓存失效
+            health_aggregates.record_rows_inserted(rows)
+            db.session.commit()
+            notify_records_changed([current_user.id])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'批量添加健康记录失败: {str(e)}'}), 500
+    
+    result = {
+        'message': '批量添加完成',
+        'inserted': len(rows),
+        'failed': len(errors),
+        'errors': [{'index': index, 'errors': messages} for index, messages in errors.items()]
+    }
+    return jsonify(result), (201 if rows or not errors else 400)
+
 @bp.route('/records', methods=['GET'])
 @token_required
 def get_health_records(current_user):
+    """分页获取健康记录
+    
+    查询参数:
+        limit: 每页条数
+        cursor: 上一页返回的next_cursor
+        from, to: ISO格式时间范围[from, to)
+        fields: 逗号分隔的返回字段
+        order: asc（默认）或desc
+    """
     try:
-        records = HealthRecord.query.filter_by(user_id=current_user.id).all()
+        limit = request.args.get('limit', Config.RECORDS_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, Config.RECORDS_MAX_PAGE_SIZE))
+        descending = request.args.get('order', 'asc') == 'desc'
+        start = _parse_datetime(request.args.get('from'))
+        end = _parse_datetime(request.args.get('to'))
+        fields = _parse_fields(request.args.get('fields'))
+        cursor = request.args.get('cursor')
+        after = _decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'查询参数错误: {str(e)}'}), 400
+    
+    try:
+        # 只查询需要的列，游标所需的recorded_at和id总是带上
+        columns = list(dict.fromkeys(fields + ['recorded_at', 'id']))
+        query = HealthRecord.query_for_user(current_user.id, start, end, after, descending) \
+            .with_entities(*[getattr(HealthRecord, column) for column in columns])
+        
+        # 多取一条用来判断是否还有下一页
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
         return jsonify({
-            'records': [record.to_dict() for record in records]
+            'records': [_row_to_dict(row, fields) for row in rows],
+            'next_cursor': _encode_cursor(rows[-1]) if has_more else None
         }), 200
     except Exception as e:
-        return jsonify({'error': f'获取健康记录失败: {str(e)}'}), 500 
\ No newline at end of file
+        return jsonify({'error': f'获取健康记录失败: {str(e)}'}), 500
+
+
+@bp.route('/records/export', methods=['GET'])
+@token_required
+def export_health_records(current_user):
+    """流式导出全部健康记录
+    
+    查询参数:
+        format: ndjson（默认）或csv
+        from, to: ISO格式时间范围[from, to)
+        fields: 逗号分隔的导出字段
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            raise ValueError(f'不支持的导出格式: {export_format}')
+        start = _parse_datetime(request.args.get('from'))
+        end = _parse_datetime(request.args.get('to'))
+        fields = _parse_fields(request.args.get('fields'))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'查询参数错误: {str(e)}'}), 400
+    
+    # 服务端游标分批读取，内存占用与历史长度无关
+    rows = HealthRecord.query_for_user(current_user.id, start, end) \
+        .with_entities(*[getattr(HealthRecord, field) for field in fields]) \
+        .yield_per(Config.RECORDS_EXPORT_CHUNK_SIZE)
+    
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(_row_to_dict(row, fields)) + '\n'
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for index, row in enumerate(rows, 1):
+            item = _row_to_dict(row, fields)
+            writer.writerow([item[field] for field in fields])
+            # 每攒够一批行输出一次，避免逐行产生小块
+            if index % Config.RECORDS_EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+    
+    if export_format == 'csv':
+        generator, mimetype = generate_csv(), 'text/csv'
+    else:
+        generator, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(generator),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=health_records.{export_format}'}
+    )
+
+
+def _parse_days():
+    """解析时间窗口参数days"""
+    days = request.args.get('days', Config.STATISTICS_DEFAULT_DAYS, type=int)
+    if days is None or not 1 <= days <= Config.STATISTICS_MAX_DAYS:
+        raise ValueError(f'days必须在1到{Config.STATISTICS_MAX_DAYS}之间')
+    return days
+
+
+@bp.route('/visualization/<kind>/<int:user_id>', methods=['GET'])
+@token_required
+def get_visualization_data(current_user, kind, user_id):
+    """健康数据统计序列，供前端绘图
+    
+    kind:
+        trends: 按日/周分桶的均值、最小值、最大值
+        correlation: 指标间的相关系数矩阵
+        distribution: 指标的分位数和直方图
+    查询参数:
+        days: 统计最近多少天的记录
+        bucket: day（默认）或week，仅trends使用
+    """
+    if current_user.id != user_id:
+        return jsonify({'error': '无权访问其他用户的健康数据'}), 403
+    if kind not in ('trends', 'correlation', 'distribution'):
+        return jsonify({'error': f'未知的统计类型: {kind}'}), 404
+    
+    try:
+        days = _parse_days()
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in health_statistics.BUCKETS:
+            raise ValueError(f'不支持的分桶方式: {bucket}')
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'查询参数错误: {str(e)}'}), 400
+    
+    try:
+        if kind == 'trends':
+            result = health_statistics.get_trends(user_id, days, bucket)
+        elif kind == 'correlation':
+            result = health_statistics.get_correlation(user_id, days)
+        else:
+            result = health_statistics.get_distribution(user_id, days)
+        return jsonify(dict(result, status='success')), 200
+    except Exception as e:
+        return jsonify({'error': f'统计健康数据失败: {str(e)}'}), 500
@@ -1,9 +1,12 @@
 from flask import Blueprint, jsonify
 from app.models.user import HealthRecord
+from app.models.precomputed_recommendation import PrecomputedRecommendation
 from app.api.auth_api import token_required
-from app.services.health_recommendation import HealthRecommendationService
+from app.utils.lazy import LazyService
+from app.services.recommendation_cache import recommendation_cache
 
 bp = Blueprint('recommendation', __name__, url_prefix='/api/recommendation')
+recommendation_service = LazyService('app.services.health_recommendation:HealthRecommendationService')
 
 @bp.route('/health/<int:user_id>', methods=['GET'])
 @token_required
@@ -12,25 +15,36 @@ def get_health_recommendation(current_user, user_id):
         return jsonify({'error': '无权访问其他用户的健康建议'}), 403
         
     try:
-        # 获取用户最近的健康记录
-        health_record = HealthRecord.query.filter_by(user_id=user_id).order_by(HealthRecord.recorded_at.desc()).first()
+        # 读取记录之前取得失效代数，计算期间记录被修改时结果不写入缓存
+        generation = recommendation_cache.generation(user_id)
+        # 以最新记录的ID为版本号，只走索引，不读取整行
+        record_id = HealthRecord.latest_id_for_user(user_id)
         
-        if not health_record:
+        if record_id is None:
             return jsonify({'error': '未找到健康记录'}), 404
-            
-        # 创建健康推荐服务实例
-        recommendation_service = HealthRecommendationService()
-        
-        # 分析健康指标
-        analysis = recommendation_service.analyze_health_metrics(health_record)
         
-        # 生成个性化建议
-        recommendations = recommendation_service.generate_recommendations(analysis)
+        result = recommendation_cache.get(user_id, record_id)
+        if result is None:
+            # 批处理任务已基于同一条最新记录生成过结果时直接使用
+            result = PrecomputedRecommendation.get_current(user_id, record_id)
+            if result is not None:
+                recommendation_cache.set(user_id, record_id, result, generation)
+        if result is None:
+            health_record = HealthRecord.query.get(record_id)
+            
+            # 分析健康指标
+            analysis = recommendation_service.analyze_health_metrics(health_record)
+            
+            # 生成个性化建议
+            recommendations = recommendation_service.generate_recommendations(analysis)
+            
+            result = {
+                'analysis': analysis,
+                'recommendations': recommendations
+            }
+            recommendation_cache.set(user_id, record_id, result, generation)
         
-        return jsonify({
-            'analysis': analysis,
-            'recommendations': recommendations
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({'error': f'获取健康建议失败: {str(e)}'}), 500 
\ No newline at end of file
@@ -0,0 +1,138 @@
+# 数据库初始化：由Alembic迁移驱动，可重复执行
+import os
+import fcntl
+import logging
+from contextlib import contextmanager
+
+import click
+from flask.cli import with_appcontext
+
+from alembic.config import Config as AlembicConfig
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from alembic import command
+from sqlalchemy import inspect
+
+from app import db, MIGRATIONS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def _alembic_config() -> AlembicConfig:
+    """不读取alembic.ini，避免迁移时重新配置应用的日志"""
+    config = AlembicConfig()
+    config.set_main_option('script_location', MIGRATIONS_DIR)
+    return config
+
+
+def _head_revisions():
+    return set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+
+
+def _current_revisions(connection):
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def schema_is_current() -> bool:
+    """数据库版本是否已是最新迁移"""
+    with db.engine.connect() as connection:
+        return _current_revisions(connection) == _head_revisions()
+
+
+@contextmanager
+def _migration_lock(app):
+    """同一台机器上的多个worker同时启动时，只允许一个执行迁移"""
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'migrate.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _adopt_legacy_schema():
+    """接管由旧版db.create_all()创建、没有版本记录的数据库
+
+    旧版启动时建出的表结构与初始迁移一致，先标记为初始版本，再正常升级，已有数据保持不变。
+    """
+    config = _alembic_config()
+    base = ScriptDirectory.from_config(config).get_base()
+    logger.warning(f"数据库没有迁移版本记录，标记为初始版本 {base} 后升级")
+    command.stamp(config, base)
+    command.upgrade(config, 'head')
+
+
+def bootstrap_database(app) -> bool:
+    """把数据库升级到最新迁移版本；已是最新时不执行任何DDL
+
+    Returns:
+        是否执行了迁移
+    """
+    with app.app_context():
+        if schema_is_current():
+            return False
+
+        with _migration_lock(app):
+            # 等锁期间其他worker可能已经完成迁移
+            with db.engine.connect() as connection:
+                current = _current_revisions(connection)
+                tables = set(inspect(connection).get_table_names())
+            if current == _head_revisions():
+                return False
+
+            if not current and 'users' in tables:
+                _adopt_legacy_schema()
+            else:
+                logger.info(f"升级数据库: {sorted(current) or '空库'} -> {sorted(_head_revisions())}")
+                command.upgrade(_alembic_config(), 'head')
+        return True
+
+
+def seed_test_user(username='test_user', email='test@test.com', password='test123'):
+    """创建测试用户（已存在时跳过），返回用户对象"""
+    from app.models import User
+
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        user = User(username=username, email=email)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
+@click.command('seed')
+@click.option('--records', default=0, show_default=True, help='为测试用户生成的随机健康记录条数')
+@with_appcontext
+def seed_command(records):
+    """创建测试用户（test@test.com / test123），可选生成随机健康记录"""
+    user = seed_test_user()
+    click.echo(f"测试用户: {user.email} (id={user.id})")
+
+    if records:
+        import random
+        from datetime import datetime, timedelta
+        from app.models import HealthRecord
+        from app.services import health_aggregates
+
+        now = datetime.utcnow()
+        rows = []
+        for i in range(records):
+            systolic, diastolic = random.randint(90, 140), random.randint(60, 90)
+            rows.append({
+                'user_id': user.id,
+                'heart_rate': random.randint(60, 100),
+                'blood_pressure': f"{systolic}/{diastolic}",
+                'systolic_bp': systolic,
+                'diastolic_bp': diastolic,
+                'blood_sugar': round(random.uniform(3.9, 6.1), 2),
+                'weight': round(random.uniform(50, 80), 1),
+                'sleep_hours': round(random.uniform(6, 9), 1),
+                'mood_score': random.randint(1, 10),
+                'recorded_at': now - timedelta(days=i)
+            })
+        db.session.execute(HealthRecord.__table__.insert(), rows)
+        health_aggregates.record_rows_inserted(rows)
+        db.session.commit()
+        click.echo(f"已添加 {records} 条健康记录")
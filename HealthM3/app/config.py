@@ -6,13 +6,26 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-123'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-123'
     
-    # 数据库配置
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///health.db'
+    # 数据库配置（mysql:// 会自动使用pymysql驱动）
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///health.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 连接池：大小、溢出连接数、获取连接超时（秒）、取用前探活、连接回收周期（秒，0表示不回收）
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # SQLite连接参数：WAL日志模式、同步级别、锁等待毫秒数（留空表示使用SQLite默认值）
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL') or None
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL') or None
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
     
     # JWT配置
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # 用户身份缓存（条目数上限、存活秒数）；缓存按进程独立，用户被删除后只读请求最多在TTL秒内仍可通过
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+    TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
     
     # 邮件配置
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.example.com')
@@ -24,7 +37,92 @@ class Config:
     
     # 模型配置
     MODEL_DIR = 'app/models'
+    # 每个模型保留的历史版本数
+    MODEL_KEEP_VERSIONS = int(os.environ.get('MODEL_KEEP_VERSIONS', 5))
     
     # 算法配置
     DIABETES_THRESHOLD = 0.5
-    HYPERTENSION_THRESHOLD = 0.5 
\ No newline at end of file
+    HYPERTENSION_THRESHOLD = 0.5
+    
+    # 健康记录分页
+    RECORDS_PAGE_SIZE = int(os.environ.get('RECORDS_PAGE_SIZE', 100))
+    RECORDS_MAX_PAGE_SIZE = int(os.environ.get('RECORDS_MAX_PAGE_SIZE', 1000))
+    # 导出时每次从数据库游标读取的行数
+    RECORDS_EXPORT_CHUNK_SIZE = int(os.environ.get('RECORDS_EXPORT_CHUNK_SIZE', 1000))
+    
+    # 可视化统计：默认与最大时间窗口（天）、结果缓存条目数与存活秒数（缓存按进程独立，其他worker写入的记录最多延迟TTL秒可见）
+    STATISTICS_DEFAULT_DAYS = int(os.environ.get('STATISTICS_DEFAULT_DAYS', 30))
+    STATISTICS_MAX_DAYS = int(os.environ.get('STATISTICS_MAX_DAYS', 3650))
+    STATISTICS_CACHE_SIZE = int(os.environ.get('STATISTICS_CACHE_SIZE', 1024))
+    STATISTICS_CACHE_TTL = int(os.environ.get('STATISTICS_CACHE_TTL', 60))
+    
+    # 健康建议缓存：条目数、存活秒数；设置共享存储路径（本地SQLite文件）后同一台机器上的worker共用缓存
+    # 未设置共享存储时缓存只在本worker内失效，其他worker修改记录内容后最多TTL秒内仍返回旧结果
+    RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 10000))
+    RECOMMENDATION_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 300))
+    RECOMMENDATION_CACHE_PATH = os.environ.get('RECOMMENDATION_CACHE_PATH', '')
+    
+    # 全体用户建议批处理（flask refresh-recommendations）：进程数、每批用户数、进程启动方式
+    # worker进程只做计算、不访问数据库，可以使用fork
+    RECOMMENDATION_BATCH_WORKERS = int(os.environ.get('RECOMMENDATION_BATCH_WORKERS', os.cpu_count() or 1))
+    RECOMMENDATION_BATCH_CHUNK_SIZE = int(os.environ.get('RECOMMENDATION_BATCH_CHUNK_SIZE', 5000))
+    RECOMMENDATION_BATCH_MP_CONTEXT = os.environ.get('RECOMMENDATION_BATCH_MP_CONTEXT', 'fork')
+    
+    # 批量写入单次请求的最大记录数
+    RECORDS_BULK_MAX_SIZE = int(os.environ.get('RECORDS_BULK_MAX_SIZE', 5000))
+    
+    # 后台训练任务进程池（forkserver：子进程不继承父进程打开的SQLite连接，WAL模式下fork会导致磁盘I/O错误）
+    TRAINING_MAX_WORKERS = int(os.environ.get('TRAINING_MAX_WORKERS', max((os.cpu_count() or 2) // 2, 1)))
+    TRAINING_MP_CONTEXT = os.environ.get('TRAINING_MP_CONTEXT', 'forkserver')
+    
+    # 后台训练任务每个进程的并行度（-1表示使用全部CPU核），默认把CPU核平分给TRAINING_MAX_WORKERS个进程；
+    # 请求中同步训练固定为单线程。糖尿病模型后端
+    TRAINING_N_JOBS = int(os.environ.get('TRAINING_N_JOBS', max((os.cpu_count() or 1) // TRAINING_MAX_WORKERS, 1)))
+    DIABETES_MODEL_BACKEND = os.environ.get('DIABETES_MODEL_BACKEND', 'gradient_boosting')
+    # 训练任务续租间隔（秒）；超过租约时间未续租的任务视为执行进程已退出，标记为失败
+    TRAINING_HEARTBEAT_INTERVAL = float(os.environ.get('TRAINING_HEARTBEAT_INTERVAL', 5))
+    TRAINING_JOB_LEASE = float(os.environ.get('TRAINING_JOB_LEASE', 60))
+    
+    # 数据预处理的默认异常值检测方式（isolation_forest / robust / model）
+    PREPROCESS_OUTLIER_METHOD = os.environ.get('PREPROCESS_OUTLIER_METHOD', 'isolation_forest')
+    
+    # 流式预处理的分块行数和用于估计分位数的采样行数
+    PREPROCESS_CHUNK_SIZE = int(os.environ.get('PREPROCESS_CHUNK_SIZE', 50000))
+    PREPROCESS_SAMPLE_SIZE = int(os.environ.get('PREPROCESS_SAMPLE_SIZE', 100000))
+    
+    # 医院HIS接口抓取：并发数、超时（秒）、重试次数与退避系数、分页大小、NDJSON分块行数、单个接口最多抓取的页数
+    HOSPITAL_MAX_WORKERS = int(os.environ.get('HOSPITAL_MAX_WORKERS', 4))
+    HOSPITAL_TIMEOUT = float(os.environ.get('HOSPITAL_TIMEOUT', 30))
+    HOSPITAL_MAX_RETRIES = int(os.environ.get('HOSPITAL_MAX_RETRIES', 3))
+    HOSPITAL_BACKOFF_FACTOR = float(os.environ.get('HOSPITAL_BACKOFF_FACTOR', 0.5))
+    HOSPITAL_PAGE_SIZE = int(os.environ.get('HOSPITAL_PAGE_SIZE', 1000))
+    HOSPITAL_CHUNK_SIZE = int(os.environ.get('HOSPITAL_CHUNK_SIZE', 10000))
+    HOSPITAL_MAX_PAGES = int(os.environ.get('HOSPITAL_MAX_PAGES', 10000))
+    
+    # 情感分析：缓存条目数、进程池大小、超过多少条未命中文本才并行、进程启动方式、单次请求上限
+    # （forkserver：进程池不继承请求线程持有的锁和数据库连接）
+    SENTIMENT_CACHE_SIZE = int(os.environ.get('SENTIMENT_CACHE_SIZE', 100000))
+    SENTIMENT_MAX_WORKERS = int(os.environ.get('SENTIMENT_MAX_WORKERS', os.cpu_count() or 1))
+    SENTIMENT_PARALLEL_THRESHOLD = int(os.environ.get('SENTIMENT_PARALLEL_THRESHOLD', 2000))
+    SENTIMENT_MP_CONTEXT = os.environ.get('SENTIMENT_MP_CONTEXT', 'forkserver')
+    SENTIMENT_MAX_BATCH_SIZE = int(os.environ.get('SENTIMENT_MAX_BATCH_SIZE', 10000))
+    
+    # 联邦学习聚合轮次：达到多少个客户端即提交、第一个更新到达后多少秒截止、截止时至少需要的客户端数
+    FL_ROUND_QUORUM = int(os.environ.get('FL_ROUND_QUORUM', 3))
+    FL_ROUND_DEADLINE = int(os.environ.get('FL_ROUND_DEADLINE', 3600))
+    FL_ROUND_MIN_CLIENTS = int(os.environ.get('FL_ROUND_MIN_CLIENTS', 1))
+    # 单个客户端更新计入的样本数上限（同时不超过该用户的健康记录数）
+    FL_MAX_SAMPLES_PER_UPDATE = int(os.environ.get('FL_MAX_SAMPLES_PER_UPDATE', 100000))
+    # 轮次结束后发布全局模型超过多少秒仍未完成（发布失败或进程退出）即重新发布
+    FL_ROUND_PUBLISH_TIMEOUT = int(os.environ.get('FL_ROUND_PUBLISH_TIMEOUT', 300))
+    
+    # worker启动后是否立即预热服务（加载依赖、模型和词典），否则在首次请求时加载
+    PREWARM_SERVICES = os.environ.get('PREWARM_SERVICES', '0').lower() in ('1', 'true', 'yes')
+    
+    # 启动时自动把数据库升级到最新迁移版本；由部署流程单独执行 flask db upgrade 时可关闭
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1').lower() in ('1', 'true', 'yes')
+    
+    # 批量预测单次请求的最大记录数
+    PREDICT_MAX_BATCH_SIZE = int(os.environ.get('PREDICT_MAX_BATCH_SIZE', 10000)) 
+    # 批量预测每块的记录数，结果按块计算并流式返回
+    PREDICT_CHUNK_SIZE = int(os.environ.get('PREDICT_CHUNK_SIZE', 1000))
\ No newline at end of file
@@ -0,0 +1,62 @@
+# 数据库连接配置
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from app.config import Config
+
+
+def normalize_database_uri(uri: str) -> str:
+    """mysql:// 默认使用pymysql驱动"""
+    if uri.startswith('mysql://'):
+        return 'mysql+pymysql://' + uri[len('mysql://'):]
+    return uri
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def engine_options(uri: str) -> dict:
+    """根据数据库类型生成连接池参数"""
+    options = {'pool_pre_ping': Config.DB_POOL_PRE_PING}
+    if Config.DB_POOL_RECYCLE > 0:
+        options['pool_recycle'] = Config.DB_POOL_RECYCLE
+    if not is_sqlite(uri):
+        options['pool_size'] = Config.DB_POOL_SIZE
+        options['max_overflow'] = Config.DB_MAX_OVERFLOW
+        options['pool_timeout'] = Config.DB_POOL_TIMEOUT
+    return options
+
+
+def configure_sqlite(engine, journal_mode=None, synchronous=None, busy_timeout=None):
+    """在每个新的SQLite连接上设置PRAGMA
+
+    WAL模式下读写互不阻塞，synchronous=NORMAL在WAL下仍能保证一致性且减少fsync，
+    busy_timeout让并发写入在锁释放前等待而不是立即报错。
+    """
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if busy_timeout is not None:
+                cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout)}')
+            if journal_mode:
+                cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+            if synchronous:
+                cursor.execute(f'PRAGMA synchronous = {synchronous}')
+        finally:
+            cursor.close()
+
+
+def init_engine(app, db):
+    """创建应用的数据库引擎并按配置挂载SQLite PRAGMA"""
+    engine = db.get_engine(app)
+    if engine.dialect.name == 'sqlite':
+        config = app.config
+        configure_sqlite(
+            engine,
+            journal_mode=config.get('SQLITE_JOURNAL_MODE', Config.SQLITE_JOURNAL_MODE),
+            synchronous=config.get('SQLITE_SYNCHRONOUS', Config.SQLITE_SYNCHRONOUS),
+            busy_timeout=config.get('SQLITE_BUSY_TIMEOUT', Config.SQLITE_BUSY_TIMEOUT)
+        )
+    return engine
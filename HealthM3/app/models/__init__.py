@@ -1,3 +1,8 @@
 from app.models.user import User, HealthRecord
+from app.models.training_job import TrainingJob
+from app.models.health_aggregate import HealthAggregate
+from app.models.precomputed_recommendation import PrecomputedRecommendation
+from app.models.federated_round import FederatedRound, FederatedRoundUpdate
 
-__all__ = ['User', 'HealthRecord'] 
\ No newline at end of file
+__all__ = ['User', 'HealthRecord', 'TrainingJob', 'HealthAggregate', 'PrecomputedRecommendation',
+           'FederatedRound', 'FederatedRoundUpdate']
\ No newline at end of file
@@ -0,0 +1,58 @@
+# 联邦学习聚合轮次
+from app import db
+from datetime import datetime
+
+class FederatedRound(db.Model):
+    """一轮FedAvg聚合的运行状态
+
+    只保存按样本数加权的累计量（系数和截距的加权和、标准化器合并后的均值和
+    离差平方和），大小与模型参数相同，与参与的客户端数无关。数组以float64
+    字节存储；revision用于乐观并发控制，多个worker可同时提交更新。
+    """
+    __tablename__ = 'federated_rounds'
+
+    OPEN = 'open'
+    COMMITTING = 'committing'  # 已结束、正在发布全局模型
+    COMMITTED = 'committed'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 轮次编号
+    status = db.Column(db.String(16), nullable=False, default=OPEN, index=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    client_count = db.Column(db.Integer, nullable=False, default=0)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    coef_shape = db.Column(db.String(32), nullable=False)  # 如 "1,7"
+    coef_sum = db.Column(db.LargeBinary, nullable=False)
+    intercept_sum = db.Column(db.LargeBinary, nullable=False)
+    scaler_mean = db.Column(db.LargeBinary, nullable=False)
+    scaler_m2 = db.Column(db.LargeBinary, nullable=False)
+    model_version = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deadline = db.Column(db.DateTime, nullable=False)
+    committed_at = db.Column(db.DateTime)  # 发布中时为认领时间
+
+    def __repr__(self):
+        return f'<FederatedRound {self.id} {self.status} clients={self.client_count}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'client_count': self.client_count,
+            'sample_count': self.sample_count,
+            'model_version': self.model_version,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'deadline': self.deadline.isoformat() if self.deadline else None,
+            'committed_at': self.committed_at.isoformat() if self.committed_at else None
+        }
+
+class FederatedRoundUpdate(db.Model):
+    """客户端在某一轮提交过的更新，每个用户每轮只计入一次"""
+    __tablename__ = 'federated_round_updates'
+
+    round_id = db.Column(db.Integer, db.ForeignKey('federated_rounds.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FederatedRoundUpdate round={self.round_id} user={self.user_id}>'
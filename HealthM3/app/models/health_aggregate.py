@@ -0,0 +1,31 @@
+# 健康指标的按用户累计统计量
+from app import db
+from datetime import datetime
+
+class HealthAggregate(db.Model):
+    """某个用户某项指标的累计和，增删改记录时增量维护
+
+    x为记录时间相对origin_x的天数，y为指标值；由这些和可在O(1)时间内得到
+    均值、标准差和最小二乘趋势，不必每次读取全部历史记录。origin_x取重建时
+    用户最早一条记录的时间，使x接近0，避免sum_xx等累计和相减时损失精度。
+    时间（origin_x、min_x、max_x）均以自EPOCH起的天数表示。
+    """
+    __tablename__ = 'health_aggregates'
+    
+    EPOCH = datetime(2000, 1, 1)
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    metric = db.Column(db.String(32), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    # 双精度：MySQL上db.Float默认为单精度FLOAT
+    origin_x = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    sum_x = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    sum_xx = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    sum_y = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    sum_yy = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    sum_xy = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    min_x = db.Column(db.Float(precision=53))
+    max_x = db.Column(db.Float(precision=53))
+    
+    def __repr__(self):
+        return f'<HealthAggregate {self.user_id} {self.metric} n={self.count}>'
@@ -0,0 +1,48 @@
+# 离线预计算的健康建议
+from app import db
+from datetime import datetime
+import hashlib
+import json
+
+# 影响健康建议的记录字段，内容指纹由这些字段计算
+STAMP_FIELDS = ('heart_rate', 'blood_pressure', 'systolic_bp', 'diastolic_bp',
+                'blood_sugar', 'weight', 'sleep_hours', 'mood_score')
+
+
+def record_stamp(values) -> str:
+    """记录内容的指纹；values为字典或带有对应属性的行"""
+    if not isinstance(values, dict):
+        values = {field: getattr(values, field) for field in STAMP_FIELDS}
+    content = json.dumps([values.get(field) for field in STAMP_FIELDS])
+    return hashlib.sha1(content.encode()).hexdigest()
+
+class PrecomputedRecommendation(db.Model):
+    """批处理任务为每个用户预先生成的分析和建议
+
+    record_id为生成时使用的最新记录，record_stamp为该记录当时内容的指纹。
+    批处理读取记录后、写入结果前记录被修改时，写入的结果与记录的当前内容
+    不一致，读取时比较指纹即可发现。
+    """
+    __tablename__ = 'precomputed_recommendations'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    record_id = db.Column(db.Integer, nullable=False)
+    record_stamp = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON: {'analysis': ..., 'recommendations': [...]}
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PrecomputedRecommendation {self.user_id} record={self.record_id}>'
+    
+    @classmethod
+    def get_current(cls, user_id, record_id):
+        """返回基于指定最新记录的当前内容生成的结果，没有或已过期时返回None"""
+        from app.models.user import HealthRecord
+
+        fields = [getattr(HealthRecord, field) for field in STAMP_FIELDS]
+        row = db.session.query(cls.record_stamp, cls.payload, *fields) \
+            .join(HealthRecord, HealthRecord.id == cls.record_id) \
+            .filter(cls.user_id == user_id, cls.record_id == record_id).first()
+        if row is None or row.record_stamp != record_stamp(row):
+            return None
+        return json.loads(row.payload)
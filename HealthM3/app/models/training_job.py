@@ -0,0 +1,49 @@
+# 训练任务模型
+from app import db
+from datetime import datetime
+import json
+
+class TrainingJob(db.Model):
+    __tablename__ = 'training_jobs'
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+    
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    model_type = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=PENDING)
+    record_count = db.Column(db.Integer)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # 执行任务的进程最近一次续租的时间
+    
+    def __repr__(self):
+        return f'<TrainingJob {self.id} {self.status}>'
+    
+    @property
+    def finished(self):
+        return self.status in self.FINISHED_STATUSES
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'model_type': self.model_type,
+            'status': self.status,
+            'record_count': self.record_count,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
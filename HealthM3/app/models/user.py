@@ -1,7 +1,18 @@
 # 用户模型
 from app import db
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import re
+
+BLOOD_PRESSURE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*$')
+
+def split_blood_pressure(value):
+    """将"收缩压/舒张压"字符串解析为两个整数，无法解析时返回(None, None)"""
+    match = BLOOD_PRESSURE_PATTERN.match(value) if isinstance(value, str) else None
+    if not match:
+        return None, None
+    return int(round(float(match.group(1)))), int(round(float(match.group(2))))
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -47,15 +58,74 @@ class HealthRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     heart_rate = db.Column(db.Integer)
-    blood_pressure = db.Column(db.String(20))
+    blood_pressure = db.Column(db.String(20))  # "收缩压/舒张压"，保留用于接口兼容
+    systolic_bp = db.Column(db.Integer)
+    diastolic_bp = db.Column(db.Integer)
     blood_sugar = db.Column(db.Float)
     weight = db.Column(db.Float)
     sleep_hours = db.Column(db.Float)
     mood_score = db.Column(db.Integer)  # 1-10分
-    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    recorded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # 按用户、时间顺序读取记录的复合索引
+    __table_args__ = (
+        db.Index('ix_health_records_user_id_recorded_at', 'user_id', 'recorded_at'),
+    )
     
     def __repr__(self):
         return f'<HealthRecord {self.id}>'
+    
+    @validates('blood_pressure')
+    def _sync_blood_pressure(self, key, value):
+        """写入血压字符串时同步数值列"""
+        self.systolic_bp, self.diastolic_bp = split_blood_pressure(value)
+        return value
+    
+    # to_dict中可投影的字段
+    FIELDS = ('id', 'user_id', 'heart_rate', 'blood_pressure', 'systolic_bp', 'diastolic_bp',
+              'blood_sugar', 'weight', 'sleep_hours', 'mood_score', 'recorded_at')
+    
+    @classmethod
+    def query_for_user(cls, user_id, start=None, end=None, after=None, descending=False):
+        """按时间顺序查询用户的健康记录
+        
+        Args:
+            start, end: 可选的[start, end)时间范围
+            after: 可选的键集游标(recorded_at, id)，只返回排在该位置之后的记录
+            descending: 是否按时间倒序
+        """
+        query = cls.query.filter(cls.user_id == user_id)
+        if start is not None:
+            query = query.filter(cls.recorded_at >= start)
+        if end is not None:
+            query = query.filter(cls.recorded_at < end)
+        if after is not None:
+            after_time, after_id = after
+            if descending:
+                query = query.filter(db.or_(
+                    cls.recorded_at < after_time,
+                    db.and_(cls.recorded_at == after_time, cls.id < after_id)
+                ))
+            else:
+                query = query.filter(db.or_(
+                    cls.recorded_at > after_time,
+                    db.and_(cls.recorded_at == after_time, cls.id > after_id)
+                ))
+        if descending:
+            return query.order_by(cls.recorded_at.desc(), cls.id.desc())
+        return query.order_by(cls.recorded_at, cls.id)
+    
+    @classmethod
+    def latest_for_user(cls, user_id):
+        """获取用户最新的一条健康记录"""
+        return cls.query.filter(cls.user_id == user_id) \
+            .order_by(cls.recorded_at.desc(), cls.id.desc()).first()
+    
+    @classmethod
+    def latest_id_for_user(cls, user_id):
+        """只取用户最新记录的ID，可直接由(user_id, recorded_at)索引得到，不读取整行"""
+        return db.session.query(cls.id).filter(cls.user_id == user_id) \
+            .order_by(cls.recorded_at.desc(), cls.id.desc()).limit(1).scalar()
         
     # 将健康记录转换为字典
     def to_dict(self):
@@ -64,6 +134,8 @@ class HealthRecord(db.Model):
             'user_id': self.user_id,
             'heart_rate': self.heart_rate,
             'blood_pressure': self.blood_pressure,
+            'systolic_bp': self.systolic_bp,
+            'diastolic_bp': self.diastolic_bp,
             'blood_sugar': self.blood_sugar,
             'weight': self.weight,
             'sleep_hours': self.sleep_hours,
@@ -1,137 +1,136 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-import joblib
+from threadpoolctl import threadpool_limits
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import logging
+from app.services.feature_extraction import extract_features, health_scores as compute_health_scores
+from app.services.model_registry import get_registry
+from app.config import Config
+
+# 模型类型与注册表中的模型名
+MODEL_NAMES = {
+    'diabetes': 'diabetes_model',
+    'hypertension': 'hypertension_model'
+}
+
+# 糖尿病模型可选的训练后端
+DIABETES_BACKENDS = ('gradient_boosting', 'hist_gradient_boosting')
+
+# 各风险等级对应的建议
+DIABETES_RISK_RECOMMENDATIONS = {
+    0: [],
+    1: ["注意饮食健康", "保持适度运动"],
+    2: ["建议进行血糖监测", "控制饮食，减少糖分摄入"]
+}
+HYPERTENSION_RISK_RECOMMENDATIONS = {
+    0: [],
+    1: ["保持健康饮食", "适当运动"],
+    2: ["建议定期测量血压", "减少盐分摄入"]
+}
 
 class AlgorithmAnalysisService:
-    def __init__(self):
+    def __init__(self, n_jobs: Optional[int] = None, diabetes_backend: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
-        self.scaler = StandardScaler()
-        self.models_dir = 'app/models'
-        self._ensure_models_dir()
+        self.models_dir = Config.MODEL_DIR
         
-        # 加载或初始化模型
-        self.diabetes_model = self._load_model('diabetes_model.pkl')
-        self.hypertension_model = self._load_model('hypertension_model.pkl')
-        self.health_assessment_model = self._load_model('health_assessment_model.pkl')
+        # 训练并行度与糖尿病模型后端
+        self.n_jobs = n_jobs if n_jobs is not None else Config.TRAINING_N_JOBS
+        self.diabetes_backend = diabetes_backend or Config.DIABETES_MODEL_BACKEND
+        if self.diabetes_backend not in DIABETES_BACKENDS:
+            raise ValueError(f'未知的糖尿病模型后端: {self.diabetes_backend}')
         
-    def _ensure_models_dir(self):
-        """确保模型目录存在"""
-        if not os.path.exists(self.models_dir):
-            os.makedirs(self.models_dir)
-            
-    def _load_model(self, model_name: str):
-        """加载模型"""
-        model_path = os.path.join(self.models_dir, model_name)
-        if os.path.exists(model_path):
-            return joblib.load(model_path)
-        return None
+        # 模型由注册表按需加载，并在有新版本时自动热切换
+        self.registry = get_registry(self.models_dir)
+        
+    @property
+    def diabetes_model(self):
+        return self.registry.get(MODEL_NAMES['diabetes'])[0]
+        
+    @property
+    def hypertension_model(self):
+        return self.registry.get(MODEL_NAMES['hypertension'])[0]
+        
+    def warm_up(self):
+        """预先加载已保存的模型"""
+        for name in MODEL_NAMES.values():
+            self.registry.get(name)
         
     def prepare_training_data(self, health_records: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
         """准备训练数据"""
         try:
-            # 转换为DataFrame
-            df = pd.DataFrame(health_records)
-            
-            # 提取特征
-            features = []
-            for record in health_records:
-                feature = []
-                # 心率
-                feature.append(record.get('heart_rate', 0))
-                # 血压
-                if 'blood_pressure' in record:
-                    systolic, diastolic = map(float, record['blood_pressure'].split('/'))
-                    feature.extend([systolic, diastolic])
-                else:
-                    feature.extend([0, 0])
-                # 血糖
-                feature.append(record.get('blood_sugar', 0))
-                # 体重
-                feature.append(record.get('weight', 0))
-                # 睡眠时长
-                feature.append(record.get('sleep_hours', 0))
-                # 情绪评分
-                feature.append(record.get('mood_score', 0))
-                features.append(feature)
-                
-            X = np.array(features)
-            y = np.array([self._calculate_health_label(record) for record in health_records])
-            
-            return X, y
+            return extract_features(health_records)
         except Exception as e:
             self.logger.error(f"准备训练数据失败: {str(e)}")
             return np.array([]), np.array([])
             
-    def _calculate_health_label(self, record: Dict) -> int:
-        """计算健康标签"""
-        score = 0
-        count = 0
+    def _build_classifier(self, model_type: str):
+        """构建未训练的分类器"""
+        if model_type == 'diabetes':
+            if self.diabetes_backend == 'hist_gradient_boosting':
+                # 基于直方图的实现，使用OpenMP多线程
+                return HistGradientBoostingClassifier(max_iter=100, random_state=42)
+            return GradientBoostingClassifier(n_estimators=100, random_state=42)
+        return RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=self.n_jobs)
         
-        # 心率评分
-        if 'heart_rate' in record:
-            heart_rate = record['heart_rate']
-            if 60 <= heart_rate <= 100:
-                score += 1
-            count += 1
-            
-        # 血压评分
-        if 'blood_pressure' in record:
-            systolic, diastolic = map(float, record['blood_pressure'].split('/'))
-            if 90 <= systolic <= 140 and 60 <= diastolic <= 90:
-                score += 1
-            count += 1
-            
-        # 血糖评分
-        if 'blood_sugar' in record:
-            blood_sugar = record['blood_sugar']
-            if 3.9 <= blood_sugar <= 6.1:
-                score += 1
-            count += 1
-            
-        return 1 if score / count >= 0.7 else 0
+    def fit_model(self, model_type: str, health_records: List[Dict]) -> Tuple[Pipeline, Dict]:
+        """训练模型但不保存，返回(含标准化器的模型, 评估指标)"""
+        if model_type not in MODEL_NAMES:
+            raise ValueError(f'未知的模型类型: {model_type}')
+            
+        X, y = self.prepare_training_data(health_records)
+        if len(X) == 0:
+            raise ValueError('没有足够的训练数据')
+            
+        # 数据标准化
+        scaler = StandardScaler()
+        X = scaler.fit_transform(X)
+        
+        # 划分训练集和测试集
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        # 训练模型；HistGradientBoosting的OpenMP线程数同样受n_jobs限制
+        model = self._build_classifier(model_type)
+        with threadpool_limits(limits=self.n_jobs if self.n_jobs > 0 else None):
+            model.fit(X_train, y_train)
+        if 'n_jobs' in model.get_params():
+            # 在线预测多为小批量，多线程调度反而增加延迟
+            model.set_params(n_jobs=None)
+        
+        # 评估模型
+        y_pred = model.predict(X_test)
+        metrics = {
+            'accuracy': accuracy_score(y_test, y_pred),
+            'precision': precision_score(y_test, y_pred),
+            'recall': recall_score(y_test, y_pred),
+            'f1': f1_score(y_test, y_pred)
+        }
+        return Pipeline([('scaler', scaler), ('model', model)]), metrics
+        
+    def save_model(self, model_type: str, model: Pipeline) -> str:
+        """保存模型为新版本，返回版本号"""
+        return self.registry.save(MODEL_NAMES[model_type], model)
+        
+    def train_model(self, model_type: str, health_records: List[Dict]) -> Dict:
+        """训练并保存模型"""
+        model, metrics = self.fit_model(model_type, health_records)
+        version = self.save_model(model_type, model)
+        return {
+            'message': '模型训练成功',
+            'metrics': metrics,
+            'model_version': version
+        }
         
     def train_diabetes_model(self, health_records: List[Dict]) -> Dict:
         """训练糖尿病预测模型"""
         try:
-            X, y = self.prepare_training_data(health_records)
-            if len(X) == 0:
-                return {'error': '没有足够的训练数据'}
-                
-            # 数据标准化
-            X = self.scaler.fit_transform(X)
-            
-            # 划分训练集和测试集
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            # 训练模型
-            model = GradientBoostingClassifier(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
-            
-            # 评估模型
-            y_pred = model.predict(X_test)
-            metrics = {
-                'accuracy': accuracy_score(y_test, y_pred),
-                'precision': precision_score(y_test, y_pred),
-                'recall': recall_score(y_test, y_pred),
-                'f1': f1_score(y_test, y_pred)
-            }
-            
-            # 保存模型
-            self.diabetes_model = model
-            joblib.dump(model, os.path.join(self.models_dir, 'diabetes_model.pkl'))
-            
-            return {
-                'message': '模型训练成功',
-                'metrics': metrics
-            }
+            return self.train_model('diabetes', health_records)
         except Exception as e:
             self.logger.error(f"训练糖尿病模型失败: {str(e)}")
             return {'error': str(e)}
@@ -139,116 +138,99 @@ class AlgorithmAnalysisService:
     def train_hypertension_model(self, health_records: List[Dict]) -> Dict:
         """训练高血压预测模型"""
         try:
-            X, y = self.prepare_training_data(health_records)
-            if len(X) == 0:
-                return {'error': '没有足够的训练数据'}
-                
-            # 数据标准化
-            X = self.scaler.fit_transform(X)
-            
-            # 划分训练集和测试集
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            # 训练模型
-            model = RandomForestClassifier(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
-            
-            # 评估模型
-            y_pred = model.predict(X_test)
-            metrics = {
-                'accuracy': accuracy_score(y_test, y_pred),
-                'precision': precision_score(y_test, y_pred),
-                'recall': recall_score(y_test, y_pred),
-                'f1': f1_score(y_test, y_pred)
-            }
-            
-            # 保存模型
-            self.hypertension_model = model
-            joblib.dump(model, os.path.join(self.models_dir, 'hypertension_model.pkl'))
-            
-            return {
-                'message': '模型训练成功',
-                'metrics': metrics
-            }
+            return self.train_model('hypertension', health_records)
         except Exception as e:
             self.logger.error(f"训练高血压模型失败: {str(e)}")
             return {'error': str(e)}
             
     def predict_disease_risk(self, health_record: Dict) -> Dict:
         """预测疾病风险"""
+        result = self.predict_disease_risk_batch([health_record])
+        if 'error' in result:
+            return result
+        return result['predictions'][0]
+        
+    def predict_disease_risk_batch(self, health_records: List[Dict]) -> Dict:
+        """批量预测疾病风险，每个模型对整批数据只调用一次predict_proba"""
         try:
-            if self.diabetes_model is None or self.hypertension_model is None:
+            models = self._risk_models()
+            if models is None:
                 return {'error': '模型未训练'}
-                
-            # 准备特征
-            features = []
-            # 心率
-            features.append(health_record.get('heart_rate', 0))
-            # 血压
-            if 'blood_pressure' in health_record:
-                systolic, diastolic = map(float, health_record['blood_pressure'].split('/'))
-                features.extend([systolic, diastolic])
-            else:
-                features.extend([0, 0])
-            # 血糖
-            features.append(health_record.get('blood_sugar', 0))
-            # 体重
-            features.append(health_record.get('weight', 0))
-            # 睡眠时长
-            features.append(health_record.get('sleep_hours', 0))
-            # 情绪评分
-            features.append(health_record.get('mood_score', 0))
-            
-            X = np.array([features])
-            X = self.scaler.transform(X)
-            
-            # 预测
-            diabetes_prob = self.diabetes_model.predict_proba(X)[0][1]
-            hypertension_prob = self.hypertension_model.predict_proba(X)[0][1]
-            
-            return {
-                'diabetes_risk': float(diabetes_prob),
-                'hypertension_risk': float(hypertension_prob),
-                'recommendations': self._generate_risk_recommendations(
-                    diabetes_prob, hypertension_prob
-                )
-            }
+            model_versions = models[2]
+            if not health_records:
+                return {'predictions': []}
+            predictions = self._predict_risk_chunk(models, health_records)
+            return {'predictions': predictions, 'model_versions': model_versions}
         except Exception as e:
             self.logger.error(f"预测疾病风险失败: {str(e)}")
             return {'error': str(e)}
-            
+
+    def iter_disease_risk_batch(self, health_records: List[Dict],
+                                chunk_size: int) -> Optional[Iterator[List[Dict]]]:
+        """按chunk_size分块批量预测，逐块产生预测结果；模型未训练时返回None"""
+        models = self._risk_models()
+        if models is None:
+            return None
+        return (self._predict_risk_chunk(models, health_records[start:start + chunk_size])
+                for start in range(0, len(health_records), chunk_size))
+
+    def _risk_models(self) -> Optional[Tuple]:
+        """当前的糖尿病、高血压模型及版本号；任一模型未训练时返回None"""
+        diabetes_model, diabetes_version = self.registry.get(MODEL_NAMES['diabetes'])
+        hypertension_model, hypertension_version = self.registry.get(MODEL_NAMES['hypertension'])
+        if diabetes_model is None or hypertension_model is None:
+            return None
+        return diabetes_model, hypertension_model, {'diabetes': diabetes_version,
+                                                    'hypertension': hypertension_version}
+
+    def _predict_risk_chunk(self, models: Tuple, health_records: List[Dict]) -> List[Dict]:
+        """对一批记录预测疾病风险"""
+        diabetes_model, hypertension_model, model_versions = models
+
+        # 准备特征
+        X, _ = extract_features(health_records)
+
+        # 预测（模型内含标准化步骤）
+        diabetes_probs = diabetes_model.predict_proba(X)[:, 1]
+        hypertension_probs = hypertension_model.predict_proba(X)[:, 1]
+
+        # 按风险等级查表生成建议
+        diabetes_levels = self._risk_levels(diabetes_probs)
+        hypertension_levels = self._risk_levels(hypertension_probs)
+
+        return [
+            {
+                'diabetes_risk': float(diabetes_prob),
+                'hypertension_risk': float(hypertension_prob),
+                'recommendations': DIABETES_RISK_RECOMMENDATIONS[diabetes_level]
+                                   + HYPERTENSION_RISK_RECOMMENDATIONS[hypertension_level],
+                'model_versions': model_versions
+            }
+            for diabetes_prob, hypertension_prob, diabetes_level, hypertension_level in zip(
+                diabetes_probs.tolist(), hypertension_probs.tolist(),
+                diabetes_levels.tolist(), hypertension_levels.tolist()
+            )
+        ]
+
+    @staticmethod
+    def _risk_levels(probs: np.ndarray) -> np.ndarray:
+        """风险等级：0-低，1-中（>0.4），2-高（>0.7）"""
+        probs = np.asarray(probs)
+        return (probs > 0.4).astype(np.int64) + (probs > 0.7)
+        
     def _generate_risk_recommendations(self, 
                                      diabetes_prob: float,
                                      hypertension_prob: float) -> List[str]:
         """生成风险建议"""
-        recommendations = []
-        
-        # 糖尿病风险建议
-        if diabetes_prob > 0.7:
-            recommendations.append("建议进行血糖监测")
-            recommendations.append("控制饮食，减少糖分摄入")
-        elif diabetes_prob > 0.4:
-            recommendations.append("注意饮食健康")
-            recommendations.append("保持适度运动")
-            
-        # 高血压风险建议
-        if hypertension_prob > 0.7:
-            recommendations.append("建议定期测量血压")
-            recommendations.append("减少盐分摄入")
-        elif hypertension_prob > 0.4:
-            recommendations.append("保持健康饮食")
-            recommendations.append("适当运动")
-            
-        return recommendations
+        diabetes_level, hypertension_level = self._risk_levels([diabetes_prob, hypertension_prob]).tolist()
+        return (DIABETES_RISK_RECOMMENDATIONS[diabetes_level]
+                + HYPERTENSION_RISK_RECOMMENDATIONS[hypertension_level])
         
     def assess_health_status(self, health_records: List[Dict]) -> Dict:
         """评估健康状态"""
         try:
             # 计算健康评分
-            health_scores = []
-            for record in health_records:
-                score = self._calculate_health_score(record)
-                health_scores.append(score)
+            health_scores = compute_health_scores(health_records)
                 
             # 计算趋势
             if len(health_scores) > 1:
@@ -270,48 +252,25 @@ class AlgorithmAnalysisService:
             self.logger.error(f"评估健康状态失败: {str(e)}")
             return {'error': str(e)}
             
-    def _calculate_health_score(self, record: Dict) -> float:
-        """计算健康评分"""
-        score = 0
-        count = 0
+    def assess_user_health_status(self, user_id: int) -> Dict:
+        """根据用户已保存的全部记录评估健康状态，读取增量维护的统计量，与历史长度无关"""
+        from app.services import health_aggregates
         
-        # 心率评分
-        if 'heart_rate' in record:
-            heart_rate = record['heart_rate']
-            if 60 <= heart_rate <= 100:
-                score += 1
-            count += 1
-            
-        # 血压评分
-        if 'blood_pressure' in record:
-            systolic, diastolic = map(float, record['blood_pressure'].split('/'))
-            if 90 <= systolic <= 140 and 60 <= diastolic <= 90:
-                score += 1
-            count += 1
-            
-        # 血糖评分
-        if 'blood_sugar' in record:
-            blood_sugar = record['blood_sugar']
-            if 3.9 <= blood_sugar <= 6.1:
-                score += 1
-            count += 1
-            
-        # 睡眠评分
-        if 'sleep_hours' in record:
-            sleep_hours = record['sleep_hours']
-            if 7 <= sleep_hours <= 9:
-                score += 1
-            count += 1
-            
-        # 情绪评分
-        if 'mood_score' in record:
-            mood_score = record['mood_score']
-            if mood_score >= 6:
-                score += 1
-            count += 1
+        try:
+            stats = health_aggregates.summary(user_id, 'health_score')
+            if not stats['count']:
+                return {'error': '没有健康记录'}
+            return {
+                'average_score': stats['mean'],
+                'trend': stats['trend'],
+                'score_std': stats['std'],
+                'record_count': stats['count'],
+                'recommendations': self._generate_health_recommendations(stats['mean'], stats['trend'])
+            }
+        except Exception as e:
+            self.logger.error(f"评估健康状态失败: {str(e)}")
+            return {'error': str(e)}
             
-        return score / count if count > 0 else 0
-        
     def _generate_health_recommendations(self, 
                                        average_score: float,
                                        trend: float) -> List[str]:
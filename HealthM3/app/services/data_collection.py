@@ -1,35 +1,56 @@
 # 数据收集服务
 import pandas as pd
 import numpy as np
-from scipy import stats
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.ensemble import IsolationForest
-from snownlp import SnowNLP
-import jieba
 import json
 from datetime import datetime
-import requests
-from typing import Dict, List, Union, Optional
+from typing import Dict, Iterator, List, Tuple, Union, Optional
 import logging
+from app.config import Config
+from app.models.user import split_blood_pressure
+from app.services.model_registry import get_registry
+from app.services.outlier_model import OUTLIER_MODEL_NAME, OUTLIER_MODEL_FEATURES
+from app.services.hospital_connector import HospitalConnector
+from app.services.sentiment import sentiment_analyzer, warm_up as warm_up_sentiment
+from app.services.streaming_preprocess import StreamingPreprocessor, ChunkSource, iter_chunks
+
+# 可选的异常值检测方式
+OUTLIER_METHODS = ('isolation_forest', 'robust', 'model')
+ROBUST_Z_THRESHOLD = 3.5
 
 class DataCollectionService:
-    def __init__(self):
+    def __init__(self, outlier_method: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
         self.scaler = StandardScaler()
         self.minmax_scaler = MinMaxScaler()
         self.isolation_forest = IsolationForest(contamination=0.1)
         
+        # 异常值检测方式：isolation_forest（逐列拟合）、robust（IQR+MAD向量化）、model（离线拟合的多变量孤立森林）
+        self.outlier_method = outlier_method or Config.PREPROCESS_OUTLIER_METHOD
+        self.registry = get_registry(Config.MODEL_DIR)
+        self.hospital_connector = HospitalConnector()
+        
+    def warm_up(self):
+        """预先加载情感分析词典和模型"""
+        warm_up_sentiment()
+
     def fetch_hospital_data(self, api_url: str, params: Dict) -> pd.DataFrame:
         """从医院HIS系统获取数据"""
+        return self.fetch_hospital_sources([(api_url, params)])
+
+    def fetch_hospital_sources(self, sources: List[Tuple[str, Dict]]) -> pd.DataFrame:
+        """并发获取多个HIS接口（含分页）的数据并合并"""
         try:
-            response = requests.get(api_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return pd.DataFrame(data)
+            return self.hospital_connector.fetch_many(sources)
         except Exception as e:
             self.logger.error(f"获取医院数据失败: {str(e)}")
             return pd.DataFrame()
 
+    def iter_hospital_chunks(self, sources: List[Tuple[str, Dict]]) -> Iterator[pd.DataFrame]:
+        """逐块获取HIS数据，适合配合preprocess_stream处理大批量数据"""
+        return self.hospital_connector.iter_chunks(sources)
+
     def fetch_wearable_data(self, device_type: str, user_id: str) -> pd.DataFrame:
         """获取可穿戴设备数据"""
         # 这里需要根据具体设备类型实现不同的数据获取逻辑
@@ -45,14 +66,23 @@ class DataCollectionService:
             self.logger.error(f"获取可穿戴设备数据失败: {str(e)}")
             return pd.DataFrame()
 
-    def preprocess_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    def preprocess_data(self, df: pd.DataFrame, outlier_method: Optional[str] = None) -> pd.DataFrame:
         """数据预处理"""
+        outlier_method = outlier_method or self.outlier_method
+        if outlier_method not in OUTLIER_METHODS:
+            raise ValueError(f'未知的异常值检测方式: {outlier_method}')
+            
         try:
             # 1. 处理缺失值
             df = self._handle_missing_values(df)
             
             # 2. 检测异常值
-            df = self._detect_outliers(df)
+            if outlier_method == 'robust':
+                df = self._detect_outliers_robust(df)
+            elif outlier_method == 'model':
+                df = self._detect_outliers_model(df)
+            else:
+                df = self._detect_outliers(df)
             
             # 3. 特征归一化
             df = self._normalize_features(df)
@@ -62,6 +92,21 @@ class DataCollectionService:
             self.logger.error(f"数据预处理失败: {str(e)}")
             return df
 
+    def preprocess_stream(self, source: ChunkSource, chunksize: Optional[int] = None,
+                          outlier_method: Optional[str] = 'robust') -> Iterator[pd.DataFrame]:
+        """流式预处理超出内存的数据：source为CSV路径或每次返回新分块迭代器的可调用对象
+
+        第一遍收集统计量，第二遍逐块输出预处理后的DataFrame。
+        """
+        chunksize = chunksize or Config.PREPROCESS_CHUNK_SIZE
+        preprocessor = StreamingPreprocessor(
+            outlier_method=outlier_method,
+            sample_size=Config.PREPROCESS_SAMPLE_SIZE,
+            z_threshold=ROBUST_Z_THRESHOLD
+        )
+        preprocessor.fit(iter_chunks(source, chunksize))
+        return preprocessor.transform(iter_chunks(source, chunksize))
+
     def _handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """处理缺失值"""
         # 数值型特征使用均值填充
@@ -70,7 +115,8 @@ class DataCollectionService:
         
         # 分类特征使用众数填充
         categorical_cols = df.select_dtypes(include=['object']).columns
-        df[categorical_cols] = df[categorical_cols].fillna(df[categorical_cols].mode().iloc[0])
+        if len(categorical_cols) > 0 and len(df) > 0:
+            df[categorical_cols] = df[categorical_cols].fillna(df[categorical_cols].mode().iloc[0])
         
         return df
 
@@ -95,6 +141,62 @@ class DataCollectionService:
         
         return df
 
+    def _detect_outliers_robust(self, df: pd.DataFrame) -> pd.DataFrame:
+        """向量化的稳健统计异常值检测：一次处理所有数值列，无需拟合模型"""
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        if len(numeric_cols) == 0 or len(df) == 0:
+            return df
+        X = df[numeric_cols].to_numpy(dtype=np.float64)
+        
+        # 箱线图方法：将超出边界的值截断到边界
+        q1, q3 = np.nanpercentile(X, [25, 75], axis=0)
+        iqr = q3 - q1
+        X = np.clip(X, q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+        
+        # MAD稳健z分数：|z| > 3.5 的值视为异常，替换为列均值
+        median = np.nanmedian(X, axis=0)
+        mad = np.nanmedian(np.abs(X - median), axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(mad > 0, 0.6745 * (X - median) / mad, 0.0)
+        X = np.where(np.abs(z) > ROBUST_Z_THRESHOLD, np.nanmean(X, axis=0), X)
+        
+        df[numeric_cols] = X
+        return df
+
+    def fit_outlier_model(self, df: pd.DataFrame) -> str:
+        """在固定特征上拟合多变量孤立森林并保存为新版本，返回模型版本；由离线命令调用"""
+        features = list(OUTLIER_MODEL_FEATURES)
+        missing = [feature for feature in features if feature not in df.columns]
+        if missing:
+            raise ValueError(f'缺少异常值模型的特征列: {", ".join(missing)}')
+        X = df[features].apply(pd.to_numeric, errors='coerce')
+        X = X.dropna(how='all')
+        if X.empty:
+            raise ValueError('没有可用于拟合异常值模型的数据')
+        X = X.fillna(X.mean()).fillna(0)
+        forest = IsolationForest(contamination=0.1, random_state=42)
+        forest.fit(X.to_numpy(dtype=np.float64))
+        return self.registry.save(OUTLIER_MODEL_NAME, forest)
+
+    def _detect_outliers_model(self, df: pd.DataFrame) -> pd.DataFrame:
+        """使用离线拟合的多变量孤立森林检测异常行；没有模型或缺少特征列时使用稳健统计方法"""
+        features = list(OUTLIER_MODEL_FEATURES)
+        if len(df) == 0:
+            return df
+        numeric_cols = set(df.select_dtypes(include=[np.number]).columns)
+        forest = None
+        if numeric_cols.issuperset(features):
+            forest, _ = self.registry.get(OUTLIER_MODEL_NAME)
+        if forest is None:
+            return self._detect_outliers_robust(df)
+        
+        X = df[features].to_numpy(dtype=np.float64)
+        outliers = forest.predict(X) == -1
+        # 异常行的模型特征替换为列均值
+        X[outliers] = X[~outliers].mean(axis=0) if (~outliers).any() else X.mean(axis=0)
+        df[features] = X
+        return df
+
     def _normalize_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """特征归一化"""
         numeric_cols = df.select_dtypes(include=[np.number]).columns
@@ -109,43 +211,31 @@ class DataCollectionService:
 
     def analyze_sentiment(self, text: str) -> Dict:
         """情感分析"""
-        try:
-            # 使用SnowNLP进行情感分析
-            s = SnowNLP(text)
-            sentiment_score = s.sentiments
-            
-            # 根据情感分数判断情感
-            if sentiment_score > 0.6:
-                sentiment = "positive"
-            elif sentiment_score < 0.4:
-                sentiment = "negative"
-            else:
-                sentiment = "neutral"
-            
-            return {
-                "sentiment": sentiment,
-                "score": float(sentiment_score)
-            }
-        except Exception as e:
-            self.logger.error(f"情感分析失败: {str(e)}")
-            return {"sentiment": "unknown", "score": 0.0}
+        return sentiment_analyzer.analyze(text)
 
-    def parse_health_record(self, record: Dict) -> Dict:
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict]:
+        """批量情感分析：相同文本只计算一次，并复用缓存结果"""
+        return sentiment_analyzer.analyze_batch(texts)
+
+    def parse_health_record(self, record: Dict, sentiment: Optional[Dict] = None) -> Dict:
         """解析健康记录"""
         try:
             # 解析时间
             if isinstance(record.get("recorded_at"), str):
                 record["recorded_at"] = datetime.fromisoformat(record["recorded_at"])
             
-            # 解析血压
-            if isinstance(record.get("blood_pressure"), str):
-                systolic, diastolic = map(float, record["blood_pressure"].split("/"))
+            # 解析血压（已有数值列时不再解析字符串）
+            if record.get("systolic_bp") is None and isinstance(record.get("blood_pressure"), str):
+                systolic, diastolic = split_blood_pressure(record["blood_pressure"])
+                if systolic is None:
+                    raise ValueError(f'血压格式错误: {record["blood_pressure"]}')
                 record["systolic_bp"] = systolic
                 record["diastolic_bp"] = diastolic
             
             # 情感分析
             if record.get("mood_description"):
-                sentiment = self.analyze_sentiment(record["mood_description"])
+                if sentiment is None:
+                    sentiment = self.analyze_sentiment(record["mood_description"])
                 record["mood_sentiment"] = sentiment["sentiment"]
                 record["mood_score"] = sentiment["score"]
             
@@ -154,6 +244,15 @@ class DataCollectionService:
             self.logger.error(f"解析健康记录失败: {str(e)}")
             return record
 
+    def parse_health_records(self, records: List[Dict]) -> List[Dict]:
+        """批量解析健康记录，情绪描述统一做批量情感分析"""
+        texts = [record.get("mood_description") for record in records]
+        sentiments = iter(self.analyze_sentiment_batch([text for text in texts if text]))
+        return [
+            self.parse_health_record(record, next(sentiments) if text else None)
+            for record, text in zip(records, texts)
+        ]
+
     def assess_mental_health(self, records: List[Dict]) -> Dict:
         """评估心理健康状态"""
         try:
@@ -179,6 +278,43 @@ class DataCollectionService:
             self.logger.error(f"心理健康评估失败: {str(e)}")
             return {}
 
+    def assess_user_mental_health(self, user_id: int) -> Dict:
+        """根据用户已保存的情绪评分评估心理健康，读取增量维护的统计量，与历史长度无关"""
+        from app.services import health_aggregates
+
+        try:
+            stats = health_aggregates.summary(user_id, 'mood_score')
+            if not stats['count']:
+                return {}
+            stress_level = self._stress_level(stats['mean'])
+            return {
+                'mood_stability': stats['std'],
+                'mood_trend': stats['trend'],
+                'stress_level': stress_level,
+                'record_count': stats['count'],
+                'recommendations': self._generate_mental_health_recommendations(
+                    stats['std'], stats['trend'], stress_level
+                )
+            }
+        except Exception as e:
+            self.logger.error(f"心理健康评估失败: {str(e)}")
+            return {}
+
+    def _calculate_stress_level(self, records: List[Dict]) -> str:
+        """根据平均情绪评分估计压力水平"""
+        mood_scores = [r.get('mood_score', 0) for r in records]
+        return self._stress_level(float(np.mean(mood_scores)) if mood_scores else None)
+
+    def _stress_level(self, mean_mood: Optional[float]) -> str:
+        """情绪评分1-10分，平均低于4分为高压力，低于6分为中等压力"""
+        if mean_mood is None:
+            return "unknown"
+        if mean_mood < 4:
+            return "high"
+        if mean_mood < 6:
+            return "medium"
+        return "low"
+
     def _generate_mental_health_recommendations(self, 
                                              mood_stability: float,
                                              mood_trend: float,
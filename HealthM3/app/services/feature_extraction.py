@@ -0,0 +1,189 @@
+# 特征提取服务
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Tuple, Union, Any
+
+# 模型输入特征列（顺序即特征矩阵的列顺序）
+FEATURE_COLUMNS = [
+    'heart_rate',
+    'systolic_bp',
+    'diastolic_bp',
+    'blood_sugar',
+    'weight',
+    'sleep_hours',
+    'mood_score'
+]
+
+# 各指标的正常范围（闭区间）
+NORMAL_RANGES = {
+    'heart_rate': (60, 100),
+    'systolic_bp': (90, 140),
+    'diastolic_bp': (60, 90),
+    'blood_sugar': (3.9, 6.1),
+    'sleep_hours': (7, 9),
+    'mood_score': (6, np.inf)
+}
+
+# 健康标签只看心率、血压、血糖；健康评分看全部五项
+LABEL_METRICS = ('heart_rate', 'blood_pressure', 'blood_sugar')
+SCORE_METRICS = ('heart_rate', 'blood_pressure', 'blood_sugar', 'sleep_hours', 'mood_score')
+
+HEALTH_LABEL_THRESHOLD = 0.7
+
+Records = Union[List[Dict], pd.DataFrame, Any]
+
+
+def records_to_frame(records: Records) -> pd.DataFrame:
+    """将一批记录（字典列表、DataFrame、SQL查询结果或ORM对象）转换为DataFrame"""
+    if records is None:
+        return pd.DataFrame()
+    if isinstance(records, pd.DataFrame):
+        return records
+
+    # SQLAlchemy Result / ResultProxy
+    if hasattr(records, 'keys') and hasattr(records, 'fetchall'):
+        return pd.DataFrame(records.fetchall(), columns=list(records.keys()))
+
+    records = list(records)
+    if not records:
+        return pd.DataFrame()
+
+    first = records[0]
+    if isinstance(first, dict):
+        return pd.DataFrame.from_records(records)
+    # SQLAlchemy Row
+    if hasattr(first, '_mapping'):
+        return pd.DataFrame.from_records([dict(r._mapping) for r in records])
+    # ORM模型对象
+    if hasattr(first, 'to_dict'):
+        return pd.DataFrame.from_records([r.to_dict() for r in records])
+    return pd.DataFrame.from_records(records)
+
+
+def parse_blood_pressure(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """向量化解析"收缩压/舒张压"字符串，无法解析的值为NaN"""
+    parts = values.astype('string').str.split('/', n=1, expand=True)
+    if parts.shape[1] < 2:
+        nan = np.full(len(values), np.nan)
+        return nan, nan.copy()
+    systolic = pd.to_numeric(parts[0].str.strip(), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    diastolic = pd.to_numeric(parts[1].str.strip(), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return systolic, diastolic
+
+
+def _column(df: pd.DataFrame, name: str, zero_as_missing: bool) -> np.ndarray:
+    """取出数值列，缺失的列或无法转换的值为NaN"""
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    if zero_as_missing:
+        values = np.where(values == 0, np.nan, values)
+    return values
+
+
+def build_feature_columns(records: Records, zero_as_missing: bool = False) -> Dict[str, np.ndarray]:
+    """构建各特征列，缺失值为NaN
+
+    收缩压、舒张压优先读取数值列systolic_bp/diastolic_bp，
+    只有数值缺失时才解析blood_pressure字符串（如接口直接传入的记录）。
+    """
+    df = records_to_frame(records)
+    columns = {name: _column(df, name, zero_as_missing) for name in FEATURE_COLUMNS}
+
+    missing = np.isnan(columns['systolic_bp']) | np.isnan(columns['diastolic_bp'])
+    if missing.any() and 'blood_pressure' in df.columns:
+        systolic = columns['systolic_bp'] = columns['systolic_bp'].copy()
+        diastolic = columns['diastolic_bp'] = columns['diastolic_bp'].copy()
+        parsed_systolic, parsed_diastolic = parse_blood_pressure(df['blood_pressure'][missing])
+        systolic[missing] = parsed_systolic
+        diastolic[missing] = parsed_diastolic
+        if zero_as_missing:
+            systolic[systolic == 0] = np.nan
+            diastolic[diastolic == 0] = np.nan
+    return columns
+
+
+def _in_range(values: np.ndarray, name: str) -> np.ndarray:
+    low, high = NORMAL_RANGES[name]
+    return (values >= low) & (values <= high)
+
+
+def score_metrics(columns: Dict[str, np.ndarray], metrics=SCORE_METRICS) -> np.ndarray:
+    """向量化计算指定指标的达标比例，没有任何有效指标的记录得分为0"""
+    n = len(columns['heart_rate'])
+    score = np.zeros(n, dtype=np.float64)
+    count = np.zeros(n, dtype=np.float64)
+
+    for metric in metrics:
+        if metric == 'blood_pressure':
+            systolic, diastolic = columns['systolic_bp'], columns['diastolic_bp']
+            present = ~np.isnan(systolic) & ~np.isnan(diastolic)
+            normal = _in_range(systolic, 'systolic_bp') & _in_range(diastolic, 'diastolic_bp')
+        else:
+            values = columns[metric]
+            present = ~np.isnan(values)
+            normal = _in_range(values, metric)
+        score += normal & present
+        count += present
+
+    return np.divide(score, count, out=np.zeros(n, dtype=np.float64), where=count > 0)
+
+
+def health_scores(records: Records, zero_as_missing: bool = False) -> np.ndarray:
+    """批量计算健康评分"""
+    return score_metrics(build_feature_columns(records, zero_as_missing), SCORE_METRICS)
+
+
+def record_health_score(record: Dict) -> float:
+    """单条记录的健康评分，结果与health_scores一致，不构造DataFrame"""
+    systolic, diastolic = record.get('systolic_bp'), record.get('diastolic_bp')
+    if systolic is None or diastolic is None:
+        from app.models.user import split_blood_pressure
+        systolic, diastolic = split_blood_pressure(record.get('blood_pressure'))
+
+    normal = present = 0
+    for metric in SCORE_METRICS:
+        if metric == 'blood_pressure':
+            if systolic is None or diastolic is None:
+                continue
+            low, high = NORMAL_RANGES['systolic_bp']
+            in_range = low <= systolic <= high
+            low, high = NORMAL_RANGES['diastolic_bp']
+            in_range = in_range and low <= diastolic <= high
+        else:
+            value = record.get(metric)
+            if value is None:
+                continue
+            low, high = NORMAL_RANGES[metric]
+            in_range = low <= value <= high
+        normal += in_range
+        present += 1
+    return normal / present if present else 0.0
+
+
+def feature_matrix(columns: Dict[str, np.ndarray], dtype=np.float32) -> np.ndarray:
+    """按FEATURE_COLUMNS顺序拼接特征矩阵，缺失值填0"""
+    X = np.column_stack([columns[name] for name in FEATURE_COLUMNS])
+    return np.nan_to_num(X, nan=0.0).astype(dtype, copy=False)
+
+
+def extract_features(records: Records,
+                     label_metrics=LABEL_METRICS,
+                     zero_as_missing: bool = False,
+                     dtype=np.float32) -> Tuple[np.ndarray, np.ndarray]:
+    """将一批记录转换为特征矩阵和健康标签向量
+
+    Args:
+        records: 字典列表、DataFrame或SQL查询结果
+        label_metrics: 计算健康标签时使用的指标
+        zero_as_missing: 是否将0值视为缺失（联邦学习沿用的约定）
+        dtype: 特征矩阵的数据类型
+
+    Returns:
+        (X, y)，X形状为(n, len(FEATURE_COLUMNS))
+    """
+    columns = build_feature_columns(records, zero_as_missing)
+    X = feature_matrix(columns, dtype)
+    scores = score_metrics(columns, label_metrics)
+    y = (scores >= HEALTH_LABEL_THRESHOLD).astype(np.int64)
+    return X, y
@@ -0,0 +1,174 @@
+# 联邦学习模型更新的二进制编码：比嵌套列表的JSON小数倍，服务端用np.frombuffer直接读取
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+MIMETYPE = 'application/octet-stream'
+MAGIC = b'HMFL'
+FORMAT_VERSION = 1
+
+# 数值类型编号
+DTYPES = {1: np.dtype('<f4'), 2: np.dtype('<f2')}
+DTYPE_CODES = {'float32': 1, 'float16': 2}
+
+# 标志位
+FLAG_DELTA = 0x01   # 值为相对基准模型的差
+FLAG_SPARSE = 0x02  # 只包含top-k个差值（下标+值），其余与基准模型相同
+
+# 魔数、格式版本、数值类型、标志位、保留、样本数、系数行数、系数列数、基准版本号长度
+HEADER = struct.Struct('<4sBBBBIHHH')
+COUNT = struct.Struct('<I')
+
+# 数据布局（小端）:
+#     HEADER | 基准版本号(ASCII) | 填充到4字节对齐 | [COUNT k | uint32下标 × k] | 数值
+# 数值为按顺序拼接的一维向量：系数(行优先) + 截距 + 标准化器均值 + 标准化器方差
+
+
+def _align(offset: int, size: int = 4) -> int:
+    return (offset + size - 1) // size * size
+
+
+def _layout(rows: int, cols: int) -> Dict[str, slice]:
+    """各参数在一维向量中的位置"""
+    sizes = (('model_weights', rows * cols), ('intercept', rows), ('scaler_mean', cols), ('scaler_var', cols))
+    layout, start = {}, 0
+    for name, size in sizes:
+        layout[name] = slice(start, start + size)
+        start += size
+    return layout
+
+
+def flatten(params: Dict) -> np.ndarray:
+    """把模型参数拼成一维float64向量；没有scaler_var时由scaler_scale的平方得到"""
+    var = params.get('scaler_var')
+    if var is None:
+        var = np.square(np.asarray(params['scaler_scale'], dtype=np.float64))
+    return np.concatenate([
+        np.asarray(params['model_weights'], dtype=np.float64).ravel(),
+        np.asarray(params['intercept'], dtype=np.float64).ravel(),
+        np.asarray(params['scaler_mean'], dtype=np.float64).ravel(),
+        np.asarray(var, dtype=np.float64).ravel()
+    ])
+
+
+def encode_update(params: Dict, dtype: str = 'float32', base: Optional[Dict] = None,
+                  top_k: Optional[int] = None) -> bytes:
+    """编码模型更新
+
+    Args:
+        params: 本地模型参数（train_local_model的返回值）
+        dtype: 'float32'或'float16'
+        base: 基准模型参数，需包含'model_version'；提供时只传输与基准的差
+        top_k: 只保留绝对值最大的k个差值，需要同时提供base
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f'不支持的数值类型: {dtype}')
+    if top_k is not None and base is None:
+        raise ValueError('top-k稀疏化需要基准模型')
+
+    coef = np.atleast_2d(np.asarray(params['model_weights']))
+    rows, cols = coef.shape
+    values = flatten(params)
+    flags = 0
+    base_version = b''
+    if base is not None:
+        base_values = flatten(base)
+        if base_values.shape != values.shape:
+            raise ValueError('模型参数维度与基准模型不一致')
+        values = values - base_values
+        flags |= FLAG_DELTA
+        base_version = str(base['model_version']).encode('ascii')
+
+    indices = None
+    if top_k is not None and top_k < len(values):
+        indices = np.sort(np.argpartition(np.abs(values), len(values) - top_k)[len(values) - top_k:])
+        values = values[indices]
+        flags |= FLAG_SPARSE
+
+    code = DTYPE_CODES[dtype]
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, code, flags, 0, int(params.get('n_samples') or 1),
+                         rows, cols, len(base_version)) + base_version
+    parts = [header, b'\0' * (_align(len(header)) - len(header))]
+    if indices is not None:
+        parts += [COUNT.pack(len(indices)), indices.astype('<u4').tobytes()]
+    parts.append(values.astype(DTYPES[code]).tobytes())
+    return b''.join(parts)
+
+
+def read_header(data: bytes) -> Dict:
+    """解析头部，返回数值类型、标志位、样本数、形状、基准版本号和数据起始位置"""
+    if len(data) < HEADER.size:
+        raise ValueError('模型更新数据不完整')
+    magic, version, code, flags, _, n_samples, rows, cols, base_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('不是有效的模型更新数据')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'不支持的格式版本: {version}')
+    if code not in DTYPES:
+        raise ValueError(f'未知的数值类型编号: {code}')
+    if flags & FLAG_SPARSE and not flags & FLAG_DELTA:
+        raise ValueError('稀疏编码必须基于基准模型')
+    end = HEADER.size + base_length
+    if len(data) < end:
+        raise ValueError('模型更新数据不完整')
+    return {
+        'dtype': DTYPES[code],
+        'delta': bool(flags & FLAG_DELTA),
+        'sparse': bool(flags & FLAG_SPARSE),
+        'n_samples': n_samples,
+        'rows': rows,
+        'cols': cols,
+        'base_version': data[HEADER.size:end].decode('ascii') if base_length else None,
+        'offset': _align(end)
+    }
+
+
+def decode_update(data: bytes, base: Optional[Dict] = None) -> Dict:
+    """解码模型更新，返回与JSON请求相同键名的参数
+
+    非差分编码时返回的数组直接引用data的内存（只读，不复制）；差分编码时
+    需要提供base（头部中基准版本号对应的模型参数），在其上加回差值。
+    """
+    header = read_header(data)
+    rows, cols = header['rows'], header['cols']
+    size = rows * cols + rows + 2 * cols
+    offset = header['offset']
+    count = size
+    indices = None
+    if header['sparse']:
+        if len(data) < offset + COUNT.size:
+            raise ValueError('模型更新数据不完整')
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        if len(data) < offset + count * 4:
+            raise ValueError('模型更新数据不完整')
+        indices = np.frombuffer(data, dtype='<u4', count=count, offset=offset)
+        offset += indices.nbytes
+        if count and (int(indices[-1]) >= size or (np.diff(indices.astype(np.int64)) <= 0).any()):
+            raise ValueError('稀疏下标无效')
+    if len(data) != offset + count * header['dtype'].itemsize:
+        raise ValueError('模型更新数据长度与头部不符')
+    values = np.frombuffer(data, dtype=header['dtype'], count=count, offset=offset)
+
+    if header['delta']:
+        if base is None:
+            raise ValueError('差分编码的更新需要基准模型')
+        full = flatten(base)
+        if full.shape != (size,):
+            raise ValueError('模型参数维度与基准模型不一致')
+        if header['sparse']:
+            full[indices] += values
+        else:
+            full += values
+        values = full
+
+    layout = _layout(rows, cols)
+    return {
+        'model_weights': values[layout['model_weights']].reshape(rows, cols),
+        'intercept': values[layout['intercept']],
+        'scaler_mean': values[layout['scaler_mean']],
+        'scaler_var': values[layout['scaler_var']],
+        'n_samples': header['n_samples'],
+        'base_version': header['base_version']
+    }
@@ -2,167 +2,173 @@
 import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
-import joblib
-import os
+import copy
 from datetime import datetime
+from app.services.feature_extraction import extract_features, health_scores, SCORE_METRICS
+from app.services.model_registry import get_registry, LEGACY_VERSION
+from app.services.federated_rounds import RoundAggregator, parse_update
+from app.services.federated_codec import decode_update, read_header
+from app.models.user import HealthRecord
+from app.config import Config
 
 class FederatedLearning:
     def __init__(self):
-        self.model = LogisticRegression()
-        self.scaler = StandardScaler()
-        self.model_path = 'app/models/federated_model.pkl'
-        self.scaler_path = 'app/models/federated_scaler.pkl'
+        self.models_dir = Config.MODEL_DIR
         
-        # 加载或初始化模型
-        if os.path.exists(self.model_path):
-            self.model = joblib.load(self.model_path)
-        if os.path.exists(self.scaler_path):
-            self.scaler = joblib.load(self.scaler_path)
+        # 模型和标准化器作为一个版本整体保存，由注册表按需加载并热切换
+        self.registry = get_registry(self.models_dir)
+        
+        # 客户端更新先在聚合轮次中加权平均，达到提交条件后才更新全局模型
+        self.rounds = RoundAggregator(self.update_global_model)
+    
+    def warm_up(self):
+        """预先加载全局模型"""
+        self._load_global_model()
+    
+    def _load_global_model(self):
+        """获取当前全局模型，返回(model, scaler, version)"""
+        bundle, version = self.registry.get('federated')
+        if bundle is not None:
+            return bundle['model'], bundle['scaler'], version
+            
+        # 兼容旧版单独保存的模型文件
+        model, version = self.registry.get('federated_model')
+        scaler, _ = self.registry.get('federated_scaler')
+        return model, scaler, version
+    
+    def global_parameters(self, version=None):
+        """当前（或指定版本）全局模型的参数，作为差分编码的基准；方差取scale_的平方
+
+        模型不存在时返回None。
+        """
+        model, scaler, current = self._load_global_model()
+        if version is not None and version != current:
+            bundle = self.registry.load_version('federated', version)
+            model, scaler = (bundle['model'], bundle['scaler']) if bundle is not None else (None, None)
+            current = version
+        if model is None or scaler is None:
+            return None
+        return {
+            'model_weights': np.atleast_2d(model.coef_),
+            'intercept': np.atleast_1d(model.intercept_),
+            'scaler_mean': np.asarray(scaler.mean_),
+            'scaler_var': np.square(scaler.scale_),
+            'model_version': current
+        }
+    
+    def _save_global_model(self, model, scaler, previous=None):
+        """保存为新版本，返回版本号
+
+        被替换的版本previous不随旧版本一起清理：客户端基于它训练、尚未上传的
+        差分更新在下一轮仍能解码。更早的版本只按MODEL_KEEP_VERSIONS保留。
+        """
+        pinned = [previous] if previous and previous != LEGACY_VERSION else []
+        return self.registry.save('federated', {'model': model, 'scaler': scaler}, pinned=pinned)
     
     def prepare_data(self, health_records):
         """准备训练数据"""
-        if not health_records:
+        if health_records is None or len(health_records) == 0:
             return None, None
             
-        # 提取特征
-        X = []
-        y = []
-        
-        for record in health_records:
-            features = []
-            # 心率
-            if record.get('heart_rate'):
-                features.append(record['heart_rate'])
-            else:
-                features.append(0)
-                
-            # 血压
-            if record.get('blood_pressure'):
-                systolic, diastolic = map(float, record['blood_pressure'].split('/'))
-                features.extend([systolic, diastolic])
-            else:
-                features.extend([0, 0])
-                
-            # 血糖
-            if record.get('blood_sugar'):
-                features.append(record['blood_sugar'])
-            else:
-                features.append(0)
-                
-            # 体重
-            if record.get('weight'):
-                features.append(record['weight'])
-            else:
-                features.append(0)
-                
-            # 睡眠时长
-            if record.get('sleep_hours'):
-                features.append(record['sleep_hours'])
-            else:
-                features.append(0)
-                
-            # 情绪评分
-            if record.get('mood_score'):
-                features.append(record['mood_score'])
-            else:
-                features.append(0)
-                
-            X.append(features)
-            
-            # 标签：根据健康指标综合评分
-            health_score = self._calculate_health_score(record)
-            y.append(1 if health_score >= 0.7 else 0)  # 1表示健康，0表示需要关注
-            
-        return np.array(X), np.array(y)
+        # 提取特征；标签：1表示健康，0表示需要关注
+        return extract_features(health_records, label_metrics=SCORE_METRICS, zero_as_missing=True)
     
     def _calculate_health_score(self, record):
         """计算健康评分"""
-        score = 0
-        count = 0
-        
-        # 心率评分
-        if record.get('heart_rate'):
-            heart_rate = record['heart_rate']
-            if 60 <= heart_rate <= 100:
-                score += 1
-            count += 1
-            
-        # 血压评分
-        if record.get('blood_pressure'):
-            systolic, diastolic = map(float, record['blood_pressure'].split('/'))
-            if 90 <= systolic <= 140 and 60 <= diastolic <= 90:
-                score += 1
-            count += 1
-            
-        # 血糖评分
-        if record.get('blood_sugar'):
-            blood_sugar = record['blood_sugar']
-            if 3.9 <= blood_sugar <= 6.1:
-                score += 1
-            count += 1
-            
-        # 睡眠评分
-        if record.get('sleep_hours'):
-            sleep_hours = record['sleep_hours']
-            if 7 <= sleep_hours <= 9:
-                score += 1
-            count += 1
-            
-        # 情绪评分
-        if record.get('mood_score'):
-            mood_score = record['mood_score']
-            if mood_score >= 6:
-                score += 1
-            count += 1
-            
-        return score / count if count > 0 else 0
+        return float(health_scores([record], zero_as_missing=True)[0])
     
     def train_local_model(self, health_records):
-        """训练本地模型"""
+        """训练本地模型，只返回参数，不写入全局模型
+
+        全局模型只由聚合轮次提交时发布；返回的model_version为训练时的全局模型版本，
+        客户端可以把它作为差分编码的基准。
+        """
         X, y = self.prepare_data(health_records)
         if X is None or len(X) == 0:
             return None
             
         # 标准化特征
-        X_scaled = self.scaler.fit_transform(X)
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
         
         # 训练模型
-        self.model.fit(X_scaled, y)
+        model = LogisticRegression()
+        model.fit(X_scaled, y)
         
-        # 保存模型
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
+        _, _, version = self._load_global_model()
         
         return {
-            'model_weights': self.model.coef_.tolist(),
-            'intercept': self.model.intercept_.tolist(),
-            'scaler_mean': self.scaler.mean_.tolist(),
-            'scaler_scale': self.scaler.scale_.tolist()
+            'model_weights': model.coef_.tolist(),
+            'intercept': model.intercept_.tolist(),
+            'scaler_mean': scaler.mean_.tolist(),
+            'scaler_scale': scaler.scale_.tolist(),
+            'scaler_var': scaler.var_.tolist(),
+            'n_samples': int(len(X)),
+            'model_version': version
         }
     
+    def submit_update(self, user_id, params):
+        """把客户端的本地模型参数计入当前聚合轮次，返回轮次进度
+
+        客户端上报的样本数不超过该用户实际的健康记录数。
+        """
+        update = parse_update(params)
+        update['n'] = min(update['n'], HealthRecord.query.filter_by(user_id=user_id).count())
+        if update['n'] < 1:
+            raise ValueError('没有健康记录，不能提交模型更新')
+        return self.rounds.submit(user_id, update)
+    
+    def decode_update(self, data):
+        """解码二进制模型更新；差分编码时按头部中的版本号取基准模型"""
+        base_version = read_header(data)['base_version']
+        base = None
+        if base_version is not None:
+            base = self.global_parameters(base_version)
+            if base is None:
+                raise ValueError(f'基准模型版本不存在或已被清理，请基于当前全局模型重新编码: {base_version}')
+        return decode_update(data, base)
+    
+    def round_status(self):
+        """聚合轮次状态，已到截止时间的轮次会在此时提交"""
+        return self.rounds.status()
+    
     def update_global_model(self, global_weights, global_intercept, global_scaler_mean, global_scaler_scale):
-        """更新全局模型参数"""
-        self.model.coef_ = np.array(global_weights)
-        self.model.intercept_ = np.array(global_intercept)
-        self.scaler.mean_ = np.array(global_scaler_mean)
-        self.scaler.scale_ = np.array(global_scaler_scale)
+        """更新全局模型参数，返回新版本号"""
+        model, scaler, previous = self._load_global_model()
+        
+        # 在副本上修改，正在使用旧版本的请求不受影响
+        model = copy.deepcopy(model) if model is not None else LogisticRegression()
+        scaler = copy.deepcopy(scaler) if scaler is not None else StandardScaler()
+        if not hasattr(model, 'classes_'):
+            model.classes_ = np.array([0, 1])
+            
+        model.coef_ = np.array(global_weights)
+        model.intercept_ = np.array(global_intercept)
+        scaler.mean_ = np.array(global_scaler_mean)
+        scaler.scale_ = np.array(global_scaler_scale)
+        model.n_features_in_ = model.coef_.shape[-1]
+        scaler.n_features_in_ = scaler.mean_.shape[0]
         
         # 保存更新后的模型
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
+        return self._save_global_model(model, scaler, previous)
     
     def predict_health_status(self, health_record):
         """预测健康状态"""
+        model, scaler, version = self._load_global_model()
+        if model is None or scaler is None:
+            return None
+            
         X, _ = self.prepare_data([health_record])
         if X is None:
             return None
             
-        X_scaled = self.scaler.transform(X)
-        prediction = self.model.predict(X_scaled)[0]
-        probability = self.model.predict_proba(X_scaled)[0][1]
+        X_scaled = scaler.transform(X)
+        prediction = model.predict(X_scaled)[0]
+        probability = model.predict_proba(X_scaled)[0][1]
         
         return {
             'prediction': int(prediction),
             'probability': float(probability),
-            'health_score': self._calculate_health_score(health_record)
-        } 
\ No newline at end of file
+            'health_score': self._calculate_health_score(health_record),
+            'model_version': version
+        }
\ No newline at end of file
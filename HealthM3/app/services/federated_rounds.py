@@ -0,0 +1,287 @@
+# 联邦学习聚合轮次：逐个合并客户端更新（按样本数加权的FedAvg），达到法定人数或截止时间后提交全局模型
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.config import Config
+from app.models.federated_round import FederatedRound, FederatedRoundUpdate
+
+rounds = FederatedRound.__table__
+round_updates = FederatedRoundUpdate.__table__
+
+
+class DuplicateUpdateError(ValueError):
+    """同一用户在一轮中重复提交更新"""
+
+
+def parse_update(data: Dict) -> Dict:
+    """校验客户端提交的模型参数并转换为数组
+
+    n_samples为本地训练的样本数（旧客户端不提供时按1计，即不加权），超过
+    FL_MAX_SAMPLES_PER_UPDATE时按上限计，避免单个客户端主导平均值；
+    scaler_var缺失时由scaler_scale的平方得到。
+    """
+    try:
+        coef = np.atleast_2d(np.asarray(data['model_weights'], dtype=np.float64))
+        intercept = np.atleast_1d(np.asarray(data['intercept'], dtype=np.float64))
+        mean = np.asarray(data['scaler_mean'], dtype=np.float64).ravel()
+        if data.get('scaler_var') is not None:
+            var = np.asarray(data['scaler_var'], dtype=np.float64).ravel()
+        else:
+            var = np.square(np.asarray(data['scaler_scale'], dtype=np.float64).ravel())
+        n = int(data.get('n_samples') or 1)
+    except (TypeError, ValueError):
+        raise ValueError('模型参数格式错误')
+
+    if n < 1:
+        raise ValueError('样本数必须为正整数')
+    n = min(n, Config.FL_MAX_SAMPLES_PER_UPDATE)
+    if coef.ndim != 2 or intercept.shape != (coef.shape[0],) \
+            or mean.shape != (coef.shape[1],) or var.shape != mean.shape:
+        raise ValueError('模型参数维度不一致')
+    if not all(np.isfinite(array).all() for array in (coef, intercept, mean, var)) or (var < 0).any():
+        raise ValueError('模型参数包含无效数值')
+    return {'n': n, 'coef': coef, 'intercept': intercept, 'mean': mean, 'var': var}
+
+
+def merge(state: Optional[Dict], update: Dict) -> Dict:
+    """把一个客户端的更新并入累计量
+
+    系数和截距累加n_i * w_i；标准化器按分组合并公式（Chan等）合并均值和离差平方和：
+        delta = mean_i - mean
+        mean' = mean + delta * n_i / N'
+        M2'   = M2 + n_i * var_i + delta² * N * n_i / N'
+    """
+    n = update['n']
+    if state is None:
+        return {
+            'n': n,
+            'coef_sum': update['coef'] * n,
+            'intercept_sum': update['intercept'] * n,
+            'mean': update['mean'].copy(),
+            'm2': update['var'] * n
+        }
+    if update['coef'].shape != state['coef_sum'].shape:
+        raise ValueError('模型参数维度与本轮其他客户端不一致')
+
+    total = state['n'] + n
+    delta = update['mean'] - state['mean']
+    return {
+        'n': total,
+        'coef_sum': state['coef_sum'] + update['coef'] * n,
+        'intercept_sum': state['intercept_sum'] + update['intercept'] * n,
+        'mean': state['mean'] + delta * (n / total),
+        'm2': state['m2'] + update['var'] * n + np.square(delta) * (state['n'] * n / total)
+    }
+
+
+def finalize(state: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """由累计量得到加权平均的(系数, 截距, 均值, 标准差)"""
+    n = state['n']
+    scale = np.sqrt(state['m2'] / n)
+    # 与StandardScaler一致，方差为0的特征不缩放
+    scale[scale == 0] = 1.0
+    return state['coef_sum'] / n, state['intercept_sum'] / n, state['mean'].copy(), scale
+
+
+def _load_state(row) -> Dict:
+    shape = tuple(int(size) for size in row.coef_shape.split(','))
+    return {
+        'n': row.sample_count,
+        'coef_sum': np.frombuffer(row.coef_sum, dtype=np.float64).reshape(shape),
+        'intercept_sum': np.frombuffer(row.intercept_sum, dtype=np.float64),
+        'mean': np.frombuffer(row.scaler_mean, dtype=np.float64),
+        'm2': np.frombuffer(row.scaler_m2, dtype=np.float64)
+    }
+
+
+def _state_values(state: Dict) -> Dict:
+    return {
+        'sample_count': int(state['n']),
+        'coef_shape': ','.join(str(size) for size in state['coef_sum'].shape),
+        'coef_sum': state['coef_sum'].astype(np.float64).tobytes(),
+        'intercept_sum': state['intercept_sum'].astype(np.float64).tobytes(),
+        'scaler_mean': state['mean'].astype(np.float64).tobytes(),
+        'scaler_m2': state['m2'].astype(np.float64).tobytes()
+    }
+
+
+class RoundAggregator:
+    """跨worker共享的聚合轮次
+
+    轮次状态保存在federated_rounds表中，提交更新时读取当前累计量、合并后按revision
+    条件更新（乐观锁），冲突时重试。第一个更新到达时开启新一轮，客户端数达到quorum
+    或超过截止时间且至少有min_clients个客户端时，把加权平均后的参数交给commit_model
+    保存为新的全局模型。
+
+    提交分两步：先在数据库事务中把轮次标记为发布中（COMMITTING）并提交事务，再写模型
+    文件并记录版本号。写模型文件时不持有数据库写锁；发布失败或进程中途退出时轮次停留在
+    发布中，超过publish_timeout后由commit_due重新发布（结果只取决于已保存的累计量，
+    重复发布得到的模型相同）。
+    """
+
+    def __init__(self, commit_model: Callable[..., str], quorum: Optional[int] = None,
+                 deadline_seconds: Optional[int] = None, min_clients: Optional[int] = None,
+                 publish_timeout: Optional[int] = None, max_retries: int = 10):
+        self.logger = logging.getLogger(__name__)
+        self.commit_model = commit_model
+        self.quorum = quorum or Config.FL_ROUND_QUORUM
+        self.deadline = timedelta(seconds=deadline_seconds or Config.FL_ROUND_DEADLINE)
+        self.min_clients = min_clients or Config.FL_ROUND_MIN_CLIENTS
+        self.publish_timeout = timedelta(seconds=publish_timeout or Config.FL_ROUND_PUBLISH_TIMEOUT)
+        self.max_retries = max_retries
+
+    def _open_round(self):
+        return db.session.execute(
+            select(rounds).where(rounds.c.status == FederatedRound.OPEN).order_by(rounds.c.id.desc()).limit(1)
+        ).first()
+
+    def _is_due(self, row, now: datetime) -> bool:
+        return row.client_count >= self.quorum or \
+            (row.deadline <= now and row.client_count >= self.min_clients)
+
+    def _claim(self, round_id: int, revision: int, now: datetime) -> bool:
+        """在当前事务中把本轮标记为发布中；本轮已被其他worker结束时返回False"""
+        return bool(db.session.execute(
+            rounds.update()
+            .where(rounds.c.id == round_id, rounds.c.revision == revision,
+                   rounds.c.status == FederatedRound.OPEN)
+            .values(status=FederatedRound.COMMITTING, committed_at=now, revision=revision + 1)
+        ).rowcount)
+
+    def _publish(self, round_id: int) -> Optional[str]:
+        """保存已认领轮次的全局模型并记录版本号，须在认领的事务提交后调用；失败时返回None"""
+        try:
+            row = db.session.execute(select(rounds).where(rounds.c.id == round_id)).first()
+            version = self.commit_model(*finalize(_load_state(row)))
+            db.session.execute(
+                rounds.update()
+                .where(rounds.c.id == round_id, rounds.c.status == FederatedRound.COMMITTING)
+                .values(status=FederatedRound.COMMITTED, model_version=version, committed_at=datetime.utcnow())
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"发布第{round_id}轮全局模型失败，将在超时后重试: {str(e)}")
+            return None
+        return version
+
+    def _reclaim_stale(self, now: datetime) -> List[int]:
+        """重新认领发布超时的轮次（发布失败或发布进程已退出），返回认领到的轮次编号"""
+        stale = db.session.execute(
+            select(rounds.c.id, rounds.c.committed_at)
+            .where(rounds.c.status == FederatedRound.COMMITTING,
+                   rounds.c.committed_at < now - self.publish_timeout)
+        ).all()
+        claimed = []
+        for round_id, claimed_at in stale:
+            if db.session.execute(
+                rounds.update()
+                .where(rounds.c.id == round_id, rounds.c.status == FederatedRound.COMMITTING,
+                       rounds.c.committed_at == claimed_at)
+                .values(committed_at=now)
+            ).rowcount:
+                claimed.append(round_id)
+        db.session.commit()
+        return claimed
+
+    def commit_due(self) -> Optional[str]:
+        """发布超时未完成的轮次，并提交已到截止时间的当前轮次，返回最后发布的模型版本号"""
+        now = datetime.utcnow()
+        version = None
+        try:
+            stale = self._reclaim_stale(now)
+            row = self._open_round()
+            claimed = row is not None and self._is_due(row, now) and self._claim(row.id, row.revision, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for round_id in stale + ([row.id] if claimed else []):
+            version = self._publish(round_id) or version
+        return version
+
+    def submit(self, user_id: int, update: Dict) -> Dict:
+        """把客户端更新计入当前轮次，返回轮次进度；本次更新使本轮达到提交条件时一并提交"""
+        for _ in range(self.max_retries):
+            now = datetime.utcnow()
+            row = self._open_round()
+            if row is not None and self._is_due(row, now):
+                # 当前轮次已过截止时间，先提交，更新计入下一轮
+                self.commit_due()
+                continue
+            if row is not None and db.session.execute(
+                select(round_updates.c.user_id)
+                .where(round_updates.c.round_id == row.id, round_updates.c.user_id == user_id)
+            ).first() is not None:
+                db.session.rollback()
+                raise DuplicateUpdateError(f'本轮（第{row.id}轮）已提交过更新')
+
+            state = merge(_load_state(row) if row is not None else None, update)
+            try:
+                if row is None:
+                    round_id, revision, client_count = \
+                        (db.session.execute(select(func.max(rounds.c.id))).scalar() or 0) + 1, 1, 1
+                    db.session.execute(rounds.insert().values(
+                        id=round_id, status=FederatedRound.OPEN, revision=revision, client_count=client_count,
+                        created_at=now, deadline=now + self.deadline, **_state_values(state)
+                    ))
+                else:
+                    round_id, revision, client_count = row.id, row.revision + 1, row.client_count + 1
+                    updated = db.session.execute(
+                        rounds.update()
+                        .where(rounds.c.id == row.id, rounds.c.revision == row.revision,
+                               rounds.c.status == FederatedRound.OPEN)
+                        .values(revision=revision, client_count=client_count, **_state_values(state))
+                    ).rowcount
+                    if not updated:
+                        # 其他worker已修改本轮，重新读取后再合并
+                        db.session.rollback()
+                        continue
+                db.session.execute(round_updates.insert().values(
+                    round_id=round_id, user_id=user_id, sample_count=update['n'], received_at=now
+                ))
+
+                claimed = client_count >= self.quorum and self._claim(round_id, revision, now)
+                db.session.commit()
+            except IntegrityError:
+                # 并发开启了同一轮次，或同一用户并发提交，重试时会重新检查
+                db.session.rollback()
+                continue
+            except Exception:
+                db.session.rollback()
+                raise
+
+            version = self._publish(round_id) if claimed else None
+            return {
+                'round_id': round_id,
+                'client_count': client_count,
+                'sample_count': int(state['n']),
+                'quorum': self.quorum,
+                'committed': version is not None,
+                'model_version': version
+            }
+        raise RuntimeError('并发提交冲突过多，请稍后重试')
+
+    def status(self) -> Dict:
+        """当前开放轮次和最近一次提交的轮次"""
+        try:
+            self.commit_due()
+        except Exception as e:
+            # 查询状态不因提交失败而出错，下次查询或提交更新时会重试
+            self.logger.error(f"提交到期的聚合轮次失败: {str(e)}")
+        current = FederatedRound.query.filter_by(status=FederatedRound.OPEN) \
+            .order_by(FederatedRound.id.desc()).first()
+        last = FederatedRound.query.filter_by(status=FederatedRound.COMMITTED) \
+            .order_by(FederatedRound.id.desc()).first()
+        return {
+            'quorum': self.quorum,
+            'deadline_seconds': int(self.deadline.total_seconds()),
+            'current_round': current.to_dict() if current else None,
+            'last_committed_round': last.to_dict() if last else None
+        }
@@ -0,0 +1,258 @@
+# 健康指标累计统计：记录增删改时在同一事务内增量更新，读取时O(1)得到均值、标准差和趋势
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, select, func, case, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.user import HealthRecord
+from app.models.health_aggregate import HealthAggregate
+
+METRICS = ('health_score', 'mood_score')
+# 影响统计量的记录字段
+RECORD_FIELDS = ('user_id', 'heart_rate', 'blood_pressure', 'systolic_bp', 'diastolic_bp',
+                 'blood_sugar', 'sleep_hours', 'mood_score', 'recorded_at')
+
+aggregates = HealthAggregate.__table__
+
+
+def _to_x(recorded_at) -> float:
+    return (recorded_at - HealthAggregate.EPOCH).total_seconds() / 86400
+
+
+def _observations(values: Dict) -> Dict[str, Tuple[float, float]]:
+    """一条记录对各项指标贡献的(x, y)，缺失的指标不计入"""
+    from app.services.feature_extraction import record_health_score
+
+    recorded_at = values.get('recorded_at')
+    if recorded_at is None:
+        return {}
+    x = _to_x(recorded_at)
+    observations = {'health_score': (x, record_health_score(values))}
+    if values.get('mood_score') is not None:
+        observations['mood_score'] = (x, float(values['mood_score']))
+    return observations
+
+
+def _accumulate(totals: Dict, points: List[Tuple[float, float]], origin: Optional[float] = None) -> Dict:
+    """把一组(x, y)计入累计和，x相对totals['origin_x']计算；首次累计时原点取origin，未指定时取最早的x"""
+    xs = [x for x, _ in points]
+    if 'origin_x' not in totals:
+        totals['origin_x'] = min(xs) if origin is None else origin
+    dxs = [x - totals['origin_x'] for x in xs]
+    totals['count'] = totals.get('count', 0) + len(points)
+    totals['sum_x'] = totals.get('sum_x', 0.0) + math.fsum(dxs)
+    totals['sum_xx'] = totals.get('sum_xx', 0.0) + math.fsum(dx * dx for dx in dxs)
+    totals['sum_y'] = totals.get('sum_y', 0.0) + math.fsum(y for _, y in points)
+    totals['sum_yy'] = totals.get('sum_yy', 0.0) + math.fsum(y * y for _, y in points)
+    totals['sum_xy'] = totals.get('sum_xy', 0.0) + math.fsum(dx * y for dx, (_, y) in zip(dxs, points))
+    totals['min_x'] = min(xs + [totals['min_x']] if totals.get('min_x') is not None else xs)
+    totals['max_x'] = max(xs + [totals['max_x']] if totals.get('max_x') is not None else xs)
+    return totals
+
+
+def _apply(connection, user_id: int, metric: str, totals: Dict, sign: int):
+    """把累计和加到（sign=1）或从（sign=-1）数据库中的统计量上
+
+    用UPDATE ... SET sum = sum + ?在数据库中原子累加；统计量行不存在时不做任何事，
+    首次读取时会从记录重建。totals相对自己的原点计算，累加前平移到行的origin_x：
+    x' = x + d，d = totals原点 - origin_x。
+    """
+    c = aggregates.c
+    n = totals['count']
+    d = totals['origin_x'] - c.origin_x
+    deltas = {
+        'count': n,
+        'sum_x': totals['sum_x'] + n * d,
+        'sum_xx': totals['sum_xx'] + 2 * totals['sum_x'] * d + n * d * d,
+        'sum_y': totals['sum_y'],
+        'sum_yy': totals['sum_yy'],
+        'sum_xy': totals['sum_xy'] + totals['sum_y'] * d
+    }
+    values = {name: getattr(c, name) + sign * delta for name, delta in deltas.items()}
+    if sign > 0:
+        low, high = totals['min_x'], totals['max_x']
+        values['min_x'] = case((or_(c.min_x.is_(None), c.min_x > low), low), else_=c.min_x)
+        values['max_x'] = case((or_(c.max_x.is_(None), c.max_x < high), high), else_=c.max_x)
+    connection.execute(
+        aggregates.update().where(c.user_id == user_id, c.metric == metric).values(**values)
+    )
+
+
+def _refresh_bounds(connection, user_id: int):
+    """删除记录后时间范围可能收缩，按(user_id, recorded_at)索引重新取首末时间"""
+    for metric in METRICS:
+        condition = HealthRecord.user_id == user_id
+        if metric == 'mood_score':
+            condition = condition & HealthRecord.mood_score.isnot(None)
+        low, high = connection.execute(
+            select(func.min(HealthRecord.recorded_at), func.max(HealthRecord.recorded_at)).where(condition)
+        ).one()
+        connection.execute(
+            aggregates.update()
+            .where(aggregates.c.user_id == user_id, aggregates.c.metric == metric)
+            .values(min_x=_to_x(low) if low else None, max_x=_to_x(high) if high else None)
+        )
+
+
+def _group_totals(records: Iterable[Dict], groups: Dict = None, origin: Optional[float] = None) -> Dict:
+    """按(用户, 指标)分组计算累计和"""
+    points = {}
+    for values in records:
+        for metric, point in _observations(values).items():
+            points.setdefault((values['user_id'], metric), []).append(point)
+    groups = {} if groups is None else groups
+    for key, group in points.items():
+        _accumulate(groups.setdefault(key, {}), group, origin)
+    return groups
+
+
+def _apply_records(connection, records: Iterable[Dict], sign: int):
+    for (user_id, metric), totals in _group_totals(records).items():
+        _apply(connection, user_id, metric, totals, sign)
+
+
+def record_rows_inserted(rows: List[Dict]):
+    """Core批量插入不触发ORM事件，插入后在同一事务内调用本函数更新统计量"""
+    _apply_records(db.session.connection(), rows, 1)
+
+
+def _record_values(target, old=False) -> Dict:
+    """取出记录的相关字段；old=True时取本次修改之前的值"""
+    state = db.inspect(target)
+    values = {}
+    for field in RECORD_FIELDS:
+        history = state.attrs[field].history
+        if old and history.has_changes():
+            # 字段开启了active_history，没有旧值说明原值为None
+            values[field] = history.deleted[0] if history.deleted else None
+        else:
+            values[field] = getattr(target, field)
+    return values
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# 修改这些字段时总是加载旧值，before_update中才能扣除旧的贡献
+for _field in RECORD_FIELDS:
+    event.listen(getattr(HealthRecord, _field), 'set', _load_old_value, active_history=True)
+
+
+@event.listens_for(HealthRecord, 'after_insert')
+def _on_insert(mapper, connection, target):
+    _apply_records(connection, [_record_values(target)], 1)
+
+
+@event.listens_for(HealthRecord, 'before_update')
+def _on_update(mapper, connection, target):
+    state = db.inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in RECORD_FIELDS):
+        return
+    _apply_records(connection, [_record_values(target, old=True)], -1)
+    _apply_records(connection, [_record_values(target)], 1)
+
+
+@event.listens_for(HealthRecord, 'after_update')
+def _after_update(mapper, connection, target):
+    # 记录时间变化或换了用户时，原用户的时间范围可能收缩
+    state = db.inspect(target)
+    if state.attrs.recorded_at.history.has_changes() or state.attrs.user_id.history.has_changes():
+        _refresh_bounds(connection, _record_values(target, old=True)['user_id'])
+
+
+@event.listens_for(HealthRecord, 'before_delete')
+def _on_delete(mapper, connection, target):
+    # 删除后对象无法再加载属性，在删除前扣除
+    _apply_records(connection, [_record_values(target)], -1)
+
+
+@event.listens_for(HealthRecord, 'after_delete')
+def _after_delete(mapper, connection, target):
+    _refresh_bounds(connection, target.user_id)
+
+
+def rebuild(user_id: int, batch_size: int = 10000):
+    """从健康记录完整重建某个用户的统计量（首次读取或数据修复时使用）
+
+    先写入空的统计量行再读取记录：并发新增、修改或删除记录的事务更新统计量时
+    会等待本事务结束，随后在重建的结果上继续累加，不会丢失（SQLite在第一次写入
+    时即取得数据库写锁）。只在调用方的会话中执行，不提交。
+    """
+    columns = [HealthRecord.id] + [getattr(HealthRecord, field) for field in RECORD_FIELDS]
+    # 以用户最早的记录时间为原点；还没有记录时以当前时间为原点，之后新增的记录也在其附近
+    first = db.session.execute(
+        select(func.min(HealthRecord.recorded_at)).where(HealthRecord.user_id == user_id)
+    ).scalar()
+    origin = _to_x(first or datetime.utcnow())
+    empty = {'count': 0, 'origin_x': origin, 'sum_x': 0.0, 'sum_xx': 0.0, 'sum_y': 0.0, 'sum_yy': 0.0,
+             'sum_xy': 0.0, 'min_x': None, 'max_x': None}
+    db.session.execute(aggregates.delete().where(aggregates.c.user_id == user_id))
+    db.session.execute(aggregates.insert(), [dict(empty, user_id=user_id, metric=metric) for metric in METRICS])
+
+    groups = {}
+    last_id = 0
+    # 按主键分批读取，内存占用与记录数无关；加共享锁读取最新提交的记录
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(HealthRecord.user_id == user_id, HealthRecord.id > last_id)
+            .order_by(HealthRecord.id)
+            .limit(batch_size)
+            .with_for_update(read=True)
+        ).all()
+        if not rows:
+            break
+        _group_totals([dict(row._mapping) for row in rows], groups, origin)
+        last_id = rows[-1].id
+
+    for metric in METRICS:
+        totals = groups.get((user_id, metric))
+        if totals:
+            db.session.execute(
+                aggregates.update()
+                .where(aggregates.c.user_id == user_id, aggregates.c.metric == metric)
+                .values(**totals)
+            )
+
+
+def describe(aggregate: HealthAggregate) -> Dict:
+    """由累计和计算记录数、均值、标准差和趋势
+
+    趋势是对时间的最小二乘斜率乘以平均记录间隔，即"每条记录"的变化量，
+    记录等间隔时与对序号做np.polyfit的结果相同。均值、方差和斜率与x的原点无关。
+    """
+    n = aggregate.count if aggregate else 0
+    if n <= 0:
+        return {'count': 0, 'mean': None, 'std': None, 'trend': 0.0}
+    mean = aggregate.sum_y / n
+    variance = max(aggregate.sum_yy / n - mean * mean, 0.0)
+
+    trend = 0.0
+    denominator = n * aggregate.sum_xx - aggregate.sum_x * aggregate.sum_x
+    if n > 1 and denominator > 1e-14 * n * aggregate.sum_xx:
+        slope = (n * aggregate.sum_xy - aggregate.sum_x * aggregate.sum_y) / denominator
+        trend = slope * (aggregate.max_x - aggregate.min_x) / (n - 1)
+    return {'count': n, 'mean': mean, 'std': math.sqrt(variance), 'trend': trend}
+
+
+def summary(user_id: int, metric: str) -> Dict:
+    """读取用户某项指标的统计量
+
+    统计量尚不存在时在保存点内重建，不提交调用方的会话；重建结果随调用方的事务提交。
+    """
+    if metric not in METRICS:
+        raise ValueError(f'未知指标: {metric}')
+    aggregate = HealthAggregate.query.get((user_id, metric))
+    if aggregate is None:
+        try:
+            with db.session.begin_nested():
+                rebuild(user_id)
+        except IntegrityError:
+            # 并发请求已经重建
+            pass
+        aggregate = HealthAggregate.query.get((user_id, metric))
+    return describe(aggregate)
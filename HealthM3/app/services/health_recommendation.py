@@ -1,216 +1,277 @@
 # 健康推荐服务
-from datetime import datetime, timedelta
+from collections import namedtuple
+from operator import attrgetter
+from typing import Dict, List, Sequence, Tuple
 import numpy as np
+from app.models.user import split_blood_pressure
+
+# 状态编号：searchsorted得到的区间下标
+LOW, NORMAL, HIGH = 0, 1, 2
+UNKNOWN = 3
+STATUS_NAMES = ('low', 'normal', 'high', 'unknown')
+
+# 单项指标规则：正常范围（闭区间）以及偏低/正常/偏高时的描述
+MetricRule = namedtuple('MetricRule', ['metric', 'low', 'high', 'descriptions'])
+
+METRIC_RULES = (
+    MetricRule('heart_rate', 60, 100, (
+        "心率偏低，可能感觉疲劳或头晕",
+        "心率正常，心脏功能良好",
+        "心率偏高，可能感觉心跳加快或焦虑"
+    )),
+    MetricRule('blood_sugar', 3.9, 6.1, (
+        "血糖偏低，可能感觉饥饿或头晕",
+        "血糖正常，代谢功能良好",
+        "血糖偏高，需要注意控制"
+    )),
+    MetricRule('sleep_hours', 7, 9, (
+        "睡眠时间不足，可能影响日间表现",
+        "睡眠时间适中，有助于身体恢复",
+        "睡眠时间过长，可能影响身体状态"
+    )),
+    MetricRule('mood_score', 7, 10, (
+        "心情状态欠佳，需要适当调节",
+        "心情状态良好，请继续保持",
+        "心情状态良好，请继续保持"
+    )),
+    MetricRule('weight', 18.5, 24.9, (  # BMI范围
+        "体重偏低，需要适当增加营养摄入",
+        "体重正常，身体状态良好",
+        "体重偏高，需要注意控制"
+    )),
+)
+
+# 血压同时看收缩压和舒张压，任一偏低即为偏低，否则任一偏高即为偏高
+BLOOD_PRESSURE_RANGES = {'systolic': (90, 140), 'diastolic': (60, 90)}
+BLOOD_PRESSURE_DESCRIPTIONS = (
+    "血压偏低，可能感觉头晕或疲劳",
+    "血压正常，循环系统功能良好",
+    "血压偏高，需要注意控制"
+)
+BLOOD_PRESSURE_INVALID = "血压数据格式错误"
+MISSING_DESCRIPTION = "暂无数据"
+
+# 分析结果中指标的顺序
+ANALYSIS_ORDER = ('heart_rate', 'blood_pressure', 'blood_sugar', 'sleep_hours', 'mood_score', 'weight')
+
+DEFAULT_ADVICE = ("请咨询专业医生获取更详细的建议",)
+LOW_ADVICE = {
+    'heart_rate': (
+        "适当进行有氧运动，如散步、慢跑等",
+        "保持充足的休息和睡眠",
+        "如果经常感觉头晕或疲劳，建议咨询医生"
+    ),
+    'blood_pressure': (
+        "适当增加盐分摄入",
+        "保持充足的水分补充",
+        "避免突然起立或剧烈运动"
+    ),
+    'blood_sugar': (
+        "规律进食，避免长时间空腹",
+        "随身携带含糖食物以应对低血糖",
+        "注意营养均衡，适量增加碳水化合物摄入"
+    ),
+    'sleep_hours': (
+        "保持规律的作息时间",
+        "创造良好的睡眠环境",
+        "避免睡前使用电子设备"
+    ),
+    'mood_score': (
+        "尝试进行放松活动，如瑜伽或冥想",
+        "与亲朋好友多交流",
+        "适当参加户外活动，增加阳光接触"
+    ),
+    'weight': (
+        "适当增加饮食量",
+        "增加优质蛋白质的摄入",
+        "进行适度的力量训练"
+    )
+}
+HIGH_ADVICE = {
+    'heart_rate': (
+        "避免剧烈运动和情绪激动",
+        "学习放松技巧，如深呼吸",
+        "减少咖啡因的摄入"
+    ),
+    'blood_pressure': (
+        "限制盐分摄入",
+        "保持规律运动",
+        "避免压力和情绪波动"
+    ),
+    'blood_sugar': (
+        "控制碳水化合物的摄入",
+        "增加运动量",
+        "规律监测血糖水平"
+    ),
+    'sleep_hours': (
+        "适当增加日间活动量",
+        "避免日间过长的午睡",
+        "保持规律的作息时间"
+    ),
+    'weight': (
+        "控制饮食摄入量",
+        "增加运动频率",
+        "选择低热量、高营养的食物"
+    )
+}
+ALL_NORMAL_ADVICE = "您的各项健康指标都在正常范围内，请继续保持当前的健康生活方式！"
+
+
+def _edges(low: float, high: float) -> np.ndarray:
+    """searchsorted(side='right')的分界点：v < low为0，low <= v <= high为1，v > high为2"""
+    return np.array([low, np.nextafter(high, np.inf)], dtype=np.float64)
+
+
+def classify(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """批量判断指标状态，NaN为UNKNOWN"""
+    status = np.searchsorted(_edges(low, high), values, side='right')
+    status[np.isnan(values)] = UNKNOWN
+    return status
+
+
+def _column(records: Sequence, name: str) -> List:
+    """取出一批记录的某个字段，字典按键读取，ORM对象和查询结果行按属性读取"""
+    if records and isinstance(records[0], dict):
+        return [record.get(name) for record in records]
+    try:
+        getter = attrgetter(name)
+        return [getter(record) for record in records]
+    except AttributeError:
+        return [getattr(record, name, None) for record in records]
+
+
+def _as_float(values: Sequence) -> np.ndarray:
+    """转换为浮点数组，None和无法转换的值为NaN"""
+    try:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        result = np.full(len(values), np.nan)
+        for index, value in enumerate(values):
+            try:
+                result[index] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return result
+
+
+def _blood_pressure_columns(records: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """优先使用数值列，缺失时解析血压字符串"""
+    systolic = _as_float(_column(records, 'systolic_bp'))
+    diastolic = _as_float(_column(records, 'diastolic_bp'))
+    missing = np.flatnonzero(np.isnan(systolic) | np.isnan(diastolic)).tolist()
+    if missing:
+        strings = _column(records, 'blood_pressure')
+        for index in missing:
+            parsed = split_blood_pressure(strings[index])
+            systolic[index], diastolic[index] = [np.nan if value is None else value for value in parsed]
+    return systolic, diastolic
+
+
+def classify_blood_pressure(systolic: np.ndarray, diastolic: np.ndarray) -> np.ndarray:
+    """批量判断血压状态，任一偏低即为偏低，否则任一偏高即为偏高"""
+    systolic_status = classify(systolic, *BLOOD_PRESSURE_RANGES['systolic'])
+    diastolic_status = classify(diastolic, *BLOOD_PRESSURE_RANGES['diastolic'])
+    status = np.full(len(systolic), NORMAL)
+    status[(systolic_status == HIGH) | (diastolic_status == HIGH)] = HIGH
+    status[(systolic_status == LOW) | (diastolic_status == LOW)] = LOW
+    status[(systolic_status == UNKNOWN) | (diastolic_status == UNKNOWN)] = UNKNOWN
+    return status
+
+
+def _advice_for(metric: str, status: str) -> Tuple[str, ...]:
+    if status == 'low':
+        return LOW_ADVICE.get(metric, DEFAULT_ADVICE)
+    if status == 'high':
+        return HIGH_ADVICE.get(metric, DEFAULT_ADVICE)
+    return ()
+
+
+def _compile_outcomes() -> Dict[str, Tuple[Tuple[str, str], ...]]:
+    """每个指标各状态对应的(状态名, 描述)"""
+    outcomes = {}
+    for rule in METRIC_RULES:
+        outcomes[rule.metric] = tuple(zip(STATUS_NAMES, rule.descriptions + (MISSING_DESCRIPTION,)))
+    outcomes['blood_pressure'] = tuple(zip(STATUS_NAMES, BLOOD_PRESSURE_DESCRIPTIONS + (BLOOD_PRESSURE_INVALID,)))
+    return outcomes
+
+
+OUTCOMES = _compile_outcomes()
+
 
 class HealthRecommendationService:
     def __init__(self):
-        # 定义健康指标的正常范围
-        self.normal_ranges = {
-            'heart_rate': (60, 100),  # 每分钟心跳次数
-            'blood_sugar': (3.9, 6.1),  # mmol/L
-            'sleep_hours': (7, 9),  # 小时
-            'mood_score': (7, 10),  # 1-10分
-            'weight': (18.5, 24.9)  # BMI范围
-        }
+        # 健康指标的正常范围
+        self.normal_ranges = {rule.metric: (rule.low, rule.high) for rule in METRIC_RULES}
+        # 各指标状态组合 -> 建议列表，组合数有限，算过一次即可复用
+        self._recommendation_memo: Dict[Tuple, Tuple[str, ...]] = {}
+
+    def _evaluate(self, records: Sequence) -> Tuple[Dict[str, List], Dict[str, np.ndarray]]:
+        """批量求各指标的原始值和状态编号"""
+        values, statuses = {}, {}
+        for rule in METRIC_RULES:
+            values[rule.metric] = _column(records, rule.metric)
+            statuses[rule.metric] = classify(_as_float(values[rule.metric]), rule.low, rule.high)
+        values['blood_pressure'] = _column(records, 'blood_pressure')
+        statuses['blood_pressure'] = classify_blood_pressure(*_blood_pressure_columns(records))
+        return values, statuses
+
+    def _build_analyses(self, values: Dict[str, List], statuses: Dict[str, np.ndarray]) -> List[Dict]:
+        columns = [
+            (metric, values[metric], statuses[metric].tolist(), OUTCOMES[metric])
+            for metric in ANALYSIS_ORDER
+        ]
+        analyses = [{} for _ in range(len(values['blood_pressure']))]
+        for metric, metric_values, metric_statuses, outcomes in columns:
+            for analysis, value, status in zip(analyses, metric_values, metric_statuses):
+                status_name, description = outcomes[status]
+                analysis[metric] = {'value': value, 'status': status_name, 'description': description}
+        return analyses
+
+    def analyze_batch(self, records: Sequence) -> List[Dict]:
+        """批量分析健康指标，records为ORM对象、查询结果行或字典，返回每条记录的分析结果"""
+        records = list(records)
+        return self._build_analyses(*self._evaluate(records))
 
     def analyze_health_metrics(self, health_record):
         """分析健康指标，返回每个指标的状态评估"""
-        analysis = {}
-        
-        # 分析心率
-        heart_rate = health_record.heart_rate
-        analysis['heart_rate'] = {
-            'value': heart_rate,
-            'status': self._get_status(heart_rate, self.normal_ranges['heart_rate']),
-            'description': self._get_heart_rate_description(heart_rate)
-        }
-        
-        # 分析血压
-        try:
-            systolic, diastolic = map(int, health_record.blood_pressure.split('/'))
-            blood_pressure_status = self._analyze_blood_pressure(systolic, diastolic)
-            analysis['blood_pressure'] = {
-                'value': health_record.blood_pressure,
-                'status': blood_pressure_status,
-                'description': self._get_blood_pressure_description(systolic, diastolic)
-            }
-        except:
-            analysis['blood_pressure'] = {
-                'value': health_record.blood_pressure,
-                'status': 'unknown',
-                'description': '血压数据格式错误'
-            }
-        
-        # 分析血糖
-        blood_sugar = health_record.blood_sugar
-        analysis['blood_sugar'] = {
-            'value': blood_sugar,
-            'status': self._get_status(blood_sugar, self.normal_ranges['blood_sugar']),
-            'description': self._get_blood_sugar_description(blood_sugar)
-        }
-        
-        # 分析睡眠时间
-        sleep_hours = health_record.sleep_hours
-        analysis['sleep_hours'] = {
-            'value': sleep_hours,
-            'status': self._get_status(sleep_hours, self.normal_ranges['sleep_hours']),
-            'description': self._get_sleep_description(sleep_hours)
-        }
-        
-        # 分析心情评分
-        mood_score = health_record.mood_score
-        analysis['mood_score'] = {
-            'value': mood_score,
-            'status': self._get_status(mood_score, self.normal_ranges['mood_score']),
-            'description': self._get_mood_description(mood_score)
-        }
-        
-        # 分析体重（BMI）
-        weight = health_record.weight
-        analysis['weight'] = {
-            'value': weight,
-            'status': self._get_status(weight, self.normal_ranges['weight']),
-            'description': self._get_weight_description(weight)
-        }
-        
-        return analysis
+        return self.analyze_batch([health_record])[0]
+
+    def _recommendations_for(self, key: Tuple[Tuple[str, str], ...]) -> Tuple[str, ...]:
+        recommendations = self._recommendation_memo.get(key)
+        if recommendations is None:
+            recommendations = tuple(
+                advice for metric, status in key for advice in _advice_for(metric, status)
+            ) or (ALL_NORMAL_ADVICE,)
+            self._recommendation_memo[key] = recommendations
+        return recommendations
 
     def generate_recommendations(self, analysis):
         """基于健康指标分析生成个性化建议"""
-        recommendations = []
-        
-        # 根据各项指标状态生成建议
-        for metric, data in analysis.items():
-            if data['status'] == 'low':
-                recommendations.extend(self._get_low_recommendations(metric))
-            elif data['status'] == 'high':
-                recommendations.extend(self._get_high_recommendations(metric))
-        
-        # 如果所有指标正常，添加保持建议
-        if not recommendations:
-            recommendations.append("您的各项健康指标都在正常范围内，请继续保持当前的健康生活方式！")
-        
-        return recommendations
+        key = tuple((metric, data['status']) for metric, data in analysis.items())
+        return list(self._recommendations_for(key))
+
+    def recommend_batch(self, records: Sequence) -> List[Dict]:
+        """批量生成分析和建议，返回[{'analysis': ..., 'recommendations': [...]}]
+
+        建议只取决于各指标的状态组合：把组合编码为整数后去重，每种组合只生成一次建议。
+        """
+        records = list(records)
+        values, statuses = self._evaluate(records)
+        analyses = self._build_analyses(values, statuses)
+
+        codes = np.zeros(len(records), dtype=np.int64)
+        for metric in ANALYSIS_ORDER:
+            codes = codes * len(STATUS_NAMES) + statuses[metric]
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        by_code = []
+        for code in unique_codes.tolist():
+            key = []
+            for metric in reversed(ANALYSIS_ORDER):
+                code, status = divmod(code, len(STATUS_NAMES))
+                key.append((metric, STATUS_NAMES[status]))
+            by_code.append(self._recommendations_for(tuple(reversed(key))))
 
-    def _get_status(self, value, normal_range):
-        """判断指标值的状态（低、正常、高）"""
-        if value < normal_range[0]:
-            return 'low'
-        elif value > normal_range[1]:
-            return 'high'
-        return 'normal'
-
-    def _analyze_blood_pressure(self, systolic, diastolic):
-        """分析血压状态"""
-        if systolic < 90 or diastolic < 60:
-            return 'low'
-        elif systolic > 140 or diastolic > 90:
-            return 'high'
-        return 'normal'
-
-    # 各项指标的描述生成方法
-    def _get_heart_rate_description(self, value):
-        if value < self.normal_ranges['heart_rate'][0]:
-            return "心率偏低，可能感觉疲劳或头晕"
-        elif value > self.normal_ranges['heart_rate'][1]:
-            return "心率偏高，可能感觉心跳加快或焦虑"
-        return "心率正常，心脏功能良好"
-
-    def _get_blood_pressure_description(self, systolic, diastolic):
-        if systolic < 90 or diastolic < 60:
-            return "血压偏低，可能感觉头晕或疲劳"
-        elif systolic > 140 or diastolic > 90:
-            return "血压偏高，需要注意控制"
-        return "血压正常，循环系统功能良好"
-
-    def _get_blood_sugar_description(self, value):
-        if value < self.normal_ranges['blood_sugar'][0]:
-            return "血糖偏低，可能感觉饥饿或头晕"
-        elif value > self.normal_ranges['blood_sugar'][1]:
-            return "血糖偏高，需要注意控制"
-        return "血糖正常，代谢功能良好"
-
-    def _get_sleep_description(self, value):
-        if value < self.normal_ranges['sleep_hours'][0]:
-            return "睡眠时间不足，可能影响日间表现"
-        elif value > self.normal_ranges['sleep_hours'][1]:
-            return "睡眠时间过长，可能影响身体状态"
-        return "睡眠时间适中，有助于身体恢复"
-
-    def _get_mood_description(self, value):
-        if value < self.normal_ranges['mood_score'][0]:
-            return "心情状态欠佳，需要适当调节"
-        return "心情状态良好，请继续保持"
-
-    def _get_weight_description(self, value):
-        if value < self.normal_ranges['weight'][0]:
-            return "体重偏低，需要适当增加营养摄入"
-        elif value > self.normal_ranges['weight'][1]:
-            return "体重偏高，需要注意控制"
-        return "体重正常，身体状态良好"
-
-    # 针对异常指标的建议生成方法
-    def _get_low_recommendations(self, metric):
-        recommendations = {
-            'heart_rate': [
-                "适当进行有氧运动，如散步、慢跑等",
-                "保持充足的休息和睡眠",
-                "如果经常感觉头晕或疲劳，建议咨询医生"
-            ],
-            'blood_pressure': [
-                "适当增加盐分摄入",
-                "保持充足的水分补充",
-                "避免突然起立或剧烈运动"
-            ],
-            'blood_sugar': [
-                "规律进食，避免长时间空腹",
-                "随身携带含糖食物以应对低血糖",
-                "注意营养均衡，适量增加碳水化合物摄入"
-            ],
-            'sleep_hours': [
-                "保持规律的作息时间",
-                "创造良好的睡眠环境",
-                "避免睡前使用电子设备"
-            ],
-            'mood_score': [
-                "尝试进行放松活动，如瑜伽或冥想",
-                "与亲朋好友多交流",
-                "适当参加户外活动，增加阳光接触"
-            ],
-            'weight': [
-                "适当增加饮食量",
-                "增加优质蛋白质的摄入",
-                "进行适度的力量训练"
-            ]
-        }
-        return recommendations.get(metric, ["请咨询专业医生获取更详细的建议"])
-
-    def _get_high_recommendations(self, metric):
-        recommendations = {
-            'heart_rate': [
-                "避免剧烈运动和情绪激动",
-                "学习放松技巧，如深呼吸",
-                "减少咖啡因的摄入"
-            ],
-            'blood_pressure': [
-                "限制盐分摄入",
-                "保持规律运动",
-                "避免压力和情绪波动"
-            ],
-            'blood_sugar': [
-                "控制碳水化合物的摄入",
-                "增加运动量",
-                "规律监测血糖水平"
-            ],
-            'sleep_hours': [
-                "适当增加日间活动量",
-                "避免日间过长的午睡",
-                "保持规律的作息时间"
-            ],
-            'weight': [
-                "控制饮食摄入量",
-                "增加运动频率",
-                "选择低热量、高营养的食物"
-            ]
-        }
-        return recommendations.get(metric, ["请咨询专业医生获取更详细的建议"]) 
\ No newline at end of file
+        return [
+            {'analysis': analysis, 'recommendations': list(by_code[index])}
+            for analysis, index in zip(analyses, inverse.tolist())
+        ]
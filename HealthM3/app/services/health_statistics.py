@@ -0,0 +1,216 @@
+# 健康数据统计：在数据库中按日期分桶聚合，只返回紧凑的数值序列
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select, case, and_
+
+from app import db
+from app.config import Config
+from app.models.user import HealthRecord
+from app.services.record_events import on_records_changed
+from app.utils.cache import UserCache
+
+METRICS = ('heart_rate', 'systolic_bp', 'diastolic_bp', 'blood_sugar',
+           'weight', 'sleep_hours', 'mood_score')
+BUCKETS = ('day', 'week')
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+HISTOGRAM_BINS = 10
+
+# 缓存只在本进程内有效：记录在其他worker中修改后，本进程的结果最多在STATISTICS_CACHE_TTL秒内仍是旧的
+statistics_cache = UserCache(maxsize=Config.STATISTICS_CACHE_SIZE, ttl=Config.STATISTICS_CACHE_TTL)
+
+
+@on_records_changed
+def invalidate_user(user_id):
+    """用户的健康记录有变化时清除其统计缓存"""
+    statistics_cache.invalidate_user(user_id)
+
+
+def _bucket_expression(dialect: str, bucket: str):
+    """把记录时间截断到日或周（周一）的SQL表达式"""
+    column = HealthRecord.recorded_at
+    if dialect == 'sqlite':
+        return func.date(column, 'weekday 0', '-6 days') if bucket == 'week' else func.date(column)
+    if dialect == 'mysql':
+        return func.subdate(func.date(column), func.weekday(column)) if bucket == 'week' else func.date(column)
+    if dialect == 'postgresql':
+        return func.date(func.date_trunc(bucket, column))
+    return func.date(column)
+
+
+def _window_filter(user_id: int, days: int):
+    since = datetime.utcnow() - timedelta(days=days)
+    return and_(HealthRecord.user_id == user_id, HealthRecord.recorded_at >= since)
+
+
+def _number(value, digits=2):
+    return None if value is None else round(float(value), digits)
+
+
+def _label(value) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)[:10]
+
+
+def _cached(kind: str, user_id: int, days: int, compute, *extra):
+    key = (user_id, kind, days) + extra
+    result = statistics_cache.get(key)
+    if result is None:
+        result = compute()
+        statistics_cache.set(key, result)
+    return result
+
+
+def get_trends(user_id: int, days: int, bucket: str = 'day') -> Dict:
+    """按日/周分桶的均值、最小值、最大值序列"""
+    if bucket not in BUCKETS:
+        raise ValueError(f'不支持的分桶方式: {bucket}')
+
+    def compute():
+        bucket_column = _bucket_expression(db.engine.dialect.name, bucket).label('bucket')
+        columns = [bucket_column, func.count(HealthRecord.id)]
+        for metric in METRICS:
+            column = getattr(HealthRecord, metric)
+            columns += [func.avg(column), func.min(column), func.max(column)]
+        rows = db.session.execute(
+            select(*columns)
+            .where(_window_filter(user_id, days))
+            .group_by(bucket_column)
+            .order_by(bucket_column)
+        ).all()
+
+        series = {}
+        for index, metric in enumerate(METRICS):
+            offset = 2 + index * 3
+            series[metric] = {
+                'avg': [_number(row[offset]) for row in rows],
+                'min': [_number(row[offset + 1]) for row in rows],
+                'max': [_number(row[offset + 2]) for row in rows]
+            }
+        return {
+            'days': days,
+            'bucket': bucket,
+            'labels': [_label(row[0]) for row in rows],
+            'count': [row[1] for row in rows],
+            'series': series
+        }
+
+    return _cached('trends', user_id, days, compute, bucket)
+
+
+def _pearson(n, sx, sy, sxx, syy, sxy) -> Optional[float]:
+    if not n or n < 2:
+        return None
+    denominator = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    if denominator <= 0:
+        return None
+    return round((n * sxy - sx * sy) / math.sqrt(denominator), 3)
+
+
+def get_correlation(user_id: int, days: int) -> Dict:
+    """各指标两两之间的皮尔逊相关系数，由数据库一次聚合出所需的和与平方和"""
+
+    def compute():
+        pairs = [(i, j) for i in range(len(METRICS)) for j in range(i + 1, len(METRICS))]
+        columns = []
+        for i, j in pairs:
+            x = getattr(HealthRecord, METRICS[i]) * 1.0
+            y = getattr(HealthRecord, METRICS[j]) * 1.0
+            both = and_(x.isnot(None), y.isnot(None))
+            columns += [
+                func.sum(case((both, 1), else_=0)),
+                func.sum(case((both, x))),
+                func.sum(case((both, y))),
+                func.sum(case((both, x * x))),
+                func.sum(case((both, y * y))),
+                func.sum(case((both, x * y)))
+            ]
+        row = db.session.execute(select(*columns).where(_window_filter(user_id, days))).one()
+
+        matrix = [[1.0 if i == j else None for j in range(len(METRICS))] for i in range(len(METRICS))]
+        for index, (i, j) in enumerate(pairs):
+            sums = [float(value or 0) for value in row[index * 6:index * 6 + 6]]
+            matrix[i][j] = matrix[j][i] = _pearson(*sums)
+        return {'days': days, 'metrics': list(METRICS), 'matrix': matrix}
+
+    return _cached('correlation', user_id, days, compute)
+
+
+def _ranked_values(user_id: int, days: int):
+    """窗口内的各指标值及其在非空值中的升序排名，各指标的排名由同一次扫描得到"""
+    columns = []
+    for metric in METRICS:
+        column = getattr(HealthRecord, metric)
+        columns += [
+            column.label(metric),
+            func.row_number().over(partition_by=column.is_(None), order_by=column).label(f'{metric}_rank')
+        ]
+    return select(*columns).where(_window_filter(user_id, days)).subquery()
+
+
+def _bin_edges(low: float, high: float) -> List[float]:
+    width = (high - low) / HISTOGRAM_BINS or 1.0
+    # 右边界直接取最大值，low + width * HISTOGRAM_BINS的舍入误差可能使其小于最大值
+    last = high if high > low else low + width * HISTOGRAM_BINS
+    return [low + width * i for i in range(HISTOGRAM_BINS)] + [last]
+
+
+def _shape_columns(ranked, metric: str, count: int, low: float, high: float) -> List:
+    """某项指标的分位数和直方图计数对应的聚合列
+
+    分位数取最近秩对应的值；直方图按与返回的边界相同的区间比较计数，
+    不依赖各数据库CAST取整方式的差异，最大值恰好落在右边界时归入最后一个箱。
+    """
+    value, rank = ranked.c[metric], ranked.c[f'{metric}_rank']
+    present = value.isnot(None)
+    columns = [func.max(case((and_(present, rank == max(1, math.ceil(p * count))), value)))
+               for p in PERCENTILES]
+    edges = _bin_edges(low, high)
+    for i in range(HISTOGRAM_BINS):
+        upper = value <= edges[i + 1] if i == HISTOGRAM_BINS - 1 else value < edges[i + 1]
+        columns.append(func.sum(case((and_(present, value >= edges[i], upper), 1), else_=0)))
+    return columns
+
+
+def get_distribution(user_id: int, days: int) -> Dict:
+    """各指标的计数、均值、最值、分位数和直方图
+
+    第一次查询得到计数和最值，第二次查询在一次扫描中得到全部指标的分位数和直方图。
+    """
+
+    def compute():
+        columns = []
+        for metric in METRICS:
+            column = getattr(HealthRecord, metric)
+            columns += [func.count(column), func.avg(column), func.min(column), func.max(column)]
+        row = db.session.execute(select(*columns).where(_window_filter(user_id, days))).one()
+
+        metrics = {}
+        shapes = {}
+        for index, metric in enumerate(METRICS):
+            count, mean, low, high = row[index * 4:index * 4 + 4]
+            metrics[metric] = {'count': count, 'mean': _number(mean), 'min': _number(low), 'max': _number(high)}
+            if count:
+                shapes[metric] = (count, float(low), float(high))
+
+        if shapes:
+            ranked = _ranked_values(user_id, days)
+            columns = []
+            for metric, (count, low, high) in shapes.items():
+                columns += _shape_columns(ranked, metric, count, low, high)
+            row = db.session.execute(select(*columns)).one()
+            offset = 0
+            for metric, (count, low, high) in shapes.items():
+                percentiles = row[offset:offset + len(PERCENTILES)]
+                counts = row[offset + len(PERCENTILES):offset + len(PERCENTILES) + HISTOGRAM_BINS]
+                offset += len(PERCENTILES) + HISTOGRAM_BINS
+                metrics[metric]['percentiles'] = {
+                    f'p{int(p * 100)}': _number(value) for p, value in zip(PERCENTILES, percentiles)
+                }
+                metrics[metric]['histogram'] = {
+                    'edges': [_number(edge) for edge in _bin_edges(low, high)],
+                    'counts': [int(count or 0) for count in counts]
+                }
+        return {'days': days, 'metrics': metrics}
+
+    return _cached('distribution', user_id, days, compute)
@@ -0,0 +1,198 @@
+# 医院HIS系统数据连接器
+import json
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config import Config
+
+# 可重试的HTTP状态码
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 抓取任务：(URL, 查询参数, 页码)；页码为None表示URL已包含分页信息
+FetchTask = Tuple[str, Optional[Dict], Optional[int]]
+
+
+class _Stopped(Exception):
+    """调用方已停止读取，抓取线程放弃剩余数据"""
+
+
+class HospitalConnector:
+    """并发抓取医院HIS接口数据
+
+    - 复用带连接池的requests.Session，所有请求都有超时
+    - 连接失败和429/5xx响应按指数退避自动重试
+    - 支持三种响应格式：
+        JSON数组                                  单页数据
+        {"data": [...], "total_pages": N}         按页码分页，其余页并发抓取
+        {"data": [...], "next": "<url>"}          按链接翻页
+      以及 application/x-ndjson 逐行流式解析
+    - 以DataFrame分块的形式逐步产出结果，同时在途的请求数不超过max_workers，
+      已抓取未读取的分块不超过2 * max_workers个（NDJSON响应边读边产出，不整体读入内存）
+    - 只跟随与接口地址同源（协议、主机、端口相同）的next链接，遇到重复链接或
+      单个接口超过max_pages页时停止翻页
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff_factor: Optional[float] = None,
+                 page_size: Optional[int] = None, chunk_size: Optional[int] = None,
+                 max_pages: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers or Config.HOSPITAL_MAX_WORKERS
+        self.timeout = timeout or Config.HOSPITAL_TIMEOUT
+        self.page_size = page_size or Config.HOSPITAL_PAGE_SIZE
+        self.chunk_size = chunk_size or Config.HOSPITAL_CHUNK_SIZE
+        self.max_pages = max_pages or Config.HOSPITAL_MAX_PAGES
+
+        retry = Retry(
+            total=Config.HOSPITAL_MAX_RETRIES if max_retries is None else max_retries,
+            backoff_factor=Config.HOSPITAL_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, api_url: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        """抓取单个接口的全部分页并合并为一个DataFrame"""
+        return self._concat(self.iter_chunks([(api_url, params or {})]))
+
+    def fetch_many(self, sources: List[Tuple[str, Dict]]) -> pd.DataFrame:
+        """并发抓取多个接口并合并为一个DataFrame"""
+        return self._concat(self.iter_chunks(sources))
+
+    @staticmethod
+    def _concat(chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+        chunks = [chunk for chunk in chunks if not chunk.empty]
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    @staticmethod
+    def _origin(url: str) -> Tuple[str, str]:
+        parts = urlsplit(url)
+        return parts.scheme.lower(), parts.netloc.lower()
+
+    def iter_chunks(self, sources: List[Tuple[str, Dict]]) -> Iterator[pd.DataFrame]:
+        """按抓取顺序逐块产出多个接口（含全部分页）的数据"""
+        # 每个接口的翻页状态：同源限制、已访问的链接、已安排抓取的页数
+        origins = [self._origin(url) for url, _ in sources]
+        visited = [{url} for url, _ in sources]
+        pages = [1] * len(sources)
+        pending = deque((index, (url, dict(params or {}), 1)) for index, (url, params) in enumerate(sources))
+        results = queue.Queue(maxsize=2 * self.max_workers)
+        stop = threading.Event()
+        in_flight = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or in_flight:
+                while pending and in_flight < self.max_workers:
+                    executor.submit(self._run_task, *pending.popleft(), results, stop)
+                    in_flight += 1
+
+                kind, index, value = results.get()
+                if kind == 'chunk':
+                    yield value
+                    continue
+                in_flight -= 1
+                if kind == 'error':
+                    raise value
+                for task in value:
+                    if pages[index] >= self.max_pages:
+                        self.logger.warning(f"{sources[index][0]} 超过最大页数 {self.max_pages}，停止翻页")
+                        break
+                    url, _, page = task
+                    if page is None:
+                        if self._origin(url) != origins[index]:
+                            self.logger.warning(f"忽略指向其他主机的翻页链接: {url}")
+                            continue
+                        if url in visited[index]:
+                            self.logger.warning(f"翻页链接重复，停止翻页: {url}")
+                            continue
+                        visited[index].add(url)
+                    pages[index] += 1
+                    pending.append((index, task))
+        finally:
+            stop.set()
+            # 清空队列，让阻塞在put上的抓取线程退出
+            while in_flight:
+                try:
+                    kind, _, _ = results.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if kind != 'chunk':
+                    in_flight -= 1
+            executor.shutdown(wait=True)
+
+    def _run_task(self, index: int, task: FetchTask, results: queue.Queue, stop: threading.Event):
+        """在抓取线程中执行：数据分块逐个放入队列，最后放入后续任务或异常"""
+        def emit(chunk: pd.DataFrame):
+            while not stop.is_set():
+                try:
+                    results.put(('chunk', index, chunk), timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            raise _Stopped()
+
+        try:
+            results.put(('done', index, self._fetch_page(*task, emit)))
+        except _Stopped:
+            results.put(('done', index, []))
+        except Exception as e:
+            results.put(('error', index, e))
+
+    def _fetch_page(self, url: str, params: Optional[Dict], page: Optional[int],
+                    emit: Callable[[pd.DataFrame], None]) -> List[FetchTask]:
+        """抓取一页，数据分块交给emit，返回后续需要抓取的任务"""
+        query = dict(params or {})
+        if page is not None:
+            query.setdefault('page_size', self.page_size)
+            query['page'] = page
+
+        with self.session.get(url, params=query, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            if 'ndjson' in response.headers.get('Content-Type', ''):
+                for chunk in self._iter_ndjson(response):
+                    emit(chunk)
+                return []
+            body = response.json()
+
+        if isinstance(body, list):
+            emit(pd.DataFrame(body))
+            return []
+
+        emit(pd.DataFrame(body.get('data', body.get('records', []))))
+        if body.get('next'):
+            return [(urljoin(url, body['next']), None, None)]
+        if page == 1 and body.get('total_pages'):
+            return [(url, params, p) for p in range(2, int(body['total_pages']) + 1)]
+        return []
+    def _iter_ndjson(self, response) -> Iterator[pd.DataFrame]:
+        """逐行解析NDJSON响应，每chunk_size行产出一个DataFrame"""
+        rows = []
+        for line in response.iter_lines():
+            if not line:
+                continue
+            rows.append(json.loads(line))
+            if len(rows) >= self.chunk_size:
+                yield pd.DataFrame(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows)
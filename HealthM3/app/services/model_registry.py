@@ -0,0 +1,166 @@
+# 模型注册表
+import joblib
+import os
+import logging
+import tempfile
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.config import Config
+
+LATEST_FILE = 'LATEST'
+LEGACY_VERSION = 'legacy'
+LOAD_ATTEMPTS = 3
+
+
+class ModelRegistry:
+    """版本化的模型仓库
+
+    目录结构:
+        <models_dir>/<name>/<version>.pkl   各版本模型
+        <models_dir>/<name>/LATEST          当前版本号（原子替换）
+        <models_dir>/<name>.pkl             旧版单文件模型，作为兼容回退
+
+    模型用 joblib.load(mmap_mode='r') 加载，同一台机器上的多个worker进程
+    通过页缓存共享模型数组。每次读取时检查LATEST文件，发现新版本即热切换，
+    无需重启。
+    """
+
+    def __init__(self, models_dir: str, keep_versions: int = 5, mmap_mode: Optional[str] = 'r'):
+        self.logger = logging.getLogger(__name__)
+        self.models_dir = models_dir
+        # 当前版本总要保留
+        self.keep_versions = max(keep_versions, 1)
+        self.mmap_mode = mmap_mode
+        self._loaded = {}  # name -> (stamp, version, model)
+        self._lock = Lock()
+        os.makedirs(models_dir, exist_ok=True)
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.models_dir, name)
+
+    def _latest_path(self, name: str) -> str:
+        return os.path.join(self._model_dir(name), LATEST_FILE)
+
+    def _legacy_path(self, name: str) -> str:
+        return os.path.join(self.models_dir, f'{name}.pkl')
+
+    def _stamp(self, path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    @staticmethod
+    def _atomic_write(path: str, write):
+        """先写临时文件再rename，读者只会看到完整的旧文件或新文件"""
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _resolve(self, name: str) -> Tuple[Any, Optional[str], Optional[str]]:
+        """返回(文件状态, 版本号, 模型路径)"""
+        latest_path = self._latest_path(name)
+        stamp = self._stamp(latest_path)
+        if stamp is not None:
+            with open(latest_path) as f:
+                version = f.read().strip()
+            return stamp, version, os.path.join(self._model_dir(name), f'{version}.pkl')
+
+        legacy_path = self._legacy_path(name)
+        stamp = self._stamp(legacy_path)
+        if stamp is not None:
+            return stamp, LEGACY_VERSION, legacy_path
+        return None, None, None
+
+    def get(self, name: str) -> Tuple[Any, Optional[str]]:
+        """获取当前版本的模型，返回(模型, 版本号)；模型不存在时返回(None, None)"""
+        # 读取LATEST之后、加载之前，该版本可能已被其他进程保存新版本时清理，
+        # 此时LATEST已指向更新的版本，重新读取即可
+        for attempt in range(LOAD_ATTEMPTS):
+            try:
+                return self._get(name)
+            except FileNotFoundError:
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+                self.logger.info(f"模型 {name} 的版本已被清理，重新读取当前版本")
+
+    def _get(self, name: str) -> Tuple[Any, Optional[str]]:
+        stamp, version, path = self._resolve(name)
+        if stamp is None:
+            return None, None
+
+        cached = self._loaded.get(name)
+        if cached is not None and cached[0] == stamp:
+            return cached[2], cached[1]
+
+        with self._lock:
+            cached = self._loaded.get(name)
+            if cached is not None and cached[0] == stamp:
+                return cached[2], cached[1]
+            model = joblib.load(path, mmap_mode=self.mmap_mode)
+            self._loaded[name] = (stamp, version, model)
+            self.logger.info(f"加载模型 {name} 版本 {version}")
+            return model, version
+
+    def load_version(self, name: str, version: str) -> Any:
+        """加载指定版本的模型（不影响当前版本），版本不存在或已被清理时返回None"""
+        if version not in self.versions(name):
+            return None
+        try:
+            return joblib.load(os.path.join(self._model_dir(name), f'{version}.pkl'), mmap_mode=self.mmap_mode)
+        except FileNotFoundError:
+            # 列出版本之后被其他进程清理
+            return None
+
+    def save(self, name: str, model: Any, pinned: Iterable[str] = ()) -> str:
+        """保存新版本并原子地切换为当前版本，返回版本号；pinned中的版本清理时保留"""
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        version = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+
+        self._atomic_write(os.path.join(model_dir, f'{version}.pkl'),
+                           lambda f: joblib.dump(model, f))
+        self._atomic_write(self._latest_path(name),
+                           lambda f: f.write(version.encode()))
+        self._prune(name, pinned)
+        return version
+
+    def versions(self, name: str) -> list:
+        """列出已保存的版本号（从旧到新）"""
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(f[:-4] for f in os.listdir(model_dir) if f.endswith('.pkl'))
+
+    def _prune(self, name: str, pinned: Iterable[str] = ()):
+        """只保留最近的若干个版本及pinned中的版本；已映射旧文件的进程不受删除影响"""
+        pinned = set(pinned)
+        for version in self.versions(name)[:-self.keep_versions]:
+            if version in pinned:
+                continue
+            try:
+                os.remove(os.path.join(self._model_dir(name), f'{version}.pkl'))
+            except OSError as e:
+                self.logger.warning(f"删除旧模型版本失败: {str(e)}")
+
+
+_registries: Dict[str, ModelRegistry] = {}
+_registries_lock = Lock()
+
+
+def get_registry(models_dir: str) -> ModelRegistry:
+    """获取某个模型目录对应的进程内共享注册表"""
+    key = os.path.abspath(models_dir)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = ModelRegistry(models_dir, keep_versions=Config.MODEL_KEEP_VERSIONS)
+        return _registries[key]
@@ -0,0 +1,34 @@
+# 多变量异常值检测模型：固定特征，只通过离线命令用全体用户的记录拟合
+import click
+from flask.cli import with_appcontext
+
+from app import db
+from app.config import Config
+from app.models.user import HealthRecord
+
+OUTLIER_MODEL_NAME = 'outlier_forest'
+
+# 模型只使用这些特征；待处理数据缺少其中任一列时改用稳健统计方法
+OUTLIER_MODEL_FEATURES = ('heart_rate', 'systolic_bp', 'diastolic_bp', 'blood_sugar',
+                          'weight', 'sleep_hours', 'mood_score')
+
+
+def load_training_frame(limit: int):
+    """读取最近的limit条健康记录作为训练数据"""
+    import pandas as pd
+
+    columns = [getattr(HealthRecord, feature) for feature in OUTLIER_MODEL_FEATURES]
+    rows = db.session.query(*columns).order_by(HealthRecord.id.desc()).limit(limit).all()
+    return pd.DataFrame(rows, columns=list(OUTLIER_MODEL_FEATURES))
+
+
+@click.command('fit-outlier-model')
+@click.option('--limit', type=int, default=None, help='最多使用的记录条数，默认PREPROCESS_SAMPLE_SIZE')
+@with_appcontext
+def fit_outlier_model_command(limit):
+    """用全体用户最近的健康记录拟合多变量孤立森林并保存为新版本"""
+    from app.services.data_collection import DataCollectionService
+
+    df = load_training_frame(limit or Config.PREPROCESS_SAMPLE_SIZE)
+    version = DataCollectionService().fit_outlier_model(df)
+    click.echo(f"异常值模型已保存，版本 {version}，训练记录 {len(df)} 条")
@@ -0,0 +1,163 @@
+# 全体用户健康建议批处理：离线生成并写入precomputed_recommendations，接口可直接读取
+import json
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, select
+
+from app import db
+from app.config import Config
+from app.models.user import HealthRecord
+from app.models.precomputed_recommendation import PrecomputedRecommendation, record_stamp
+
+# 生成建议需要的记录字段
+FIELDS = ('id', 'user_id', 'heart_rate', 'blood_pressure', 'systolic_bp', 'diastolic_bp',
+          'blood_sugar', 'weight', 'sleep_hours', 'mood_score')
+
+# worker进程内复用的服务实例（建议组合的缓存随之复用）
+_service = None
+
+
+def latest_records_query():
+    """用窗口函数一次取出每个用户最新的一条记录"""
+    rank = func.row_number().over(
+        partition_by=HealthRecord.user_id,
+        order_by=(HealthRecord.recorded_at.desc(), HealthRecord.id.desc())
+    ).label('rank')
+    ranked = select(*[getattr(HealthRecord, field) for field in FIELDS], rank).subquery()
+    return select(*[ranked.c[field] for field in FIELDS]) \
+        .where(ranked.c.rank == 1) \
+        .order_by(ranked.c.user_id)
+
+
+def iter_latest_record_chunks(connection, chunk_size: int) -> Iterator[List[Dict]]:
+    """流式读取查询结果，每次产出chunk_size个用户的最新记录"""
+    result = connection.execution_options(stream_results=True).execute(latest_records_query())
+    while True:
+        rows = result.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield [dict(row._mapping) for row in rows]
+
+
+def _can_write_while_streaming(connection) -> bool:
+    """SQLite只有WAL模式下读游标未关闭时其他连接才能写入"""
+    if connection.dialect.name != 'sqlite':
+        return True
+    return connection.exec_driver_sql('PRAGMA journal_mode').scalar().lower() == 'wal'
+
+
+def recommend_chunk(records: List[Dict]) -> List[Tuple[int, int, str, str]]:
+    """为一批用户的最新记录生成建议，返回(user_id, record_id, 记录内容指纹, JSON)；在worker进程中执行"""
+    global _service
+    if _service is None:
+        from app.services.health_recommendation import HealthRecommendationService
+        _service = HealthRecommendationService()
+
+    results = _service.recommend_batch(records)
+    return [
+        (record['user_id'], record['id'], record_stamp(record), json.dumps(result, ensure_ascii=False))
+        for record, result in zip(records, results)
+    ]
+
+
+def _bounded_map(executor, fn, items: Iterable, max_pending: int) -> Iterator:
+    """按顺序返回结果，最多同时提交max_pending个任务，避免一次读入全部数据"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_results(rows: List[Tuple[int, int, str, str]]):
+    """批量写入一批用户的结果，覆盖旧结果
+
+    读取记录后被修改的用户也照常写入：结果中的指纹与记录的当前内容不一致，
+    PrecomputedRecommendation.get_current不会使用。
+    """
+    if not rows:
+        return
+    table = PrecomputedRecommendation.__table__
+    now = datetime.utcnow()
+    db.session.execute(table.delete().where(table.c.user_id.in_([row[0] for row in rows])))
+    db.session.execute(table.insert(), [
+        {'user_id': user_id, 'record_id': record_id, 'record_stamp': stamp, 'payload': payload, 'computed_at': now}
+        for user_id, record_id, stamp, payload in rows
+    ])
+    db.session.commit()
+
+
+def refresh_recommendations(chunk_size: Optional[int] = None,
+                            workers: Optional[int] = None,
+                            mp_context: Optional[str] = None) -> Dict:
+    """重新生成全部用户的健康建议
+
+    Args:
+        chunk_size: 每批用户数
+        workers: 进程数，1表示在当前进程中执行
+        mp_context: 进程启动方式
+
+    Returns:
+        {'users': 用户数, 'seconds': 耗时, 'users_per_second': 吞吐量}
+    """
+    chunk_size = chunk_size or Config.RECOMMENDATION_BATCH_CHUNK_SIZE
+    workers = workers or Config.RECOMMENDATION_BATCH_WORKERS
+    mp_context = mp_context or Config.RECOMMENDATION_BATCH_MP_CONTEXT
+
+    started = time.perf_counter()
+    users = 0
+    executor = None
+    with db.engine.connect() as connection:
+        chunks = iter_latest_record_chunks(connection, chunk_size)
+        if not _can_write_while_streaming(connection):
+            chunks = list(chunks)
+
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=multiprocessing.get_context(mp_context))
+            results = _bounded_map(executor, recommend_chunk, chunks, workers * 2)
+        else:
+            results = map(recommend_chunk, chunks)
+
+        try:
+            for rows in results:
+                write_results(rows)
+                users += len(rows)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    seconds = time.perf_counter() - started
+    return {
+        'users': users,
+        'seconds': round(seconds, 3),
+        'users_per_second': round(users / seconds, 1) if seconds > 0 else None
+    }
+
+
+@event.listens_for(HealthRecord, 'after_update')
+def _discard_stale(mapper, connection, target):
+    """记录内容被修改后预计算结果已过期，及时删除；读取时还会比较内容指纹，新增或删除记录会改变最新记录ID，无需处理"""
+    table = PrecomputedRecommendation.__table__
+    user_ids = {target.user_id, *db.inspect(target).attrs.user_id.history.deleted}
+    connection.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+
+
+@click.command('refresh-recommendations')
+@click.option('--chunk-size', type=int, default=None, help='每批处理的用户数')
+@click.option('--workers', type=int, default=None, help='并行进程数，1表示不使用进程池')
+@with_appcontext
+def refresh_recommendations_command(chunk_size, workers):
+    """为全部用户重新生成健康建议并写入预计算表"""
+    stats = refresh_recommendations(chunk_size=chunk_size, workers=workers)
+    click.echo(f"已生成 {stats['users']} 个用户的健康建议，耗时 {stats['seconds']} 秒，"
+               f"{stats['users_per_second']} 用户/秒")
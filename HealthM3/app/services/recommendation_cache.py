@@ -0,0 +1,196 @@
+# 健康建议缓存：按(用户, 最新记录ID)缓存分析结果，记录写入后失效
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.config import Config
+from app.services.record_events import on_records_changed
+from app.utils.cache import UserCache
+
+
+class SharedRecommendationStore:
+    """同一台机器上多个worker共享的缓存，存放在本地SQLite文件中
+
+    每个用户只保留最新版本的一条结果；条目数超过上限时按最近访问时间淘汰。
+    generations表记录每个用户的失效代数，写入时在同一条语句中比较。
+    """
+
+    def __init__(self, path: str, maxsize: int = 100000, ttl: int = 300):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS recommendations ('
+                'user_id INTEGER PRIMARY KEY, version TEXT NOT NULL, payload TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_recommendations_accessed_at ON recommendations (accessed_at)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS generations (user_id INTEGER PRIMARY KEY, generation INTEGER NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每个线程、每个进程各自的连接（fork后不能复用父进程的连接）
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, user_id: int, version: str) -> Optional[Dict]:
+        now = time.time()
+        connection = self._connect()
+        row = connection.execute(
+            'SELECT payload FROM recommendations WHERE user_id = ? AND version = ? AND expires_at > ?',
+            (user_id, version, now)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE recommendations SET accessed_at = ? WHERE user_id = ?', (now, user_id))
+        return json.loads(row[0])
+
+    def generation(self, user_id: int) -> int:
+        row = self._connect().execute('SELECT generation FROM generations WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def set(self, user_id: int, version: str, payload: Dict, generation: int):
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            'INSERT OR REPLACE INTO recommendations (user_id, version, payload, expires_at, accessed_at) '
+            'SELECT ?, ?, ?, ?, ? '
+            'WHERE coalesce((SELECT generation FROM generations WHERE user_id = ?), 0) = ?',
+            (user_id, version, json.dumps(payload), now + self.ttl, now, user_id, generation)
+        )
+        # 超出上限时淘汰最久未访问的条目
+        connection.execute(
+            'DELETE FROM recommendations WHERE user_id IN ('
+            'SELECT user_id FROM recommendations ORDER BY accessed_at '
+            'LIMIT max((SELECT count(*) FROM recommendations) - ?, 0))',
+            (self.maxsize,)
+        )
+
+    def invalidate_user(self, user_id: int):
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT INTO generations (user_id, generation) VALUES (?, 1) '
+                'ON CONFLICT (user_id) DO UPDATE SET generation = generation + 1',
+                (user_id,)
+            )
+            connection.execute('DELETE FROM recommendations WHERE user_id = ?', (user_id,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM recommendations')
+
+
+class RecommendationCache:
+    """健康建议缓存，默认为进程内LRU；配置了共享存储路径时改用共享存储，所有worker共用结果
+
+    版本号为用户最新记录的ID：新增或删除最新记录会改变版本号；修改记录内容
+    则由记录变更通知使缓存失效。使用共享存储时不再保留进程内副本，
+    避免其他worker已使缓存失效后仍返回旧结果。
+
+    每次失效都会增加用户的失效代数。调用方在读取记录之前取得代数，写入时代数
+    已变化说明计算期间记录被修改，结果可能基于旧内容，不写入缓存。
+
+    进程内模式下失效通知只在修改记录的worker中生效，其他worker的缓存在修改
+    记录内容后最多RECOMMENDATION_CACHE_TTL秒内仍可能返回旧结果；多worker部署
+    应配置共享存储路径。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 300, store_path: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.store = SharedRecommendationStore(store_path, maxsize, ttl) if store_path else None
+        self.local = UserCache(maxsize=maxsize, ttl=ttl) if self.store is None else None
+        # 进程内失效代数：只记录最近失效的maxsize个用户，其余用户按被淘汰记录中的最大代数计
+        self.maxsize = maxsize
+        self._counter = 0
+        self._floor = 0
+        self._generations = OrderedDict()  # user_id -> 最近一次失效时的代数
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: int) -> Optional[int]:
+        """用户当前的失效代数，在读取记录之前调用并传给set；读取失败时返回None"""
+        if self.store is None:
+            with self._lock:
+                return self._generations.get(user_id, self._floor)
+        try:
+            return self.store.generation(user_id)
+        except sqlite3.Error as e:
+            self.logger.warning(f"读取共享建议缓存失败: {str(e)}")
+            return None
+
+    def get(self, user_id: int, version) -> Optional[Dict]:
+        if self.store is None:
+            return self.local.get((user_id, str(version)))
+        try:
+            return self.store.get(user_id, str(version))
+        except sqlite3.Error as e:
+            self.logger.warning(f"读取共享建议缓存失败: {str(e)}")
+            return None
+
+    def set(self, user_id: int, version, payload: Dict, generation: Optional[int]):
+        """写入结果；generation与当前失效代数不一致时不写入"""
+        if generation is None:
+            return
+        if self.store is None:
+            with self._lock:
+                if self._generations.get(user_id, self._floor) != generation:
+                    return
+                # 每个用户只需保留最新版本
+                self.local.invalidate_user(user_id)
+                self.local.set((user_id, str(version)), payload)
+            return
+        try:
+            self.store.set(user_id, str(version), payload, generation)
+        except sqlite3.Error as e:
+            self.logger.warning(f"写入共享建议缓存失败: {str(e)}")
+
+    def invalidate_user(self, user_id: int):
+        if self.store is None:
+            with self._lock:
+                self._counter += 1
+                self._generations[user_id] = self._counter
+                self._generations.move_to_end(user_id)
+                while len(self._generations) > self.maxsize:
+                    _, evicted = self._generations.popitem(last=False)
+                    self._floor = max(self._floor, evicted)
+                self.local.invalidate_user(user_id)
+            return
+        try:
+            self.store.invalidate_user(user_id)
+        except sqlite3.Error as e:
+            self.logger.warning(f"清除共享建议缓存失败: {str(e)}")
+
+    def clear(self):
+        if self.store is None:
+            self.local.clear()
+        else:
+            self.store.clear()
+
+
+recommendation_cache = RecommendationCache(
+    maxsize=Config.RECOMMENDATION_CACHE_SIZE,
+    ttl=Config.RECOMMENDATION_CACHE_TTL,
+    store_path=Config.RECOMMENDATION_CACHE_PATH or None
+)
+
+
+@on_records_changed
+def _invalidate_user(user_id):
+    recommendation_cache.invalidate_user(user_id)
@@ -0,0 +1,45 @@
+# 健康记录变更通知：事务提交后告诉订阅者哪些用户的记录有变化
+from typing import Callable, Iterable, List
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.models.user import HealthRecord
+
+_listeners: List[Callable[[int], None]] = []
+
+
+def on_records_changed(callback: Callable[[int], None]):
+    """注册回调，参数为记录发生变化的用户ID；可用作装饰器"""
+    _listeners.append(callback)
+    return callback
+
+
+def notify_records_changed(user_ids: Iterable[int]):
+    """Core批量写入不触发ORM事件，提交后需手动调用"""
+    for user_id in set(user_ids):
+        for callback in _listeners:
+            callback(user_id)
+
+
+@event.listens_for(HealthRecord, 'after_insert')
+@event.listens_for(HealthRecord, 'after_update')
+@event.listens_for(HealthRecord, 'after_delete')
+def _mark_user_changed(mapper, connection, target):
+    """记下本次事务修改过记录的用户，提交后再通知，避免并发请求在提交前把旧数据重新写回缓存"""
+    session = object_session(target)
+    if session is not None:
+        users = session.info.setdefault('record_changed_users', set())
+        users.add(target.user_id)
+        # 记录换了用户时，原用户也受影响
+        users.update(inspect(target).attrs.user_id.history.deleted)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_changed_users(session):
+    notify_records_changed(session.info.pop('record_changed_users', ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('record_changed_users', None)
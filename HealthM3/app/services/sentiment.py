@@ -0,0 +1,171 @@
+# 批量情感分析
+import hashlib
+import logging
+import multiprocessing
+import re
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional
+
+from app.config import Config
+
+_warmed_up = False
+_warm_lock = Lock()
+
+
+def warm_up():
+    """加载SnowNLP模型，每个进程只执行一次"""
+    global _warmed_up
+    if _warmed_up:
+        return
+    with _warm_lock:
+        if _warmed_up:
+            return
+        from snownlp import SnowNLP
+        SnowNLP('预热').sentiments
+        _warmed_up = True
+
+
+def normalize_text(text: str) -> str:
+    """归一化文本：全角转半角、去除首尾空白、合并连续空白、英文转小写；只用于计算缓存键"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def text_key(normalized: str) -> str:
+    """归一化文本的哈希，作为缓存键"""
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def score_texts(texts: List[str]) -> List[float]:
+    """计算一批文本的情感分数（可在子进程中执行）"""
+    warm_up()
+    from snownlp import SnowNLP
+    return [float(SnowNLP(text).sentiments) for text in texts]
+
+
+def sentiment_label(score: float) -> str:
+    """根据情感分数判断情感"""
+    if score > 0.6:
+        return "positive"
+    elif score < 0.4:
+        return "negative"
+    return "neutral"
+
+
+class SentimentCache:
+    """情感分数的LRU缓存，键为归一化文本的哈希"""
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            score = self._entries.get(key)
+            if score is not None:
+                self._entries.move_to_end(key)
+            return score
+
+    def set(self, key: str, score: float):
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SentimentAnalyzer:
+    """批量情感分析：输入去重、LRU缓存、未命中的文本较多时分发到进程池"""
+
+    def __init__(self, cache_size: Optional[int] = None, max_workers: Optional[int] = None,
+                 parallel_threshold: Optional[int] = None, mp_context: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.cache = SentimentCache(cache_size or Config.SENTIMENT_CACHE_SIZE)
+        self.max_workers = max_workers or Config.SENTIMENT_MAX_WORKERS
+        self.parallel_threshold = parallel_threshold or Config.SENTIMENT_PARALLEL_THRESHOLD
+        self.mp_context = mp_context or Config.SENTIMENT_MP_CONTEXT
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.mp_context),
+                    initializer=warm_up
+                )
+            return self._executor
+
+    def _score(self, texts: List[str]) -> List[float]:
+        """对未命中缓存的文本打分，数量足够多时并行"""
+        if self.max_workers <= 1 or len(texts) < self.parallel_threshold:
+            return score_texts(texts)
+        chunk_size = -(-len(texts) // (self.max_workers * 4))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        scores = []
+        for chunk_scores in self._get_executor().map(score_texts, chunks):
+            scores.extend(chunk_scores)
+        return scores
+
+    def analyze_batch(self, texts: List[str]) -> List[Dict]:
+        """批量情感分析，结果与输入一一对应
+
+        归一化后相同的文本共用一个分数；打分使用其中第一条的原文，
+        SnowNLP对全角字符和大小写敏感，归一化后的文本只作为缓存键。
+        """
+        keys = []
+        missing = {}  # key -> 原文
+        scores = {}
+        for text in texts:
+            normalized = normalize_text(text) if isinstance(text, str) else ''
+            key = text_key(normalized) if normalized else None
+            keys.append(key)
+            if key is None or key in scores or key in missing:
+                continue
+            score = self.cache.get(key)
+            if score is None:
+                missing[key] = text
+            else:
+                scores[key] = score
+
+        if missing:
+            try:
+                for key, score in zip(missing, self._score(list(missing.values()))):
+                    self.cache.set(key, score)
+                    scores[key] = score
+            except Exception as e:
+                self.logger.error(f"情感分析失败: {str(e)}")
+
+        results = []
+        for key in keys:
+            score = scores.get(key)
+            if score is None:
+                results.append({"sentiment": "unknown", "score": 0.0})
+            else:
+                results.append({"sentiment": sentiment_label(score), "score": score})
+        return results
+
+    def analyze(self, text: str) -> Dict:
+        """单条文本情感分析"""
+        return self.analyze_batch([text])[0]
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+sentiment_analyzer = SentimentAnalyzer()
@@ -0,0 +1,148 @@
+# 分块流式数据预处理
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+ChunkSource = Union[str, Callable[[], Iterable[pd.DataFrame]]]
+
+
+def iter_chunks(source: ChunkSource, chunksize: int = 50000) -> Iterator[pd.DataFrame]:
+    """把数据源展开为DataFrame分块：CSV文件路径按chunksize读取，可调用对象每次返回新的分块迭代器"""
+    if isinstance(source, str):
+        return iter(pd.read_csv(source, chunksize=chunksize))
+    return iter(source())
+
+
+class RowReservoir:
+    """固定容量的行均匀采样（bottom-k随机键），用于估计分位数和MAD
+
+    每行分配一个随机键，始终保留键最小的k行；内存占用与数据总量无关。
+    """
+
+    def __init__(self, size: int, n_columns: int, seed: Optional[int] = 42):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.values = np.empty((0, n_columns))
+
+    def update(self, X: np.ndarray):
+        if len(X) == 0:
+            return
+        keys = np.concatenate([self.keys, self.rng.random(len(X))])
+        values = np.concatenate([self.values, X])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            keys, values = keys[keep], values[keep]
+        self.keys, self.values = keys, values
+
+
+class StreamingPreprocessor:
+    """两遍扫描的流式预处理，结果与DataCollectionService.preprocess_data的robust模式一致（近似）
+
+    第一遍 fit: 逐块累积数值列的均值（StandardScaler.partial_fit）、类别列的频数，
+               并对行做蓄水池采样；结束后由样本估计IQR边界、MAD和标准化参数。
+    第二遍 transform: 逐块填充缺失值、截断/替换异常值并标准化，内存只与分块大小有关。
+    """
+
+    def __init__(self, outlier_method: Optional[str] = 'robust', sample_size: int = 100000,
+                 z_threshold: float = 3.5, seed: Optional[int] = 42):
+        if outlier_method not in (None, 'robust'):
+            raise ValueError(f'流式预处理不支持的异常值检测方式: {outlier_method}')
+        self.outlier_method = outlier_method
+        self.sample_size = sample_size
+        self.z_threshold = z_threshold
+        self.seed = seed
+
+        self.numeric_cols: List[str] = []
+        self.categorical_cols: List[str] = []
+        self.n_rows = 0
+        self.fill_values: Dict = {}
+        self.numeric_fill = np.empty(0)
+        self.scaler = StandardScaler()
+
+    def _numeric(self, chunk: pd.DataFrame) -> np.ndarray:
+        """按第一块确定的数值列取出矩阵，后续分块中的非数值内容视为缺失"""
+        return np.column_stack([
+            pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64)
+            for col in self.numeric_cols
+        ]) if self.numeric_cols else np.empty((len(chunk), 0))
+
+    def fit(self, chunks: Iterable[pd.DataFrame]) -> 'StreamingPreprocessor':
+        """第一遍：收集统计量"""
+        raw_scaler = StandardScaler()
+        category_counts: Dict[str, Counter] = {}
+        reservoir = None
+
+        for chunk in chunks:
+            if reservoir is None:
+                self.numeric_cols = list(chunk.select_dtypes(include=[np.number]).columns)
+                self.categorical_cols = list(chunk.select_dtypes(include=['object']).columns)
+                category_counts = {col: Counter() for col in self.categorical_cols}
+                reservoir = RowReservoir(self.sample_size, len(self.numeric_cols), self.seed)
+            if len(chunk) == 0:
+                continue
+
+            X = self._numeric(chunk)
+            if self.numeric_cols:
+                raw_scaler.partial_fit(X)  # 忽略NaN，得到各列的运行均值
+            reservoir.update(X)
+            for col in self.categorical_cols:
+                category_counts[col].update(chunk[col].dropna().to_numpy())
+            self.n_rows += len(chunk)
+
+        if reservoir is None or self.n_rows == 0:
+            raise ValueError('没有可预处理的数据')
+
+        # 缺失值填充：数值列用均值，类别列用众数
+        means = getattr(raw_scaler, 'mean_', np.zeros(len(self.numeric_cols)))
+        self.numeric_fill = np.asarray(means, dtype=np.float64)
+        self.fill_values = dict(zip(self.numeric_cols, means))
+        for col, counts in category_counts.items():
+            if counts:
+                self.fill_values[col] = counts.most_common(1)[0][0]
+
+        # 由样本估计异常值边界和标准化参数
+        sample = reservoir.values
+        sample = np.where(np.isnan(sample), self.numeric_fill, sample)
+        if self.outlier_method == 'robust' and len(sample):
+            q1, q3 = np.percentile(sample, [25, 75], axis=0)
+            iqr = q3 - q1
+            self.lower_bound, self.upper_bound = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+            clipped = np.clip(sample, self.lower_bound, self.upper_bound)
+            self.median = np.median(clipped, axis=0)
+            self.mad = np.median(np.abs(clipped - self.median), axis=0)
+            self.replacement = clipped.mean(axis=0)
+            sample = self._treat_outliers(sample)
+        if self.numeric_cols:
+            self.scaler.fit(sample)
+        return self
+
+    def _treat_outliers(self, X: np.ndarray) -> np.ndarray:
+        X = np.clip(X, self.lower_bound, self.upper_bound)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(self.mad > 0, 0.6745 * (X - self.median) / self.mad, 0.0)
+        return np.where(np.abs(z) > self.z_threshold, self.replacement, X)
+
+    def transform_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """对单个分块应用第一遍得到的变换"""
+        chunk = chunk.copy()
+        for col in self.categorical_cols:
+            if col in self.fill_values:
+                chunk[col] = chunk[col].fillna(self.fill_values[col])
+        if not self.numeric_cols:
+            return chunk
+
+        X = self._numeric(chunk)
+        X = np.where(np.isnan(X), self.numeric_fill, X)
+        if self.outlier_method == 'robust':
+            X = self._treat_outliers(X)
+        chunk[self.numeric_cols] = self.scaler.transform(X)
+        return chunk
+
+    def transform(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """第二遍：逐块输出预处理结果"""
+        for chunk in chunks:
+            yield self.transform_chunk(chunk)
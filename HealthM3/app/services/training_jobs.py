@@ -0,0 +1,265 @@
+# 后台训练任务调度
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.pool import NullPool
+
+from app import db
+from app.config import Config
+from app.models.training_job import TrainingJob
+
+jobs = TrainingJob.__table__
+
+
+def _fit_model(model_type: str, health_records: List[Dict]):
+    """训练模型，返回(模型, 评估指标)"""
+    from app.services.algorithm_analysis import AlgorithmAnalysisService
+    return AlgorithmAnalysisService().fit_model(model_type, health_records)
+
+
+def _save_model(model_type: str, model) -> str:
+    """保存模型为新版本，返回版本号"""
+    from app.services.algorithm_analysis import AlgorithmAnalysisService
+    return AlgorithmAnalysisService().save_model(model_type, model)
+
+
+def _heartbeat(engine, job_id: str, interval: float, stop: threading.Event):
+    """训练期间定期续租；任务已被取消或判定为中断时立即结束本进程，不再占用CPU"""
+    while not stop.wait(interval):
+        try:
+            with engine.begin() as conn:
+                alive = conn.execute(
+                    jobs.update()
+                    .where(jobs.c.id == job_id, jobs.c.status == TrainingJob.RUNNING)
+                    .values(heartbeat_at=datetime.utcnow())
+                ).rowcount
+        except Exception:
+            # 数据库暂时不可用，下次再试
+            continue
+        if not alive and not stop.is_set():
+            os._exit(0)
+
+
+def _run_training_job(database_url: str, job_id: str, model_type: str, health_records: List[Dict],
+                      heartbeat_interval: float, fit_model: Callable = _fit_model, save_model: Callable = _save_model):
+    """在子进程中执行训练任务，训练结果和最终状态由子进程直接写入数据库"""
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            started = conn.execute(
+                jobs.update()
+                .where(jobs.c.id == job_id, jobs.c.status == TrainingJob.PENDING)
+                .values(status=TrainingJob.RUNNING, started_at=now, heartbeat_at=now)
+            ).rowcount
+        if not started:
+            return
+
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(engine, job_id, heartbeat_interval, stop), daemon=True).start()
+        try:
+            model, metrics = fit_model(model_type, health_records)
+            # 保存前确认任务仍在运行，已取消的任务不产生新的模型版本
+            with engine.connect() as conn:
+                status = conn.execute(select(jobs.c.status).where(jobs.c.id == job_id)).scalar()
+            if status != TrainingJob.RUNNING:
+                return
+            version = save_model(model_type, model)
+            values = {'status': TrainingJob.SUCCEEDED,
+                      'result': json.dumps({'metrics': metrics, 'model_version': version})}
+        except Exception as e:
+            values = {'status': TrainingJob.FAILED, 'error': str(e)}
+        finally:
+            stop.set()
+
+        with engine.begin() as conn:
+            conn.execute(
+                jobs.update()
+                .where(jobs.c.id == job_id, jobs.c.status == TrainingJob.RUNNING)
+                .values(finished_at=datetime.utcnow(), **values)
+            )
+    finally:
+        engine.dispose()
+
+
+class TrainingScheduler:
+    """后台训练任务调度器
+
+    每个任务在单独的子进程中训练，同时运行的任务数不超过max_workers，其余任务在本进程
+    内排队。任务状态持久化在training_jobs表中，任意worker都可以查询和取消：
+
+    - 子进程自己把结果和最终状态写入数据库，不依赖提交任务的worker存活；
+    - 运行中的任务由子进程、排队中的任务由提交任务的进程定期更新heartbeat_at，
+      超过lease秒未更新的任务（worker被回收或崩溃）在查询时被判定为失败；
+    - 取消任务时，本进程中的子进程立即终止，其他worker中的子进程在下一次续租时
+      发现任务已取消并自行退出。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, mp_context: Optional[str] = None,
+                 heartbeat_interval: Optional[float] = None, lease: Optional[float] = None,
+                 fit_model: Callable = _fit_model, save_model: Callable = _save_model):
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers or Config.TRAINING_MAX_WORKERS
+        self.mp_context = mp_context or Config.TRAINING_MP_CONTEXT
+        self.heartbeat_interval = heartbeat_interval or Config.TRAINING_HEARTBEAT_INTERVAL
+        self.lease = timedelta(seconds=lease or Config.TRAINING_JOB_LEASE)
+        # 训练和保存函数随任务传给子进程，必须是模块级函数
+        self.fit_model = fit_model
+        self.save_model = save_model
+        self._queue = deque()  # (job_id, model_type, health_records)
+        self._running = {}  # job_id -> Process
+        self._database_url = None
+        self._engine = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._lock = Lock()
+
+    def submit(self, app, user_id: int, model_type: str, health_records: List[Dict]) -> TrainingJob:
+        """提交训练任务，立即返回任务记录"""
+        job = TrainingJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            model_type=model_type,
+            status=TrainingJob.PENDING,
+            record_count=len(health_records),
+            heartbeat_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        database_url = db.get_engine(app).url.render_as_string(hide_password=False)
+        with self._lock:
+            if database_url != self._database_url:
+                if self._engine is not None:
+                    self._engine.dispose()
+                self._database_url = database_url
+                self._engine = create_engine(database_url, poolclass=NullPool)
+            self._queue.append((job.id, model_type, health_records))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._monitor, name='training-scheduler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """取消未完成的任务，正在本进程中训练的任务立即终止"""
+        cancelled = db.session.execute(
+            jobs.update()
+            .where(jobs.c.id == job_id)
+            .where(jobs.c.status.in_([TrainingJob.PENDING, TrainingJob.RUNNING]))
+            .values(status=TrainingJob.CANCELLED, finished_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+
+        with self._lock:
+            self._queue = deque(item for item in self._queue if item[0] != job_id)
+            process = self._running.get(job_id)
+        if process is not None:
+            process.terminate()
+            self._wakeup.set()
+        return bool(cancelled)
+
+    def reap_if_stale(self, job: TrainingJob) -> TrainingJob:
+        """任务的租约已过期（执行任务的进程已退出）时把任务标记为失败"""
+        if job.finished:
+            return job
+        deadline = datetime.utcnow() - self.lease
+        if (job.heartbeat_at or job.created_at) >= deadline:
+            return job
+        reaped = db.session.execute(
+            jobs.update()
+            .where(jobs.c.id == job.id)
+            .where(jobs.c.status.in_([TrainingJob.PENDING, TrainingJob.RUNNING]))
+            .where(func.coalesce(jobs.c.heartbeat_at, jobs.c.created_at) < deadline)
+            .values(status=TrainingJob.FAILED, error='训练进程已退出，任务中断', finished_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if reaped:
+            self.logger.warning(f"训练任务 {job.id} 租约过期，已标记为失败")
+        db.session.refresh(job)
+        return job
+
+    def _mark_failed(self, job_ids: List[str], error: str):
+        with self._engine.begin() as conn:
+            conn.execute(
+                jobs.update()
+                .where(jobs.c.id.in_(job_ids))
+                .where(jobs.c.status.in_([TrainingJob.PENDING, TrainingJob.RUNNING]))
+                .values(status=TrainingJob.FAILED, error=error, finished_at=datetime.utcnow())
+            )
+
+    def _monitor(self):
+        """调度线程：回收结束的子进程、启动排队的任务、为排队中的任务续租"""
+        context = multiprocessing.get_context(self.mp_context)
+        last_heartbeat = time.monotonic()
+        while True:
+            self._wakeup.wait(min(self.heartbeat_interval, 1.0))
+            self._wakeup.clear()
+
+            crashed = []
+            with self._lock:
+                for job_id, process in list(self._running.items()):
+                    if process.exitcode is not None:
+                        process.join()
+                        del self._running[job_id]
+                        if process.exitcode != 0:
+                            crashed.append((job_id, process.exitcode))
+                while self._queue and len(self._running) < self.max_workers:
+                    job_id, model_type, health_records = self._queue.popleft()
+                    process = context.Process(
+                        target=_run_training_job,
+                        args=(self._database_url, job_id, model_type, health_records, self.heartbeat_interval,
+                              self.fit_model, self.save_model),
+                        daemon=True
+                    )
+                    process.start()
+                    self._running[job_id] = process
+                queued = [item[0] for item in self._queue]
+                if not queued and not self._running:
+                    self._thread = None
+                    idle = True
+                else:
+                    idle = False
+
+            try:
+                # 被取消终止的任务状态已是CANCELLED，不受影响
+                for job_id, exitcode in crashed:
+                    self._mark_failed([job_id], f'训练进程异常退出（退出码 {exitcode}）')
+                if queued and time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                    with self._engine.begin() as conn:
+                        conn.execute(
+                            jobs.update()
+                            .where(jobs.c.id.in_(queued), jobs.c.status == TrainingJob.PENDING)
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                    last_heartbeat = time.monotonic()
+            except Exception as e:
+                self.logger.error(f"更新训练任务状态失败: {str(e)}")
+            if idle:
+                return
+
+    def shutdown(self, wait: bool = True):
+        """终止本进程中的训练任务，排队和运行中的任务标记为失败"""
+        with self._lock:
+            job_ids = [item[0] for item in self._queue] + list(self._running)
+            processes = list(self._running.values())
+            self._queue.clear()
+        for process in processes:
+            process.terminate()
+            if wait:
+                process.join()
+        if job_ids and self._engine is not None:
+            self._mark_failed(job_ids, '服务进程退出，任务中断')
+
+
+training_scheduler = TrainingScheduler()
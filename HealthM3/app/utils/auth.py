@@ -1,25 +1,95 @@
+import time
 from functools import wraps
-from flask import jsonify, request
+from collections import namedtuple
+from flask import jsonify, request, current_app
+from sqlalchemy import event
 import jwt
 from app.config import Config
+from app.models.user import User
+from app.utils.cache import UserCache
+
+# 已验证令牌对应的用户身份（不持有ORM对象，可跨请求缓存）
+CurrentUser = namedtuple('CurrentUser', ['id', 'username', 'email'])
+
+# 只读请求可以使用缓存的用户身份
+SAFE_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# 已验证的令牌 -> 用户ID，键为(token,)，条目在令牌过期时（最长TOKEN_CACHE_TTL秒）失效，
+# 命中时省去JWT解码和签名校验
+token_cache = UserCache(maxsize=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL)
+
+# 按用户ID缓存身份，键为(user_id,)，省去每次请求查询用户表
+#
+# 缓存只在本进程内有效：用户被删除后，其他worker中的缓存条目最多在TOKEN_CACHE_TTL秒
+# 内仍然有效，通过query.delete()等批量方式删除时本进程也不会收到通知。这段时间内
+# 已删除用户的令牌只能用于只读请求，写请求总是重新确认用户存在。
+identity_cache = UserCache(maxsize=Config.TOKEN_CACHE_SIZE, ttl=Config.TOKEN_CACHE_TTL)
+
+
+@event.listens_for(User, 'after_delete')
+def _evict_deleted_user(mapper, connection, target):
+    """用户被删除后立即使本进程缓存的身份失效"""
+    identity_cache.invalidate_user(target.id)
+
+
+def _decode_token(token):
+    """校验令牌签名和有效期，返回用户ID；已验证过且未过期的令牌直接取缓存"""
+    user_id = token_cache.get((token,))
+    if user_id is not None:
+        return user_id
+    secret = current_app.config.get('JWT_SECRET_KEY', Config.JWT_SECRET_KEY)
+    data = jwt.decode(token, secret, algorithms=["HS256"])
+    user_id = data['user_id']
+    ttl = None
+    if 'exp' in data:
+        ttl = data['exp'] - time.time()
+        if ttl <= 0:
+            return None
+    token_cache.set((token,), user_id, ttl)
+    return user_id
+
+
+def _verify_token(token):
+    """校验令牌并返回用户身份，失败时返回None"""
+    user_id = _decode_token(token)
+    if user_id is None:
+        return None
+    key = (user_id,)
+    if request.method in SAFE_METHODS:
+        identity = identity_cache.get(key)
+        if identity is not None:
+            return identity
+
+    user = User.query.get(user_id)
+    if user is None:
+        identity_cache.invalidate_user(user_id)
+        return None
+
+    identity = CurrentUser(user.id, user.username, user.email)
+    identity_cache.set(key, identity)
+    return identity
+
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
-        
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-            
+
+        auth_header = request.headers.get('Authorization', '')
+        parts = auth_header.split(" ")
+        if len(parts) == 2:
+            token = parts[1]
+
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
-            
+
         try:
-            data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
-            current_user = data['user_id']
-        except:
+            current_user = _verify_token(token)
+        except Exception:
+            current_user = None
+        if current_user is None:
             return jsonify({'message': 'Token is invalid!'}), 401
-            
+
         return f(current_user, *args, **kwargs)
-        
-    return decorated 
\ No newline at end of file
+
+    return decorated
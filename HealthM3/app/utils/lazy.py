@@ -0,0 +1,56 @@
+# 延迟构造的服务
+import importlib
+import logging
+from threading import Lock
+from typing import List
+
+_services: List['LazyService'] = []
+
+
+class LazyService:
+    """服务代理：首次访问属性时才导入服务模块并实例化
+
+    蓝图模块在导入时只创建代理，pandas、scikit-learn等重量级依赖和磁盘上的模型
+    推迟到第一次请求（或prewarm）时加载，worker启动不再为此付出代价。
+    """
+
+    def __init__(self, target: str, *args, **kwargs):
+        self._target = target  # 'package.module:ClassName'
+        self._args = args
+        self._kwargs = kwargs
+        self._instance = None
+        self._lock = Lock()
+        _services.append(self)
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def _get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    module_name, class_name = self._target.split(':')
+                    cls = getattr(importlib.import_module(module_name), class_name)
+                    self._instance = cls(*self._args, **self._kwargs)
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'pending'
+        return f'<LazyService {self._target} ({state})>'
+
+
+def prewarm_services():
+    """实例化全部已声明的服务，并调用它们的warm_up方法加载模型等资源"""
+    logger = logging.getLogger(__name__)
+    for service in list(_services):
+        try:
+            instance = service._get()
+            warm_up = getattr(instance, 'warm_up', None)
+            if callable(warm_up):
+                warm_up()
+        except Exception as e:
+            logger.error(f"预热服务 {service._target} 失败: {str(e)}")
@@ -0,0 +1,130 @@
+# 健康记录 (user_id, recorded_at) 复合索引基准测试
+#
+# 用法: python benchmarks/bench_health_record_index.py --users 1000 --records-per-user 200
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User, HealthRecord
+
+INDEX_NAME = 'ix_health_records_user_id_recorded_at'
+
+
+def populate(n_users, records_per_user, batch_size=50000):
+    """批量写入测试数据"""
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'bench_{i}', 'email': f'bench_{i}@example.com'} for i in range(n_users)
+    ])
+    user_ids = [row[0] for row in db.session.execute(db.select(User.id))]
+
+    start = datetime(2020, 1, 1)
+    rows = []
+    # 按时间交错写入，模拟多个用户同时上传的真实表
+    for day in range(records_per_user):
+        recorded_at = start + timedelta(hours=12 * day)
+        for user_id in user_ids:
+            rows.append({
+                'user_id': user_id,
+                'heart_rate': random.randint(55, 110),
+                'blood_pressure': f'{random.randint(90, 150)}/{random.randint(60, 95)}',
+                'blood_sugar': random.uniform(3.5, 7.5),
+                'weight': random.uniform(45, 90),
+                'sleep_hours': random.uniform(5, 10),
+                'mood_score': random.randint(1, 10),
+                'recorded_at': recorded_at
+            })
+            if len(rows) >= batch_size:
+                db.session.execute(HealthRecord.__table__.insert(), rows)
+                rows = []
+    if rows:
+        db.session.execute(HealthRecord.__table__.insert(), rows)
+    db.session.commit()
+    return user_ids, start
+
+
+def measure(fn, repeat):
+    """返回 (平均毫秒, p95毫秒)"""
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return float(np.mean(timings)), float(np.percentile(timings, 95))
+
+
+def run_queries(user_ids, start, records_per_user, repeat):
+    """分别测量最新记录查询和30天范围读取的延迟"""
+    span_hours = 12 * records_per_user
+
+    def latest():
+        HealthRecord.latest_for_user(random.choice(user_ids))
+
+    def range_read():
+        begin = start + timedelta(hours=random.randint(0, max(span_hours - 720, 0)))
+        HealthRecord.query_for_user(random.choice(user_ids), begin, begin + timedelta(days=30)).all()
+
+    return {
+        '最新记录': measure(latest, repeat),
+        '30天范围读取': measure(range_read, repeat)
+    }
+
+
+def explain(user_id):
+    """最新记录查询的执行计划"""
+    plan = db.session.execute(db.text(
+        'EXPLAIN QUERY PLAN SELECT * FROM health_records WHERE user_id = :uid '
+        'ORDER BY recorded_at DESC, id DESC LIMIT 1'
+    ), {'uid': user_id}).fetchall()
+    return '; '.join(str(row[-1]) for row in plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='健康记录复合索引基准测试')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--records-per-user', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(42)
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'bench.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False
+    })
+
+    with app.app_context():
+        total = args.users * args.records_per_user
+        print(f"正在写入 {args.users} 个用户、共 {total} 条健康记录...")
+        t0 = time.perf_counter()
+        user_ids, start = populate(args.users, args.records_per_user)
+        print(f"写入完成，用时 {time.perf_counter() - t0:.1f}s")
+
+        db.session.execute(db.text(f'DROP INDEX IF EXISTS {INDEX_NAME}'))
+        db.session.execute(db.text('ANALYZE'))
+        print(f"\n[无索引] 查询计划: {explain(user_ids[0])}")
+        before = run_queries(user_ids, start, args.records_per_user, args.repeat)
+
+        db.session.execute(db.text(
+            f'CREATE INDEX {INDEX_NAME} ON health_records (user_id, recorded_at)'
+        ))
+        db.session.execute(db.text('ANALYZE'))
+        print(f"[有索引] 查询计划: {explain(user_ids[0])}")
+        after = run_queries(user_ids, start, args.records_per_user, args.repeat)
+
+    print(f"\n{'查询':<12}{'无索引 avg/p95 (ms)':>24}{'有索引 avg/p95 (ms)':>24}{'加速比':>10}")
+    for name in before:
+        (b_avg, b_p95), (a_avg, a_p95) = before[name], after[name]
+        print(f"{name:<12}{b_avg:>14.3f} / {b_p95:<8.3f}{a_avg:>14.3f} / {a_p95:<8.3f}{b_avg / a_avg:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# 训练后端与并行度基准测试
+#
+# 用法: python benchmarks/bench_training_backends.py --sizes 10000,100000,1000000
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.algorithm_analysis import AlgorithmAnalysisService
+
+
+def synthetic_records(n, seed=42):
+    """生成n条合成健康记录"""
+    rng = np.random.default_rng(seed)
+    systolic = rng.integers(85, 160, n)
+    diastolic = rng.integers(55, 100, n)
+    return pd.DataFrame({
+        'heart_rate': rng.integers(50, 115, n),
+        'blood_pressure': pd.Series(systolic).astype(str) + '/' + pd.Series(diastolic).astype(str),
+        'blood_sugar': rng.uniform(3.5, 7.5, n).round(2),
+        'weight': rng.uniform(45, 95, n).round(1),
+        'sleep_hours': rng.uniform(4, 10, n).round(1),
+        'mood_score': rng.integers(1, 11, n)
+    })
+
+
+def run(model_type, records, **kwargs):
+    """返回(训练秒数, 评估指标)"""
+    service = AlgorithmAnalysisService(**kwargs)
+    t0 = time.perf_counter()
+    _, metrics = service.fit_model(model_type, records)
+    return time.perf_counter() - t0, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description='训练后端与并行度基准测试')
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--max-gb-size', type=int, default=100000,
+                        help='GradientBoostingClassifier只在不超过该规模时运行（串行实现很慢）')
+    args = parser.parse_args()
+
+    configs = [
+        ('糖尿病 GradientBoosting', 'diabetes', {'diabetes_backend': 'gradient_boosting'}),
+        ('糖尿病 HistGradientBoosting', 'diabetes', {'diabetes_backend': 'hist_gradient_boosting'}),
+        ('高血压 RandomForest n_jobs=1', 'hypertension', {'n_jobs': 1}),
+        ('高血压 RandomForest n_jobs=-1', 'hypertension', {'n_jobs': -1})
+    ]
+
+    print(f"CPU核数: {os.cpu_count()}")
+    print(f"{'规模':>9}  {'配置':<32}{'训练(s)':>10}{'accuracy':>10}{'f1':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        records = synthetic_records(size)
+        for name, model_type, kwargs in configs:
+            if kwargs.get('diabetes_backend') == 'gradient_boosting' and size > args.max_gb_size:
+                print(f"{size:>9}  {name:<32}{'跳过':>10}")
+                continue
+            seconds, metrics = run(model_type, records, **kwargs)
+            print(f"{size:>9}  {name:<32}{seconds:>10.2f}{metrics['accuracy']:>10.4f}{metrics['f1']:>8.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+# gunicorn配置
+#
+# 用法: gunicorn -c gunicorn.conf.py run:app
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+
+def post_worker_init(worker):
+    """worker加载应用后预热服务，避免首个请求承担模型和依赖的加载开销"""
+    from app.config import Config
+    if Config.PREWARM_SERVICES:
+        from app import prewarm
+        prewarm()
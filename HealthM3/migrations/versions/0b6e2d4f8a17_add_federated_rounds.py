@@ -0,0 +1,52 @@
+"""add federated_rounds and federated_round_updates tables
+
+Revision ID: 0b6e2d4f8a17
+Revises: f3b7d91a0c24
+Create Date: 2026-10-18 17:12:40.318265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e2d4f8a17'
+down_revision = 'f3b7d91a0c24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('federated_rounds',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('client_count', sa.Integer(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('coef_shape', sa.String(length=32), nullable=False),
+    sa.Column('coef_sum', sa.LargeBinary(), nullable=False),
+    sa.Column('intercept_sum', sa.LargeBinary(), nullable=False),
+    sa.Column('scaler_mean', sa.LargeBinary(), nullable=False),
+    sa.Column('scaler_m2', sa.LargeBinary(), nullable=False),
+    sa.Column('model_version', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('deadline', sa.DateTime(), nullable=False),
+    sa.Column('committed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_federated_rounds_status'), 'federated_rounds', ['status'], unique=False)
+    op.create_table('federated_round_updates',
+    sa.Column('round_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['round_id'], ['federated_rounds.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('round_id', 'user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('federated_round_updates')
+    op.drop_index(op.f('ix_federated_rounds_status'), table_name='federated_rounds')
+    op.drop_table('federated_rounds')
@@ -0,0 +1,28 @@
+"""add precomputed_recommendations.record_stamp
+
+Revision ID: 2a7d5c9e4f13
+Revises: 9d3f6b2e1c47
+Create Date: 2026-10-18 19:48:05.160392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7d5c9e4f13'
+down_revision = '9d3f6b2e1c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有结果没有内容指纹，无法判断是否过期，清空后由下一次批处理重新生成
+    op.execute('DELETE FROM precomputed_recommendations')
+    with op.batch_alter_table('precomputed_recommendations') as batch_op:
+        batch_op.add_column(sa.Column('record_stamp', sa.String(length=40), nullable=False, server_default=''))
+
+
+def downgrade():
+    with op.batch_alter_table('precomputed_recommendations') as batch_op:
+        batch_op.drop_column('record_stamp')
@@ -0,0 +1,26 @@
+"""add training_jobs.heartbeat_at
+
+Revision ID: 5c8d1e7a9b34
+Revises: 0b6e2d4f8a17
+Create Date: 2026-10-18 18:05:12.604733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8d1e7a9b34'
+down_revision = '0b6e2d4f8a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('training_jobs') as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('training_jobs') as batch_op:
+        batch_op.drop_column('heartbeat_at')
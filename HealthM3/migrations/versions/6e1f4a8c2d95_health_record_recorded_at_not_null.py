@@ -0,0 +1,32 @@
+"""make health_records.recorded_at NOT NULL
+
+Revision ID: 6e1f4a8c2d95
+Revises: 2a7d5c9e4f13
+Create Date: 2026-10-18 21:12:37.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1f4a8c2d95'
+down_revision = '2a7d5c9e4f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 统计量未计入没有时间的记录，补齐时间后删除这些用户的统计量，读取时重建
+    op.execute(
+        'DELETE FROM health_aggregates WHERE user_id IN '
+        '(SELECT user_id FROM health_records WHERE recorded_at IS NULL)'
+    )
+    op.execute('UPDATE health_records SET recorded_at = CURRENT_TIMESTAMP WHERE recorded_at IS NULL')
+    with op.batch_alter_table('health_records') as batch_op:
+        batch_op.alter_column('recorded_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('health_records') as batch_op:
+        batch_op.alter_column('recorded_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,37 @@
+"""health_aggregates: double precision sums centred on origin_x
+
+Revision ID: 9d3f6b2e1c47
+Revises: 5c8d1e7a9b34
+Create Date: 2026-10-18 19:20:37.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6b2e1c47'
+down_revision = '5c8d1e7a9b34'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ('sum_x', 'sum_xx', 'sum_y', 'sum_yy', 'sum_xy', 'min_x', 'max_x')
+
+
+def upgrade():
+    # 已有的累计和以2000年为原点且可能已损失精度，清空后在首次读取时按新原点重建
+    op.execute('DELETE FROM health_aggregates')
+    with op.batch_alter_table('health_aggregates') as batch_op:
+        batch_op.add_column(sa.Column('origin_x', sa.Float(precision=53), nullable=False, server_default='0'))
+        for name in COLUMNS:
+            batch_op.alter_column(name, existing_type=sa.Float(), type_=sa.Float(precision=53),
+                                  existing_nullable=name in ('min_x', 'max_x'))
+
+
+def downgrade():
+    op.execute('DELETE FROM health_aggregates')
+    with op.batch_alter_table('health_aggregates') as batch_op:
+        for name in COLUMNS:
+            batch_op.alter_column(name, existing_type=sa.Float(precision=53), type_=sa.Float(),
+                                  existing_nullable=name in ('min_x', 'max_x'))
+        batch_op.drop_column('origin_x')
@@ -0,0 +1,24 @@
+"""add (user_id, recorded_at) index on health_records
+
+Revision ID: a7c4e2b91f05
+Revises: 3f2a1c9d8e71
+Create Date: 2026-10-18 10:31:02.640517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e2b91f05'
+down_revision = '3f2a1c9d8e71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_health_records_user_id_recorded_at', 'health_records', ['user_id', 'recorded_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_health_records_user_id_recorded_at', table_name='health_records')
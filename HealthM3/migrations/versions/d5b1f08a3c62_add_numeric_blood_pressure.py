@@ -0,0 +1,74 @@
+"""add numeric systolic/diastolic blood pressure columns
+
+Revision ID: d5b1f08a3c62
+Revises: c19e7d3a5b28
+Create Date: 2026-10-18 14:05:12.418903
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b1f08a3c62'
+down_revision = 'c19e7d3a5b28'
+branch_labels = None
+depends_on = None
+
+BLOOD_PRESSURE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*$')
+BATCH_SIZE = 5000
+
+health_records = sa.table(
+    'health_records',
+    sa.column('id', sa.Integer),
+    sa.column('blood_pressure', sa.String),
+    sa.column('systolic_bp', sa.Integer),
+    sa.column('diastolic_bp', sa.Integer),
+)
+
+
+def _split(value):
+    match = BLOOD_PRESSURE_PATTERN.match(value) if isinstance(value, str) else None
+    if not match:
+        return None, None
+    return int(round(float(match.group(1)))), int(round(float(match.group(2))))
+
+
+def upgrade():
+    op.add_column('health_records', sa.Column('systolic_bp', sa.Integer(), nullable=True))
+    op.add_column('health_records', sa.Column('diastolic_bp', sa.Integer(), nullable=True))
+
+    # 按主键分批回填，内存占用与表大小无关
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(health_records.c.id, health_records.c.blood_pressure)
+            .where(health_records.c.id > last_id)
+            .where(health_records.c.blood_pressure.isnot(None))
+            .order_by(health_records.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for record_id, blood_pressure in rows:
+            systolic, diastolic = _split(blood_pressure)
+            if systolic is not None:
+                updates.append({'record_id': record_id, 'systolic': systolic, 'diastolic': diastolic})
+        if updates:
+            bind.execute(
+                health_records.update()
+                .where(health_records.c.id == sa.bindparam('record_id'))
+                .values(systolic_bp=sa.bindparam('systolic'), diastolic_bp=sa.bindparam('diastolic')),
+                updates
+            )
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('health_records') as batch_op:
+        batch_op.drop_column('diastolic_bp')
+        batch_op.drop_column('systolic_bp')
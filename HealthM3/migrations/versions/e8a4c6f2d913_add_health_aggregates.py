@@ -0,0 +1,38 @@
+"""add health_aggregates table
+
+Revision ID: e8a4c6f2d913
+Revises: d5b1f08a3c62
+Create Date: 2026-10-18 15:12:43.771025
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4c6f2d913'
+down_revision = 'd5b1f08a3c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 不在迁移中回填：首次读取某个用户的统计量时按需从健康记录重建
+    op.create_table('health_aggregates',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=32), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('sum_x', sa.Float(), nullable=False),
+    sa.Column('sum_xx', sa.Float(), nullable=False),
+    sa.Column('sum_y', sa.Float(), nullable=False),
+    sa.Column('sum_yy', sa.Float(), nullable=False),
+    sa.Column('sum_xy', sa.Float(), nullable=False),
+    sa.Column('min_x', sa.Float(), nullable=True),
+    sa.Column('max_x', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'metric')
+    )
+
+
+def downgrade():
+    op.drop_table('health_aggregates')
@@ -0,0 +1,31 @@
+"""add precomputed_recommendations table
+
+Revision ID: f3b7d91a0c24
+Revises: e8a4c6f2d913
+Create Date: 2026-10-18 16:03:27.154810
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d91a0c24'
+down_revision = 'e8a4c6f2d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('precomputed_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('precomputed_recommendations')
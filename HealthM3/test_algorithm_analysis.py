@@ -44,6 +44,35 @@ def test_algorithm_analysis():
         risk_response = requests.post(risk_url, headers=headers, json=risk_data)
         print(f"疾病风险预测响应: {risk_response.text}")
         
+        # 测试批量疾病风险预测
+        print("\n测试批量疾病风险预测...")
+        batch_url = 'http://localhost:5000/api/algorithm/predict/risk/batch'
+        batch_data = {
+            'health_records': [
+                {
+                    'heart_rate': 75,
+                    'blood_pressure': '120/80',
+                    'blood_sugar': 5.5,
+                    'weight': 65,
+                    'sleep_hours': 7,
+                    'mood_score': 8
+                },
+                {
+                    'heart_rate': 105,
+                    'blood_pressure': '150/95',
+                    'blood_sugar': 7.2,
+                    'weight': 85,
+                    'sleep_hours': 5,
+                    'mood_score': 4
+                }
+            ]
+        }
+        batch_response = requests.post(batch_url, headers=headers, json=batch_data, stream=True)
+        print(f"批量预测响应状态码: {batch_response.status_code}")
+        for line in batch_response.iter_lines():
+            if line:
+                print(f"批量预测结果: {json.loads(line)}")
+        
         # 测试健康状态评估
         print("\n测试健康状态评估...")
         health_url = 'http://localhost:5000/api/algorithm/assess/health'
@@ -0,0 +1,96 @@
+# 测试联邦学习模型更新的二进制编码（无需启动应用）
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.federated_codec import encode_update, decode_update, read_header, flatten
+from app.services.model_registry import ModelRegistry
+
+
+def make_params(rng, rows=1, cols=7, n_samples=120):
+    return {
+        'model_weights': rng.normal(size=(rows, cols)),
+        'intercept': rng.normal(size=rows),
+        'scaler_mean': rng.normal(loc=80, scale=20, size=cols),
+        'scaler_var': rng.uniform(1, 50, size=cols),
+        'n_samples': n_samples
+    }
+
+
+def test_federated_codec():
+    rng = np.random.default_rng(0)
+    params = make_params(rng)
+    values = flatten(params)
+
+    # 1. float32：与原值相差不超过float32精度，数组直接引用数据不复制
+    data = encode_update(params)
+    decoded = decode_update(data)
+    assert decoded['n_samples'] == 120 and decoded['base_version'] is None
+    assert decoded['model_weights'].shape == (1, 7)
+    assert np.allclose(flatten(decoded), values, rtol=1e-6, atol=0)
+    assert not decoded['scaler_mean'].flags.writeable
+    # 头部18字节填充到4字节对齐
+    assert len(data) == 20 + values.size * 4
+
+    # 2. float16：体积减半，相对误差在float16精度内
+    half = encode_update(params, dtype='float16')
+    assert len(half) < len(data) * 0.6
+    assert np.allclose(flatten(decode_update(half)), values, rtol=1e-3, atol=0)
+
+    # 3. 差分编码：在基准上加回差值，结果与原值一致
+    base = dict(make_params(rng), model_version='20260101000000000000')
+    delta = encode_update(params, dtype='float16', base=base)
+    header = read_header(delta)
+    assert header['delta'] and not header['sparse'] and header['base_version'] == base['model_version']
+    decoded = decode_update(delta, base)
+    assert np.allclose(flatten(decoded), values, rtol=0, atol=1e-2 * np.abs(values - flatten(base)).max())
+    try:
+        decode_update(delta)
+        assert False, '差分编码缺少基准模型时应当报错'
+    except ValueError:
+        pass
+
+    # 4. top-k：只传输绝对值最大的k个差值，其余参数与基准相同
+    near = {key: np.array(value, dtype=np.float64) for key, value in base.items() if key != 'model_version'}
+    near['model_weights'] = near['model_weights'] + np.eye(1, 7, 3) * 0.5
+    near['scaler_mean'] = near['scaler_mean'] + np.eye(1, 7, 5).ravel() * 2.0
+    near['n_samples'] = 30
+    sparse = encode_update(near, base=base, top_k=2)
+    assert read_header(sparse)['sparse']
+    decoded = decode_update(sparse, base)
+    changed = np.flatnonzero(flatten(decoded) != flatten(base))
+    assert len(changed) == 2
+    assert np.allclose(flatten(decoded), flatten(near), rtol=1e-6, atol=0)
+    assert len(sparse) < len(encode_update(near, base=base))
+
+    # 5. 损坏或不匹配的数据
+    for bad, message in ((b'XXXX' + data[4:], '魔数错误'), (data[:-4], '数据截断'), (data[:10], '头部不完整')):
+        try:
+            decode_update(bad)
+            assert False, message
+        except ValueError:
+            pass
+    other = dict(make_params(rng, cols=5), model_version=base['model_version'])
+    try:
+        decode_update(delta, other)
+        assert False, '基准模型维度不一致时应当报错'
+    except ValueError:
+        pass
+
+    # 6. 清理旧版本时保留被钉住的基准版本
+    registry = ModelRegistry(tempfile.mkdtemp(), keep_versions=1)
+    first = registry.save('federated', {'version': 1})
+    second = registry.save('federated', {'version': 2}, pinned=[first])
+    assert registry.versions('federated') == [first, second]
+    assert registry.load_version('federated', first) == {'version': 1}
+    third = registry.save('federated', {'version': 3}, pinned=[second])
+    assert registry.versions('federated') == [second, third]
+    print("联邦学习更新编码测试通过")
+
+
+if __name__ == '__main__':
+    test_federated_codec()
@@ -0,0 +1,67 @@
+# 测试联邦学习聚合轮次的加权合并（无需启动应用）
+import os
+import sys
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+from app.services.federated_rounds import parse_update, merge, finalize
+
+
+def make_update(X, coef, intercept, n_samples=None):
+    scaler = StandardScaler().fit(X)
+    return parse_update({
+        'model_weights': [coef.tolist()],
+        'intercept': [intercept],
+        'scaler_mean': scaler.mean_.tolist(),
+        'scaler_scale': scaler.scale_.tolist(),
+        'scaler_var': scaler.var_.tolist(),
+        'n_samples': len(X) if n_samples is None else n_samples
+    })
+
+
+def test_federated_rounds():
+    rng = np.random.default_rng(0)
+    parts = [rng.normal(loc=i, scale=i + 1, size=(int(rng.integers(5, 300)), 7)) for i in range(6)]
+    coefs = [rng.normal(size=7) for _ in parts]
+    intercepts = [float(rng.normal()) for _ in parts]
+
+    state = None
+    for X, coef, intercept in zip(parts, coefs, intercepts):
+        state = merge(state, make_update(X, coef, intercept))
+    coef, intercept, mean, scale = finalize(state)
+
+    # 1. 标准化器合并结果与在全部数据上拟合的结果一致
+    pooled = StandardScaler().fit(np.vstack(parts))
+    assert state['n'] == sum(len(X) for X in parts)
+    assert np.allclose(mean, pooled.mean_, rtol=0, atol=1e-12)
+    assert np.allclose(scale, pooled.scale_, rtol=0, atol=1e-12)
+
+    # 2. 系数和截距按样本数加权平均
+    weights = np.array([len(X) for X in parts], dtype=float)
+    assert np.allclose(coef[0], weights @ np.vstack(coefs) / weights.sum())
+    assert np.isclose(intercept[0], weights @ np.array(intercepts) / weights.sum())
+
+    # 3. 方差为0的特征与StandardScaler一致，不缩放
+    constant = np.ones((10, 7))
+    _, _, _, scale = finalize(merge(None, make_update(constant, coefs[0], 0.0)))
+    assert (scale == 1.0).all()
+
+    # 4. 上报的样本数超过上限时按上限计
+    update = make_update(parts[0], coefs[0], 0.0, n_samples=10 ** 9)
+    assert update['n'] == Config.FL_MAX_SAMPLES_PER_UPDATE
+
+    # 5. 维度不一致的更新被拒绝
+    try:
+        merge(state, make_update(parts[0][:, :5], coefs[0][:5], 0.0))
+        assert False, '应当拒绝维度不一致的更新'
+    except ValueError:
+        pass
+    print("联邦学习聚合轮次测试通过")
+
+
+if __name__ == '__main__':
+    test_federated_rounds()
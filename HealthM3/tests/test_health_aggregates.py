@@ -0,0 +1,171 @@
+# 测试健康指标累计统计量的增量维护（临时SQLite数据库，无需启动应用）
+import os
+import sys
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User, HealthRecord
+from app.models.health_aggregate import HealthAggregate
+from app.services import health_aggregates
+from app.services.health_aggregates import METRICS, summary, rebuild
+from app.services.feature_extraction import record_health_score
+
+START = datetime(2031, 5, 1, 8, 30)
+
+
+def make_record(rng, user_id, recorded_at):
+    systolic, diastolic = rng.randint(85, 150), rng.randint(55, 95)
+    return {
+        'user_id': user_id,
+        'heart_rate': rng.randint(50, 110),
+        'blood_pressure': f'{systolic}/{diastolic}',
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+        'blood_sugar': round(rng.uniform(3.5, 7), 2),
+        'sleep_hours': round(rng.uniform(5, 10), 1),
+        'mood_score': rng.choice([None, rng.randint(1, 10)]),
+        'recorded_at': recorded_at
+    }
+
+
+def expected(user_id, metric):
+    """直接从全部记录计算统计量"""
+    points = []
+    for record in HealthRecord.query.filter_by(user_id=user_id).all():
+        values = {field: getattr(record, field) for field in health_aggregates.RECORD_FIELDS}
+        y = record_health_score(values) if metric == 'health_score' else values['mood_score']
+        if y is not None:
+            points.append(((record.recorded_at - START).total_seconds() / 86400, float(y)))
+    if not points:
+        return {'count': 0, 'mean': None, 'std': None, 'trend': 0.0}
+    x, y = np.array(points).T
+    trend = 0.0
+    if len(x) > 1 and np.ptp(x) > 0:
+        trend = np.polyfit(x, y, 1)[0] * np.ptp(x) / (len(x) - 1)
+    return {'count': len(points), 'mean': y.mean(), 'std': y.std(), 'trend': trend}
+
+
+def check(user_id):
+    for metric in METRICS:
+        actual, wanted = summary(user_id, metric), expected(user_id, metric)
+        assert actual['count'] == wanted['count'], (metric, actual, wanted)
+        if wanted['count']:
+            for key in ('mean', 'std', 'trend'):
+                assert abs(actual[key] - wanted[key]) < 1e-9, (metric, key, actual, wanted)
+
+
+def test_health_aggregates():
+    directory = tempfile.mkdtemp()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "aggregates.db")}',
+                      'SECRET_KEY': 'test', 'TESTING': True})
+    rng = random.Random(0)
+
+    with app.app_context():
+        users = [User(username=f'agg{i}', email=f'agg{i}@test.com') for i in range(2)]
+        for user in users:
+            user.set_password('test')
+        db.session.add_all(users)
+        db.session.commit()
+        user_id, other_id = users[0].id, users[1].id
+
+        # 1. 首次读取时从记录重建，原点为用户最早的记录时间
+        db.session.add_all([HealthRecord(**make_record(rng, user_id, START + timedelta(hours=7 * i)))
+                            for i in range(50)])
+        db.session.commit()
+        check(user_id)
+        aggregate = HealthAggregate.query.get((user_id, 'health_score'))
+        assert aggregate.origin_x == health_aggregates._to_x(START)
+
+        # 2. ORM新增（包括早于原点的记录）和Core批量插入
+        db.session.add_all([HealthRecord(**make_record(rng, user_id, START + timedelta(days=30, minutes=i)))
+                            for i in range(20)])
+        db.session.add(HealthRecord(**make_record(rng, user_id, START - timedelta(days=3))))
+        db.session.commit()
+        check(user_id)
+        rows = [make_record(rng, user_id, START + timedelta(days=40, seconds=i)) for i in range(30)]
+        db.session.execute(HealthRecord.__table__.insert(), rows)
+        health_aggregates.record_rows_inserted(rows)
+        db.session.commit()
+        check(user_id)
+
+        # 3. 修改指标值、记录时间，以及把记录改到其他用户名下
+        records = HealthRecord.query.filter_by(user_id=user_id).order_by(HealthRecord.id).all()
+        records[0].mood_score = None
+        records[1].mood_score = 9
+        records[2].heart_rate = 200
+        records[3].recorded_at = START + timedelta(days=90)
+        records[4].user_id = other_id
+        db.session.commit()
+        check(user_id)
+        check(other_id)
+
+        # 4. 删除记录，包括最早和最晚的记录
+        db.session.delete(records[3])
+        first = HealthRecord.query.filter_by(user_id=user_id).order_by(HealthRecord.recorded_at).first()
+        db.session.delete(first)
+        db.session.delete(records[10])
+        db.session.commit()
+        check(user_id)
+
+        # 5. 重建结果与增量维护的结果一致
+        incremental = {metric: summary(user_id, metric) for metric in METRICS}
+        rebuild(user_id)
+        db.session.commit()
+        for metric in METRICS:
+            rebuilt = summary(user_id, metric)
+            assert rebuilt['count'] == incremental[metric]['count']
+            for key in ('mean', 'std', 'trend'):
+                assert abs(rebuilt[key] - incremental[metric][key]) < 1e-9
+
+        # 6. 记录时间间隔只有几秒时趋势也不受累计和精度影响
+        rows = [make_record(rng, other_id, START + timedelta(days=400, seconds=i)) for i in range(100)]
+        db.session.execute(HealthRecord.__table__.insert(), rows)
+        health_aggregates.record_rows_inserted(rows)
+        db.session.commit()
+        check(other_id)
+
+        # 7. 读取时重建不提交调用方会话中未提交的修改
+        user = User(username='agg2', email='agg2@test.com')
+        user.set_password('test')
+        db.session.add(user)
+        db.session.commit()
+        new_id = user.id
+        db.session.add(HealthRecord(**make_record(rng, new_id, START)))
+        db.session.flush()
+        assert summary(new_id, 'health_score')['count'] == 1
+        db.session.rollback()
+        assert HealthRecord.query.filter_by(user_id=new_id).count() == 0
+        assert HealthAggregate.query.filter_by(user_id=new_id).count() == 0
+
+        # 8. 重建过程中其他会话新增的记录在重建提交后计入，不会丢失
+        db.session.add_all([HealthRecord(**make_record(rng, new_id, START + timedelta(days=i))) for i in range(5)])
+        db.session.commit()
+        rebuild(new_id)
+
+        def insert_concurrently():
+            with app.app_context():
+                db.session.add(HealthRecord(**make_record(rng, new_id, START + timedelta(days=10))))
+                db.session.commit()
+
+        thread = threading.Thread(target=insert_concurrently)
+        thread.start()
+        time.sleep(0.3)
+        db.session.commit()
+        thread.join()
+        db.session.expire_all()
+        assert summary(new_id, 'health_score')['count'] == 6
+        check(new_id)
+
+    print("健康指标累计统计测试通过")
+
+
+if __name__ == '__main__':
+    test_health_aggregates()
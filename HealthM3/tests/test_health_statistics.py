@@ -0,0 +1,62 @@
+# 测试健康指标分布统计（临时SQLite数据库，无需启动应用）
+import os
+import sys
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User, HealthRecord
+from app.services.health_statistics import METRICS, HISTOGRAM_BINS, get_distribution
+
+
+def test_health_statistics():
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmpdir, 'test.db'),
+        'SECRET_KEY': 'test',
+        'TESTING': True
+    })
+
+    with app.app_context():
+        user = User(username='stats', email='stats@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+
+        # 1. 血糖的最大值恰好落在右边界：(14.1 - 3.0) / 10 * 10 + 3.0 的舍入结果小于14.1
+        assert 3.0 + (14.1 - 3.0) / HISTOGRAM_BINS * HISTOGRAM_BINS < 14.1
+        rng = random.Random(0)
+        now = datetime.utcnow()
+        sugars = [3.0, 14.1] + [round(rng.uniform(3.0, 14.1), 1) for _ in range(50)]
+        for i, sugar in enumerate(sugars):
+            systolic, diastolic = rng.randint(90, 140), rng.randint(60, 90)
+            db.session.add(HealthRecord(
+                user_id=user.id, heart_rate=72, blood_pressure=f'{systolic}/{diastolic}',
+                blood_sugar=sugar, weight=65.0, sleep_hours=round(rng.uniform(5, 9), 1),
+                mood_score=rng.randint(1, 10), recorded_at=now - timedelta(hours=i)
+            ))
+        db.session.commit()
+
+        result = get_distribution(user.id, 30)['metrics']
+
+        # 2. 最大值归入最后一个箱，各指标的直方图计数之和等于非空值个数
+        sugar = result['blood_sugar']
+        assert sugar['histogram']['edges'][-1] == 14.1
+        assert sugar['histogram']['counts'][-1] >= 1
+        for metric in METRICS:
+            stats = result[metric]
+            assert sum(stats['histogram']['counts']) == stats['count'], metric
+            assert len(stats['histogram']['edges']) == HISTOGRAM_BINS + 1
+
+        # 3. 所有值相同（心率）时边界仍递增，全部计入第一个箱
+        edges = result['heart_rate']['histogram']['edges']
+        assert edges == sorted(edges) and edges[0] == 72
+        assert result['heart_rate']['histogram']['counts'][0] == len(sugars)
+
+    print("健康指标分布统计测试通过")
+
+
+if __name__ == '__main__':
+    test_health_statistics()
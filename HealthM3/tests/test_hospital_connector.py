@@ -0,0 +1,151 @@
+# 测试医院HIS连接器（使用本地桩HTTP服务器，无需启动应用）
+import os
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.hospital_connector import HospitalConnector
+
+TOTAL_ROWS = 95
+PAGE_SIZE = 10
+
+
+def make_rows(start, end):
+    return [{'patient_id': i, 'heart_rate': 60 + i % 40} for i in range(start, end)]
+
+
+class StubHISHandler(BaseHTTPRequestHandler):
+    """模拟HIS接口：页码分页、链接翻页、NDJSON、间歇性503、异常的翻页链接"""
+    failures = {}
+    lock = threading.Lock()
+    # NDJSON发送60行后，等客户端读到第一块数据再发送剩余内容
+    first_chunk_read = threading.Event()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, status=200, content_type='application/json'):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        page = int(query.get('page', 1))
+        size = int(query.get('page_size', PAGE_SIZE))
+
+        if url.path == '/paged':
+            total_pages = (TOTAL_ROWS + size - 1) // size
+            start = (page - 1) * size
+            self._send_json({'data': make_rows(start, min(start + size, TOTAL_ROWS)),
+                             'total_pages': total_pages})
+        elif url.path == '/linked':
+            cursor = int(query.get('cursor', 0))
+            body = {'data': make_rows(cursor, min(cursor + PAGE_SIZE, TOTAL_ROWS))}
+            if cursor + PAGE_SIZE < TOTAL_ROWS:
+                body['next'] = f'/linked?cursor={cursor + PAGE_SIZE}'
+            self._send_json(body)
+        elif url.path == '/list':
+            self._send_json(make_rows(0, 5))
+        elif url.path == '/ndjson':
+            lines = '\n'.join(json.dumps(row) for row in make_rows(0, TOTAL_ROWS))
+            self._send_json(lines.encode(), content_type='application/x-ndjson')
+        elif url.path == '/ndjson-slow':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+            for i, row in enumerate(make_rows(0, TOTAL_ROWS)):
+                if i == 60:
+                    self.wfile.flush()
+                    if not self.first_chunk_read.wait(5):
+                        return
+                self.wfile.write(json.dumps(row).encode() + b'\n')
+        elif url.path == '/loop':
+            self._send_json({'data': make_rows(0, 1), 'next': '/loop'})
+        elif url.path == '/offsite':
+            self._send_json({'data': make_rows(0, 1), 'next': 'http://his.invalid/linked'})
+        elif url.path == '/endless':
+            cursor = int(query.get('cursor', 0))
+            self._send_json({'data': make_rows(cursor, cursor + 1), 'next': f'/endless?cursor={cursor + 1}'})
+        elif url.path == '/flaky':
+            with self.lock:
+                count = self.failures.get(page, 0)
+                self.failures[page] = count + 1
+            if count < 2:
+                self._send_json({'error': 'busy'}, status=503)
+            else:
+                self._send_json(make_rows(0, 3))
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHISHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def test_hospital_connector():
+    server, base_url = start_server()
+    connector = HospitalConnector(max_workers=4, timeout=5, max_retries=3,
+                                  backoff_factor=0.01, page_size=PAGE_SIZE, chunk_size=20, max_pages=30)
+    try:
+        # 1. 页码分页：其余页并发抓取，结果完整且不重复
+        df = connector.fetch(f'{base_url}/paged')
+        assert len(df) == TOTAL_ROWS
+        assert sorted(df['patient_id']) == list(range(TOTAL_ROWS))
+
+        # 2. 链接翻页
+        df = connector.fetch(f'{base_url}/linked')
+        assert sorted(df['patient_id']) == list(range(TOTAL_ROWS))
+
+        # 3. NDJSON按chunk_size分块解析
+        chunks = list(connector.iter_chunks([(f'{base_url}/ndjson', {})]))
+        assert [len(chunk) for chunk in chunks] == [20, 20, 20, 20, 15]
+
+        # 4. 503自动重试
+        df = connector.fetch(f'{base_url}/flaky')
+        assert len(df) == 3
+
+        # 5. 多个接口并发抓取
+        df = connector.fetch_many([(f'{base_url}/paged', {}), (f'{base_url}/list', {})])
+        assert len(df) == TOTAL_ROWS + 5
+
+        # 6. NDJSON边读边产出：服务端发送剩余内容前已能拿到第一块
+        chunks = connector.iter_chunks([(f'{base_url}/ndjson-slow', {})])
+        assert len(next(chunks)) == 20
+        StubHISHandler.first_chunk_read.set()
+        assert sum(len(chunk) for chunk in chunks) == TOTAL_ROWS - 20
+
+        # 7. 重复的翻页链接、指向其他主机的链接不跟随，翻页不超过max_pages
+        assert len(connector.fetch(f'{base_url}/loop')) == 1
+        assert len(connector.fetch(f'{base_url}/offsite')) == 1
+        assert len(connector.fetch(f'{base_url}/endless')) == 30
+
+        # 8. 提前停止读取时抓取线程正常退出
+        chunks = connector.iter_chunks([(f'{base_url}/paged', {'page_size': 1})])
+        next(chunks)
+        chunks.close()
+
+        # 9. 不存在的接口抛出HTTP错误
+        try:
+            connector.fetch(f'{base_url}/missing')
+            assert False, '应当抛出HTTP错误'
+        except Exception as e:
+            assert '404' in str(e)
+        print("医院HIS连接器测试通过")
+    finally:
+        connector.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_hospital_connector()
@@ -0,0 +1,91 @@
+# 测试健康建议批处理：每个用户最新记录的窗口查询和预计算结果的过期判断（临时SQLite数据库）
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User, HealthRecord
+from app.models.precomputed_recommendation import PrecomputedRecommendation
+from app.services.recommendation_batch import (latest_records_query, iter_latest_record_chunks,
+                                               recommend_chunk, write_results, refresh_recommendations)
+
+START = datetime(2031, 5, 1, 8, 30)
+
+
+def make_record(user_id, recorded_at, heart_rate=70):
+    return HealthRecord(user_id=user_id, heart_rate=heart_rate, blood_pressure='120/80', systolic_bp=120,
+                        diastolic_bp=80, blood_sugar=5.2, weight=65.0, sleep_hours=7.5, mood_score=7,
+                        recorded_at=recorded_at)
+
+
+def test_recommendation_batch():
+    directory = tempfile.mkdtemp()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "batch.db")}',
+                      'SECRET_KEY': 'test', 'TESTING': True})
+
+    with app.app_context():
+        users = [User(username=f'batch{i}', email=f'batch{i}@test.com') for i in range(4)]
+        for user in users:
+            user.set_password('test')
+        db.session.add_all(users)
+        db.session.commit()
+        ids = [user.id for user in users]
+
+        # 用户0：最新记录不是最后插入的；用户1：两条记录时间相同，取ID较大的；用户2：一条记录；用户3：没有记录
+        records = [
+            make_record(ids[0], START + timedelta(days=2)),
+            make_record(ids[0], START),
+            make_record(ids[1], START),
+            make_record(ids[1], START),
+            make_record(ids[2], START + timedelta(days=1)),
+        ]
+        db.session.add_all(records)
+        db.session.commit()
+        expected = {ids[0]: records[0].id, ids[1]: records[3].id, ids[2]: records[4].id}
+
+        # 1. 窗口查询每个用户只返回最新的一条记录，与接口使用的最新记录一致
+        rows = db.session.execute(latest_records_query()).all()
+        assert {row.user_id: row.id for row in rows} == expected
+        for user_id, record_id in expected.items():
+            assert HealthRecord.latest_id_for_user(user_id) == record_id
+        with db.engine.connect() as connection:
+            chunks = list(iter_latest_record_chunks(connection, 2))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+
+        # 2. 批处理写入的结果在记录未修改时可直接使用
+        stats = refresh_recommendations(chunk_size=2, workers=1)
+        assert stats['users'] == 3
+        for user_id, record_id in expected.items():
+            result = PrecomputedRecommendation.get_current(user_id, record_id)
+            assert result is not None and 'recommendations' in result
+        assert PrecomputedRecommendation.get_current(ids[0], records[1].id) is None
+
+        # 3. 写入后修改记录：预计算结果被删除
+        records[4].heart_rate = 130
+        db.session.commit()
+        assert PrecomputedRecommendation.query.get(ids[2]) is None
+
+        # 4. 批处理读取记录后、写入前修改记录：写入的结果指纹不一致，不会被使用
+        with db.engine.connect() as connection:
+            chunk = next(iter_latest_record_chunks(connection, 10))
+        computed = recommend_chunk(chunk)
+        records[0].heart_rate = 40
+        db.session.commit()
+        write_results(computed)
+        assert PrecomputedRecommendation.query.get(ids[0]) is not None
+        assert PrecomputedRecommendation.get_current(ids[0], records[0].id) is None
+        assert PrecomputedRecommendation.get_current(ids[1], records[3].id) is not None
+
+        # 5. 新增记录后最新记录变化，旧结果不再使用
+        db.session.add(make_record(ids[1], START + timedelta(days=5)))
+        db.session.commit()
+        assert PrecomputedRecommendation.get_current(ids[1], HealthRecord.latest_id_for_user(ids[1])) is None
+
+    print("健康建议批处理测试通过")
+
+
+if __name__ == '__main__':
+    test_recommendation_batch()
@@ -0,0 +1,52 @@
+# 测试应用启动耗时（python -X importtime）
+import os
+import sys
+import subprocess
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入应用和全部蓝图的耗时上限（毫秒），可通过环境变量调整
+IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 1500))
+
+# 这些依赖应当在首次使用时才加载
+LAZY_MODULES = ('pandas', 'sklearn', 'scipy', 'snownlp', 'jieba')
+
+IMPORT_SNIPPET = (
+    'from app import create_app\n'
+    'from app.api import auth_api, health_api, health_record_api, recommendation_api, '
+    'data_collection_api, federated_learning_api, algorithm_analysis_api\n'
+)
+
+
+def measure_imports():
+    """返回(导入的全部模块名, 顶层导入的累计耗时毫秒数)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SNIPPET],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+    )
+    modules = set()
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # 格式: "import time: <自身> | <累计> | <缩进表示嵌套层级的模块名>"
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name[1:]
+        modules.add(name.strip())
+        if not name.startswith(' '):
+            total_us += int(cumulative)
+    return modules, total_us / 1000
+
+
+def test_startup_time():
+    modules, total_ms = measure_imports()
+
+    loaded = [name for name in LAZY_MODULES if name in modules]
+    assert not loaded, f'启动时不应导入: {", ".join(loaded)}'
+
+    print(f"应用导入耗时: {total_ms:.0f} ms（上限 {IMPORT_BUDGET_MS:.0f} ms）")
+    assert total_ms <= IMPORT_BUDGET_MS
+
+
+if __name__ == '__main__':
+    test_startup_time()
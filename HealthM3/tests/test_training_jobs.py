@@ -0,0 +1,122 @@
+# 测试后台训练任务的状态流转（临时SQLite数据库，训练函数替换为桩函数，无需启动应用）
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.training_job import TrainingJob
+from app.services.training_jobs import TrainingScheduler
+
+
+def fake_fit(model_type, health_records):
+    """按记录内容模拟训练：正常结束、抛出异常、进程崩溃或长时间训练"""
+    action = health_records[0]
+    if action.get('fail'):
+        raise ValueError('没有足够的训练数据')
+    if action.get('crash'):
+        os._exit(3)
+    time.sleep(action.get('sleep', 0))
+    return 'model', {'accuracy': 1.0}
+
+
+def fake_save(model_type, model):
+    return 'v1'
+
+
+def wait_for(job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        job = TrainingJob.query.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'任务 {job_id} 未进入状态 {statuses}，当前为 {job.status}')
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_training_jobs():
+    directory = tempfile.mkdtemp()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directory, "jobs.db")}',
+                      'SECRET_KEY': 'test', 'TESTING': True})
+    # spawn方式启动子进程，桩函数按模块名传给子进程
+    scheduler = TrainingScheduler(max_workers=1, mp_context='spawn', heartbeat_interval=0.1, lease=1,
+                                  fit_model=fake_fit, save_model=fake_save)
+
+    with app.app_context():
+        user = User(username='jobs', email='jobs@test.com')
+        user.set_password('test')
+        db.session.add(user)
+        db.session.commit()
+
+        def submit(record):
+            return scheduler.submit(app, user.id, 'diabetes', [record]).id
+
+        # 1. 正常结束：子进程写入结果
+        job = wait_for(submit({}), TrainingJob.FINISHED_STATUSES)
+        assert job.status == TrainingJob.SUCCEEDED
+        assert job.get_result() == {'metrics': {'accuracy': 1.0}, 'model_version': 'v1'}
+
+        # 2. 训练抛出异常
+        job = wait_for(submit({'fail': True}), TrainingJob.FINISHED_STATUSES)
+        assert job.status == TrainingJob.FAILED and '训练数据' in job.error
+
+        # 3. 子进程崩溃
+        job = wait_for(submit({'crash': True}), TrainingJob.FINISHED_STATUSES)
+        assert job.status == TrainingJob.FAILED and '退出码 3' in job.error
+
+        # 4. 取消运行中的任务：子进程被终止；排队中的任务取消后不再运行
+        running = submit({'sleep': 30})
+        queued = submit({})
+        wait_for(running, [TrainingJob.RUNNING])
+        process = scheduler._running[running]
+        assert scheduler.cancel(queued)
+        assert scheduler.cancel(running)
+        assert wait_until(lambda: not process.is_alive())
+        assert wait_for(running, TrainingJob.FINISHED_STATUSES).status == TrainingJob.CANCELLED
+        assert wait_for(queued, TrainingJob.FINISHED_STATUSES).status == TrainingJob.CANCELLED
+        assert not scheduler.cancel(running)
+
+        # 5. 在其他worker中取消（只修改数据库）：子进程续租时发现并自行退出
+        job_id = submit({'sleep': 30})
+        wait_for(job_id, [TrainingJob.RUNNING])
+        process = scheduler._running[job_id]
+        TrainingJob.query.get(job_id).status = TrainingJob.CANCELLED
+        db.session.commit()
+        assert wait_until(lambda: not process.is_alive())
+        assert process.exitcode == 0
+
+        # 6. 执行进程已退出、租约过期的任务在查询时被标记为失败
+        stale = TrainingJob(id='stale', user_id=user.id, model_type='diabetes', status=TrainingJob.RUNNING,
+                            heartbeat_at=datetime.utcnow() - timedelta(seconds=5))
+        db.session.add(stale)
+        db.session.commit()
+        job = scheduler.reap_if_stale(stale)
+        assert job.status == TrainingJob.FAILED and job.finished_at is not None
+
+        # 7. 租约未过期的任务不受影响
+        job = TrainingJob.query.get(submit({'sleep': 2}))
+        assert scheduler.reap_if_stale(job).status in (TrainingJob.PENDING, TrainingJob.RUNNING)
+        time.sleep(1.5)
+        assert scheduler.reap_if_stale(job).status == TrainingJob.RUNNING
+        assert wait_for(job.id, TrainingJob.FINISHED_STATUSES).status == TrainingJob.SUCCEEDED
+
+    scheduler.shutdown()
+    print("后台训练任务测试通过")
+
+
+if __name__ == '__main__':
+    test_training_jobs()